@@ -1,10 +1,42 @@
 __version__ = "0.1.0b"
 
-from oggm_edu.funcs import plot_glacier_graphics, initalize_oggm, set_params
-from oggm_edu.glacier import Glacier, SurgingGlacier
-from oggm_edu.glacier_bed import GlacierBed
-from oggm_edu.glacier_collection import GlacierCollection
-from oggm_edu.mass_balance import MassBalance
-
-# Initialize on import
-initalize_oggm()
+# The classes and functions are imported on first access, so that importing
+# the package stays cheap: e.g. computations without plots never import
+# matplotlib. OGGM is initialized when the glaciers first need it.
+_exports = {
+    "plot_glacier_graphics": "oggm_edu.funcs",
+    "glacier_graphic": "oggm_edu.funcs",
+    "prefill_graphics": "oggm_edu.funcs",
+    "initalize_oggm": "oggm_edu.funcs",
+    "set_params": "oggm_edu.funcs",
+    "Glacier": "oggm_edu.glacier",
+    "SurgingGlacier": "oggm_edu.glacier",
+    "GlacierBed": "oggm_edu.glacier_bed",
+    "GlacierBedGenerator": "oggm_edu.glacier_bed",
+    "GlacierCollection": "oggm_edu.glacier_collection",
+    "MassBalance": "oggm_edu.mass_balance",
+    "EquilibriumCache": "oggm_edu.equilibrium_cache",
+    "ParameterSweep": "oggm_edu.sweep",
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    # The plotting layer is a module of its own.
+    if name == "plotting":
+        import importlib
+
+        return importlib.import_module("oggm_edu.plotting")
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    value = getattr(importlib.import_module(_exports[name]), name)
+    # Next time it is found without us.
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
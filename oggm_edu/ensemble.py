@@ -0,0 +1,428 @@
+"""This module provides the EnsembleFlowlineModel, a flowline model which
+advances many glaciers sharing the same bed at once. It is used by the
+GlacierCollection to progress large collections in a single vectorised run.
+"""
+
+# Internals
+from oggm_edu.glacier_bed import GlacierBed
+from oggm_edu.funcs import _init_oggm
+
+# Other libraries
+import numpy as np
+import xarray as xr
+from time import gmtime, strftime
+from scipy.linalg import solve_banded
+
+# Import OGGM things
+from oggm import cfg, utils, __version__
+from oggm.cfg import SEC_IN_YEAR, G
+
+# The model needs the OGGM parameters.
+_init_oggm()
+
+
+class EnsembleFlowlineModel:
+    """Semi-implicit flowline model for an ensemble of glaciers on one bed.
+
+    It solves the same equations as the OGGM ``SemiImplicitModel`` for a
+    rectangular bed, but for N members at once: the ice thickness is a 2-D
+    array (members x grid points) and all members are advanced in lockstep,
+    with the time step of the fastest member. The members can differ in
+    mass balance, creep and basal sliding.
+
+    Attributes
+    ----------
+    bed : oggm_edu.GlacierBed
+        The bed shared by all members.
+    n_members : int
+        Number of glaciers in the ensemble.
+    thick : array
+        Ice thickness, shape (n_members, nx). [m]
+    yr : float
+        Current year of the simulation.
+    """
+
+    def __init__(
+        self,
+        bed,
+        mass_balances,
+        glen_a,
+        fs,
+        thick=None,
+        y0=0,
+        cfl_number=0.5,
+        min_dt=None,
+    ):
+        """Initialise the ensemble.
+
+        Parameters
+        ----------
+        bed : oggm_edu.GlacierBed
+            The bed shared by all members.
+        mass_balances : list of oggm_edu.MassBalance
+            One mass balance per member.
+        glen_a : array_like(float)
+            Creep parameter of each member.
+        fs : array_like(float)
+            Basal sliding parameter of each member.
+        thick : array, optional
+            Initial ice thickness, shape (n_members, nx). Defaults to no ice.
+        y0 : int, optional
+            Initial year of the simulation.
+        cfl_number : float, optional
+            For the adaptive time stepping, as in the OGGM SemiImplicitModel.
+        min_dt : float, optional
+            Minimum time step in seconds. Defaults to cfg.PARAMS['cfl_min_dt'].
+        """
+        if not isinstance(bed, GlacierBed):
+            raise TypeError("The bed has to be of type GlacierBed.")
+        self.bed = bed
+        self.mass_balances = list(mass_balances)
+        self.n_members = len(self.mass_balances)
+        if self.n_members < 1:
+            raise ValueError("The ensemble needs at least one member.")
+
+        # Column vectors, to broadcast against the grid.
+        self.glen_a = np.asarray(glen_a, dtype=float).reshape(-1, 1)
+        self.fs = np.asarray(fs, dtype=float).reshape(-1, 1)
+        if len(self.glen_a) != self.n_members or len(self.fs) != self.n_members:
+            raise ValueError("glen_a and fs need one value per member.")
+
+        nx = bed.nx
+        if thick is None:
+            thick = np.zeros((self.n_members, nx))
+        self.thick = np.array(thick, dtype=float)
+        if self.thick.shape != (self.n_members, nx):
+            raise ValueError("thick should have the shape (n_members, nx).")
+
+        self.y0 = y0
+        self.t = 0.0
+        self.cfl_number = cfl_number
+        self.min_dt = cfg.PARAMS["cfl_min_dt"] if min_dt is None else min_dt
+
+        # Physical constants, as in the OGGM flowline models.
+        self.glen_n = cfg.PARAMS["glen_n"]
+        self._fd = 2.0 / (self.glen_n + 2) * self.glen_a
+        self.rhog = (cfg.PARAMS["ice_density"] * G) ** self.glen_n
+        self._surf_vel_fac = (self.glen_n + 2) / (self.glen_n + 1)
+
+        # Geometry, constant for a rectangular bed.
+        self.dx = bed.map_dx
+        self.width = bed.widths * bed.map_dx
+        self.width_stag = (self.width[0:-1] + self.width[1:]) / 2
+        bed_h_exp = np.concatenate(([bed.bed_h[0]], bed.bed_h, [bed.bed_h[-1]]))
+        self.dbed_h_exp_dx = (bed_h_exp[1:] - bed_h_exp[:-1]) / self.dx
+        self.d_stag = np.zeros((self.n_members, nx + 1))
+        self.d_matrix_banded = np.zeros((3, self.n_members, nx))
+
+        # Annual mass balance, updated once a year.
+        self._mb_year = None
+        self._mb = None
+
+    @property
+    def yr(self):
+        return self.y0 + self.t / SEC_IN_YEAR
+
+    @property
+    def surface_h(self):
+        """Surface heights, shape (n_members, nx). [m]"""
+        return self.bed.bed_h + self.thick
+
+    @property
+    def section(self):
+        """Section areas, shape (n_members, nx). [m2]"""
+        return self.thick * self.width
+
+    @property
+    def volume_m3(self):
+        """Volume of each member. [m3]"""
+        return np.sum(self.section, axis=1) * self.dx
+
+    @property
+    def area_m2(self):
+        """Area of each member. [m2]"""
+        return np.sum(np.where(self.thick > 0, self.width, 0), axis=1) * self.dx
+
+    @property
+    def length_m(self):
+        """Length of each member, following the OGGM length method. [m]"""
+        lt = cfg.PARAMS.get("min_ice_thick_for_length", 0)
+        has_ice = self.thick > lt
+        if cfg.PARAMS.get("glacier_length_method") == "consecutive":
+            # Up to the first grid point without ice.
+            nx = np.where(has_ice.all(axis=1), has_ice.shape[1],
+                          np.argmin(has_ice, axis=1))
+        else:
+            nx = np.sum(has_ice, axis=1)
+        return nx * self.dx
+
+    @property
+    def u_stag(self):
+        """Depth-integrated ice velocity on the staggered grid. [m s-1]"""
+        n = self.glen_n
+        thick = self.thick
+        surface_h = self.surface_h
+
+        slope_stag = np.zeros((self.n_members, thick.shape[1] + 1))
+        slope_stag[:, 1:-1] = (surface_h[:, 0:-1] - surface_h[:, 1:]) / self.dx
+        slope_stag[:, -1] = slope_stag[:, -2]
+        thick_stag = np.zeros_like(slope_stag)
+        thick_stag[:, 1:-1] = (thick[:, 0:-1] + thick[:, 1:]) / 2.0
+        thick_stag[:, [0, -1]] = thick[:, [0, -1]]
+
+        rhogh = self.rhog * slope_stag**n
+        return (thick_stag ** (n + 1)) * self._fd * rhogh + (
+            thick_stag ** (n - 1)
+        ) * self.fs * rhogh
+
+    def get_mb(self):
+        """Annual mass balance of all members, evaluated on the surface at the
+        start of the year. [m ice s-1]"""
+        year = utils.floatyear_to_date(self.yr)[0]
+        if year != self._mb_year:
+            self._mb_year = year
+            surface_h = self.surface_h
+            self._mb = np.stack(
+                [
+                    mb.get_annual_mb(surface_h[i], year=self.yr)
+                    for i, mb in enumerate(self.mass_balances)
+                ]
+            )
+        return self._mb
+
+    def step(self, dt):
+        """Advance all members by one step.
+
+        Parameters
+        ----------
+        dt : float
+            Maximum step length in seconds.
+
+        Returns
+        -------
+        The actual dt, limited by the stability of the fastest member.
+        """
+        n = self.glen_n
+        dx = self.dx
+        width = self.width
+        width_stag = self.width_stag
+        thick = self.thick
+        surface_h = self.surface_h
+
+        # Staggered variables
+        thick_stag = (thick[:, 0:-1] + thick[:, 1:]) / 2.0
+        dsdx_stag = (surface_h[:, 1:] - surface_h[:, 0:-1]) / dx
+
+        # Diffusivity, with d_stag = 0 at both boundaries.
+        d_stag = self.d_stag
+        d_stag[:, 1:-1] = (
+            (self._fd * thick_stag ** (n + 2) + self.fs * thick_stag**n)
+            * self.rhog
+            * width_stag
+            * np.abs(dsdx_stag) ** (n - 1)
+        )
+
+        # Stability criterion dt <= dx^2 / max(D/w) * cfl_number, for all members.
+        divisor = np.max(np.abs(d_stag[:, 1:-1] / width_stag))
+        if divisor > cfg.FLOAT_EPS:
+            cfl_dt = self.cfl_number * dx**2 / divisor
+            if cfl_dt < dt:
+                dt = cfl_dt
+                if cfl_dt < self.min_dt:
+                    raise RuntimeError(
+                        "CFL error: required time step smaller than the minimum "
+                        f"allowed: {cfl_dt:.1f}s vs {self.min_dt:.1f}s. Happening "
+                        f"at simulation year {self.yr:.1f}."
+                    )
+
+        # Tridiagonal matrices of all members, in banded form. The members are
+        # stacked into one block-diagonal system and solved at once.
+        d0 = dt / dx**2 * (d_stag[:, :-1] + d_stag[:, 1:]) / width
+        dm = -dt / dx**2 * d_stag[:, :-1] / width
+        dp = -dt / dx**2 * d_stag[:, 1:] / width
+        banded = self.d_matrix_banded
+        banded[0, :, 1:] = dp[:, :-1]
+        banded[1] = 1 + d0
+        banded[2, :, :-1] = dm[:, 1:]
+
+        # Correction term for the bed, the equation is solved for h instead of s.
+        b_corr = -d_stag * self.dbed_h_exp_dx
+        rhs = (
+            thick
+            + self.get_mb() * dt
+            + dt / width * (b_corr[:, :-1] - b_corr[:, 1:]) / dx
+        )
+
+        thick_new = solve_banded(
+            (1, 1), banded.reshape(3, -1), rhs.reshape(-1)
+        ).reshape(thick.shape)
+        self.thick = utils.clip_min(thick_new, 0)
+
+        self.t += dt
+        return dt
+
+    def run_until(self, y1):
+        """Run all members until year y1.
+
+        Parameters
+        ----------
+        y1 : float
+            Year until which to run.
+        """
+        # Same sub-stepping as the OGGM models: never step over a month.
+        ts = np.append(utils.monthly_timeseries(self.yr, y1), y1)
+        for y in ts:
+            t = (y - self.y0) * SEC_IN_YEAR
+            while self.t < t:
+                self.step(t - self.t)
+
+            # Check for domain bounds.
+            outgrown = np.nonzero(self.thick[:, -1] > 10)[0]
+            if outgrown.size:
+                raise RuntimeError(
+                    f"Members {outgrown.tolist()} exceed the domain boundaries, "
+                    f"at year: {self.yr}"
+                )
+            # Check for nans.
+            if np.any(~np.isfinite(self.thick)):
+                raise FloatingPointError(
+                    f"nan in numerical solution, at year: {self.yr}"
+                )
+
+    def run_until_and_store(self, y1):
+        """Run all members until year y1 and store their yearly evolution.
+
+        Parameters
+        ----------
+        y1 : int
+            Year until which to run.
+
+        Returns
+        -------
+        diag_dss : list of xarray.Dataset
+            Glacier wide diagnostics (volume, area, length, ...) of each member,
+            with the same variables as the OGGM model output.
+        fl_diag_dss : list of xarray.Dataset
+            Diagnostics along the flowline (thickness, velocity, ...) of each
+            member, with the same variables as the OGGM model output.
+        """
+        if int(y1) != y1:
+            raise ValueError("run_until_and_store only accepts integer year dates.")
+
+        times = np.arange(np.floor(self.yr), np.floor(y1) + 1)
+        nt = len(times)
+        nm, nx = self.thick.shape
+
+        volume = np.zeros((nm, nt))
+        area = np.zeros((nm, nt))
+        length = np.zeros((nm, nt))
+        thickness = np.zeros((nm, nt, nx))
+        velocity = np.full((nm, nt, nx), np.nan)
+        dhdt = np.full((nm, nt, nx), np.nan)
+        climatic_mb = np.full((nm, nt, nx), np.nan)
+        flux_divergence = np.full((nm, nt, nx), np.nan)
+
+        for i, yr in enumerate(times):
+            if yr > self.yr:
+                thick_previous = self.thick
+                self.run_until(yr)
+                # The mass balance of the year which just ended.
+                mb = self._mb * SEC_IN_YEAR
+                u_stag = self.u_stag
+                velocity[:, i] = (
+                    (u_stag[:, 1:] + u_stag[:, :-1]) / 2
+                    * self._surf_vel_fac
+                    * SEC_IN_YEAR
+                )
+                dhdt[:, i] = self.thick - thick_previous
+                climatic_mb[:, i] = np.where(np.isclose(dhdt[:, i], 0.0), 0.0, mb)
+                has_become_ice_free = np.isclose(self.thick, 0.0) & (dhdt[:, i] < 0)
+                flux_divergence[:, i] = (dhdt[:, i] - climatic_mb[:, i]) * np.where(
+                    has_become_ice_free, 0.1, 1.0
+                )
+            thickness[:, i] = self.thick
+            volume[:, i] = self.volume_m3
+            area[:, i] = self.area_m2
+            length[:, i] = self.length_m
+
+        # Coordinates, as in the OGGM output.
+        yrs, months = utils.floatyear_to_date(times)
+        hyrs, hmonths = utils.calendardate_to_hydrodate(
+            yrs, months, start_month=cfg.PARAMS["hydro_month_nh"]
+        )
+        coords = {
+            "time": ("time", times, {"description": "Floating year"}),
+            "calendar_year": ("time", yrs, {"description": "Calendar year"}),
+            "calendar_month": ("time", months, {"description": "Calendar month"}),
+            "hydro_year": ("time", hyrs, {"description": "Hydrological year"}),
+            "hydro_month": ("time", hmonths, {"description": "Hydrological month"}),
+        }
+        dis = np.arange(nx) * self.dx
+        cell_area = np.where(thickness > 0, self.width, 0) * self.dx
+        zeros = np.zeros(nt)
+
+        diag_dss = []
+        fl_diag_dss = []
+        for m in range(nm):
+            attrs = self._attrs(m)
+            diag = xr.Dataset(
+                {
+                    "volume_m3": ("time", volume[m], {"unit": "m 3"}),
+                    "volume_bsl_m3": ("time", zeros, {"unit": "m 3"}),
+                    "volume_bwl_m3": ("time", zeros, {"unit": "m 3"}),
+                    "area_m2": ("time", area[m], {"unit": "m 2"}),
+                    "length_m": ("time", length[m], {"unit": "m"}),
+                    "calving_m3": ("time", zeros, {"unit": "m 3"}),
+                    "calving_rate_myr": ("time", zeros, {"unit": "m yr-1"}),
+                },
+                coords=coords,
+                attrs=attrs,
+            )
+            dims = ("time", "dis_along_flowline")
+            section_volume = thickness[m] * self.width * self.dx
+            fl_diag = xr.Dataset(
+                {
+                    "bed_h": ("dis_along_flowline", self.bed.bed_h, {"unit": "m"}),
+                    "volume_m3": (dims, section_volume, {"unit": "m 3"}),
+                    "volume_bsl_m3": (dims, section_volume * 0, {"unit": "m 3"}),
+                    "volume_bwl_m3": (dims, section_volume * 0, {"unit": "m 3"}),
+                    "area_m2": (dims, cell_area[m], {"unit": "m 2"}),
+                    "thickness_m": (dims, thickness[m], {"unit": "m"}),
+                    "ice_velocity_myr": (dims, velocity[m], {"unit": "m yr-1"}),
+                    "calving_bucket_m3": ("time", zeros, {"unit": "m 3"}),
+                    "flux_divergence": (dims, flux_divergence[m], {"unit": "m yr-1"}),
+                    "climatic_mb": (dims, climatic_mb[m], {"unit": "m yr-1"}),
+                    "dhdt": (dims, dhdt[m], {"unit": "m yr-1"}),
+                },
+                coords={"dis_along_flowline": dis, **coords},
+                attrs={
+                    "class": "RectangularBedFlowline",
+                    "map_dx": self.bed.map_dx,
+                    "dx": 1.0,
+                    **attrs,
+                },
+            )
+            diag_dss.append(diag)
+            fl_diag_dss.append(fl_diag)
+
+        return diag_dss, fl_diag_dss
+
+    def _attrs(self, member):
+        """Dataset attributes of a member, as in the OGGM output."""
+        mb = self.mass_balances[member]
+        attrs = {
+            "description": "OGGM model output",
+            "oggm_version": __version__,
+            "calendar": "365-day no leap",
+            "creation_date": strftime("%Y-%m-%d %H:%M:%S", gmtime()),
+            "water_level": 0.0,
+            "glen_a": self.glen_a[member, 0],
+            "fs": self.fs[member, 0],
+            "mb_model_class": type(mb).__name__,
+        }
+        for k, v in mb.__dict__.items():
+            if np.isscalar(v) and not k.startswith("_"):
+                if type(v) is bool:
+                    v = str(v)
+                attrs[f"mb_model_{k}"] = v
+        return attrs
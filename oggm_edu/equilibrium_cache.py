@@ -0,0 +1,242 @@
+"""This module provides the EquilibriumCache, a cache of the equilibrium states
+found by Glacier.progress_to_equilibrium. Experiments often solve the same
+configuration again, e.g. when re-running a notebook, and a cache hit returns
+the equilibrium state without running the model.
+"""
+
+# Other libraries
+import numpy as np
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+
+
+def _shift_time(ds, offset):
+    """Shift the time coordinates of an OGGM output dataset.
+
+    Parameters
+    ----------
+    ds : xarray.Dataset
+        Output of a model run.
+    offset : int
+        Number of years to add to the time coordinates.
+    """
+    coords = {}
+    for name in ["time", "calendar_year", "hydro_year"]:
+        if name in ds.coords:
+            coords[name] = ds[name].copy(data=ds[name].values + offset)
+    return ds.assign_coords(coords)
+
+
+class EquilibriumCache:
+    """Content addressed cache of glacier equilibrium states.
+
+    Entries are keyed by a hash of the bed, the mass balance, the ice
+    dynamics parameters, the search parameters and the state the glacier
+    starts from. They store the equilibrium state and the history of the
+    run leading to it, relative to the start of the run, so a glacier of any
+    age can use them.
+
+    The cache is kept in memory with a least recently used eviction, and
+    optionally in a directory on disk.
+
+    Attributes
+    ----------
+    maxsize : int
+        Maximum number of entries kept in memory.
+    path : str or None
+        Directory where the entries are also written.
+    warm_start : bool
+        If a glacier without history misses the cache, start its search
+        from the cached equilibrium state of the closest configuration on
+        the same bed instead of the bare bed. The history and the
+        equilibrium year are then not the ones of a search from the bare bed.
+    """
+
+    def __init__(self, maxsize=128, path=None, warm_start=False):
+        """Initialise the cache.
+
+        Parameters
+        ----------
+        maxsize : int, optional
+            Maximum number of entries kept in memory. 128 by default.
+        path : str, optional
+            Directory in which to also store the entries. Entries found there
+            are used by later sessions. Created if it does not exist.
+        warm_start : bool, optional
+            Start the search of new configurations from the closest cached
+            equilibrium state. False by default.
+        """
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self.maxsize = maxsize
+        self.path = path
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+        self.warm_start = warm_start
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def maxsize(self):
+        """Maximum number of entries kept in memory."""
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, value):
+        """Set the maximum number of entries kept in memory.
+
+        Parameters
+        ----------
+        value : int
+            Maximum number of entries, above 0.
+        """
+        if not isinstance(value, int) or value < 1:
+            raise ValueError("maxsize should be an integer above 0.")
+        self._maxsize = value
+        while len(self._entries) > value:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _family(glacier, t_rate):
+        """Hash of what has to be equal for a warm start: the bed, the ice
+        dynamics and the search criterion."""
+        h = hashlib.blake2b(glacier.bed.fingerprint.encode(), digest_size=16)
+        h.update(repr((glacier.creep, glacier.basal_sliding, t_rate)).encode())
+        return h.hexdigest()
+
+    def key(self, glacier, t_rate):
+        """Key of the equilibrium search of a glacier.
+
+        The number of years of the search is not part of the key, entries
+        record if the search ran out of years instead.
+
+        Parameters
+        ----------
+        glacier : oggm_edu.Glacier
+            The glacier about to search for its equilibrium.
+        t_rate : float
+            ``t_rate`` argument of the search.
+
+        Returns
+        -------
+        str
+        """
+        mb = glacier.mass_balance
+        h = hashlib.blake2b(self._family(glacier, t_rate).encode(), digest_size=16)
+        h.update(
+            repr(
+                (
+                    float(mb.ela_h),
+                    mb.grad,
+                    getattr(mb, "_breakpoints", None),
+                    mb.max_mb,
+                    mb.rho,
+                )
+            ).encode()
+        )
+        # Rounded like GlacierBed.fingerprint: after a cache hit the glacier
+        # continues from the cached state with a new model, its later states
+        # differ by round-off from the ones of a run without the cache.
+        thick = np.round(np.asarray(glacier._state().thick, dtype=float), 6) + 0.0
+        h.update(thick.tobytes())
+        return h.hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, key + ".pkl")
+
+    def get(self, key):
+        """Get an entry, from memory or from disk.
+
+        Parameters
+        ----------
+        key : str
+            Key from ``EquilibriumCache.key``.
+
+        Returns
+        -------
+        dict or None
+            The entry, None if it is not in the cache.
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return self._entries[key]
+        if self.path is not None and os.path.exists(self._file(key)):
+            with open(self._file(key), "rb") as f:
+                entry = pickle.load(f)
+            self._store(key, entry)
+            self._hits += 1
+            return entry
+        self._misses += 1
+        return None
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def put(self, key, entry):
+        """Add an entry to the cache.
+
+        Parameters
+        ----------
+        key : str
+            Key from ``EquilibriumCache.key``.
+        entry : dict
+            Entry from ``Glacier._equilibrium_entry``.
+        """
+        self._store(key, entry)
+        if self.path is not None:
+            with open(self._file(key), "wb") as f:
+                pickle.dump(entry, f)
+
+    def nearest(self, glacier, t_rate):
+        """The entry in memory with the closest mass balance profile, among
+        the entries of glaciers with the same bed and ice dynamics.
+
+        Parameters
+        ----------
+        glacier : oggm_edu.Glacier
+            The glacier about to search for its equilibrium.
+        t_rate : float
+            ``t_rate`` argument of the search.
+
+        Returns
+        -------
+        dict or None
+            The entry, None if there is no entry for the bed.
+        """
+        family = self._family(glacier, t_rate)
+        profile = glacier.mass_balance.get_annual_mb(glacier.bed.bed_h)
+        best, best_distance = None, np.inf
+        for entry in self._entries.values():
+            if entry["family"] != family:
+                continue
+            distance = np.linalg.norm(entry["mb_profile"] - profile)
+            if distance < best_distance:
+                best, best_distance = entry, distance
+        return best
+
+    def cache_info(self):
+        """Statistics of the cache.
+
+        Returns
+        -------
+        dict
+            Number of hits, misses, current size and maximum size of the cache.
+        """
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+
+    def cache_clear(self):
+        """Empty the in-memory cache. Files on disk are kept."""
+        self._entries.clear()
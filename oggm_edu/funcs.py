@@ -1,19 +1,33 @@
-"""oggm-edu package: useful functions diffult to place elsewhere"""
-import urllib
+"""oggm-edu package: useful functions diffult to place elsewhere
+
+Matplotlib, seaborn, PIL and OGGM are only imported when they are needed, so
+that computations without plots don't pay for them.
+"""
+import os
+import re
+import urllib.request
+import zipfile
+from collections import OrderedDict
 from functools import wraps
 import numpy as np
-import matplotlib as mpl
-import matplotlib.pyplot as plt
-import seaborn as sns
-from PIL import Image
-from oggm import cfg
 
 graphics_url = (
     "https://raw.githubusercontent.com/OGGM/glacier-graphics/master/"
     "glacier_intro/png/glacier_{:02d}.png"
 )
 
-PARAMS = {'figsize': (9, 6)}
+PARAMS = {
+    'figsize': (9, 6),
+    # Where the glacier graphics are kept once downloaded.
+    'graphics_dir': os.environ.get(
+        "OGGM_EDU_GRAPHICS_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "oggm_edu", "graphics"),
+    ),
+}
+
+# Decoded glacier graphics, by file, least recently used first.
+_graphics = OrderedDict()
+_graphics_maxsize = 16
 
 
 class mpl_figsize:
@@ -22,11 +36,13 @@ class mpl_figsize:
     https://github.com/matplotlib/matplotlib/issues/25041
     """
     def __init__(self, figsize):
+        import matplotlib.pyplot as plt
         self.figsize = plt.rcParams['figure.figsize']
         plt.rcParams['figure.figsize'] = figsize
     def __enter__(self):
         return None
     def __exit__(self, type, value, traceback):
+        import matplotlib.pyplot as plt
         plt.rcParams['figure.figsize'] = self.figsize
 
 
@@ -37,6 +53,8 @@ def plot_glacier_graphics(num="01", title=False, ax=None):
 
     Explanation: https://edu.oggm.org/en/latest/glacier_basics.html
 
+    The images are only downloaded once, see glacier_graphic.
+
     Parameters
     ----------
     num : int or str
@@ -50,9 +68,11 @@ def plot_glacier_graphics(num="01", title=False, ax=None):
     -------
     the plot axis
     """
+    import matplotlib.pyplot as plt
+
     if ax is None:
         _, ax = plt.subplots()
-    ax.imshow(Image.open(urllib.request.urlopen(graphics_url.format(int(num)))))
+    ax.imshow(glacier_graphic(num))
     ax.patch.set_visible(False)
     ax.axis("off")
     if title:
@@ -60,6 +80,114 @@ def plot_glacier_graphics(num="01", title=False, ax=None):
     return ax
 
 
+def _graphic_file(num):
+    """Path of a glacier graphic in the graphics directory."""
+    return os.path.join(PARAMS['graphics_dir'], f"glacier_{int(num):02d}.png")
+
+
+def glacier_graphic(num="01"):
+    """One of the OGGM-edu glacier graphics, as an image array.
+
+    The graphic is downloaded the first time it is needed and kept in
+    ``PARAMS['graphics_dir']``, which ``prefill_graphics`` can fill from a
+    local copy instead. The last decoded graphics are also kept in memory.
+
+    Parameters
+    ----------
+    num : int or str
+        number from 01 to 11
+
+    Returns
+    -------
+    numpy.ndarray
+        The image, read-only.
+    """
+    from PIL import Image
+
+    file = _graphic_file(num)
+    if file in _graphics:
+        _graphics.move_to_end(file)
+        return _graphics[file]
+
+    if not os.path.exists(file):
+        try:
+            with urllib.request.urlopen(graphics_url.format(int(num))) as response:
+                data = response.read()
+        except OSError as err:
+            raise RuntimeError(
+                f"Glacier graphic {num} is not in {PARAMS['graphics_dir']} and "
+                f"could not be downloaded ({err}). Use prefill_graphics to "
+                "install the graphics from a local copy."
+            ) from err
+        os.makedirs(PARAMS['graphics_dir'], exist_ok=True)
+        # Only complete files go in the directory.
+        with open(file + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(file + ".tmp", file)
+
+    with Image.open(file) as image:
+        image = np.asarray(image)
+    image.flags.writeable = False
+    _graphics[file] = image
+    if len(_graphics) > _graphics_maxsize:
+        _graphics.popitem(last=False)
+    return image
+
+
+def prefill_graphics(source):
+    """Copy the glacier graphics from a local copy to ``PARAMS['graphics_dir']``,
+    so that plot_glacier_graphics works offline.
+
+    Parameters
+    ----------
+    source : str
+        Directory or zip file with the ``glacier_XX.png`` files, which are
+        also looked for in subdirectories, e.g. a checkout or the zip file of
+        the glacier-graphics repository.
+
+    Returns
+    -------
+    int
+        Number of graphics copied.
+    """
+    pattern = re.compile(r"glacier_(\d{2})\.png")
+    # Number of each graphic, and where and how large it is. Archives and
+    # checkouts can also have thumbnails, keep the full size graphics.
+    found = {}
+
+    def add(name, size, item):
+        match = pattern.fullmatch(name)
+        if match and size > found.get(match.group(1), (-1, None))[0]:
+            found[match.group(1)] = (size, item)
+
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    add(info.filename.rsplit("/", 1)[-1], info.file_size, info)
+            files = {num: archive.read(info) for num, (_, info) in found.items()}
+    else:
+        for root, _, names in os.walk(source):
+            for name in names:
+                path = os.path.join(root, name)
+                if pattern.fullmatch(name) and os.path.isfile(path):
+                    add(name, os.path.getsize(path), path)
+        files = {}
+        for num, (_, path) in found.items():
+            with open(path, "rb") as f:
+                files[num] = f.read()
+
+    os.makedirs(PARAMS['graphics_dir'], exist_ok=True)
+    for num, data in files.items():
+        file = _graphic_file(num)
+        with open(file + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(file + ".tmp", file)
+        # Forget the old image.
+        _graphics.pop(file, None)
+    return len(files)
+
+
 def initalize_oggm(logging_level="CRITICAL"):
     """Initialize OGGM parameters.
 
@@ -72,11 +200,22 @@ def initalize_oggm(logging_level="CRITICAL"):
     -------
     none
     """
+    from oggm import cfg
     cfg.initialize_minimal(logging_level=logging_level)
 
 
-def set_params(figsize=(9, 6)):
+def _init_oggm():
+    """Initialize OGGM the first time it is needed, unless the user already
+    did it."""
+    from oggm import cfg
+    if not cfg.IS_INITIALIZED:
+        initalize_oggm()
+
+
+def set_params(figsize=(9, 6), graphics_dir=None):
     PARAMS['figsize'] = figsize
+    if graphics_dir is not None:
+        PARAMS['graphics_dir'] = graphics_dir
 
 
 def edu_plotter(func):
@@ -100,6 +239,8 @@ def edu_plotter(func):
         sns_axes_style="ticks",
         **kwargs,
     ):
+        import seaborn as sns
+
         if not figsize:
             figsize = PARAMS['figsize']
 
@@ -10,21 +10,21 @@ two other classes: the GlacierBed and the MassBalance.
 # Internals
 from oggm_edu.glacier_bed import GlacierBed
 from oggm_edu.mass_balance import MassBalance
-from oggm_edu.funcs import edu_plotter, cp_glen_a
+from oggm_edu.history import HistoryStore, HistoryFile
+from oggm_edu.equilibrium_cache import _shift_time
+from oggm_edu.funcs import cp_glen_a, _init_oggm
 
 # Other libraries
 import numpy as np
-import xarray as xr
 import pandas as pd
 import warnings
 import copy
-from itertools import cycle, count
-import re
-from collections.abc import Sequence
-
-# Plotting
-from matplotlib import pyplot as plt
-from matplotlib.patches import Patch
+import math
+import netCDF4
+import hashlib
+import os
+import pickle
+from itertools import count
 
 # Import OGGM things
 try:
@@ -35,6 +35,40 @@ except ImportError:
 from oggm.core.flowline import RectangularBedFlowline
 from oggm import cfg
 
+# The glaciers need the OGGM parameters.
+_init_oggm()
+
+
+class _AnnualMbModel(flowline_model):
+    """The OGGM flowline model, with a cheaper lookup of the annual mass
+    balance.
+
+    With the annual mass balance feedback the model computes the mass
+    balance once per year, but converts the time of every step to a date to
+    know if it has to. The conversion is the bulk of the cost of a step for
+    small glaciers, so we do it with scalar operations here.
+    """
+
+    def get_mb(self, heights, year=None, fl_id=None, fls=None):
+        if self.mb_elev_feedback != "annual" or fl_id is None:
+            return super().get_mb(heights, year=year, fl_id=fl_id, fls=fls)
+
+        # Same as utils.floatyear_to_date, without the month.
+        yr = math.ceil(year)
+        if abs(year - yr) > np.finfo(np.float64).eps * abs(yr):
+            yr = math.floor(year)
+        date = (yr, yr)
+
+        if self._mb_current_date != date:
+            # We need to reset all
+            self._mb_current_date = date
+            self._mb_current_out = dict()
+        if fl_id not in self._mb_current_out:
+            self._mb_current_out[fl_id] = self._mb_call(
+                heights, year=year, fl_id=fl_id, fls=fls
+            )
+        return self._mb_current_out[fl_id]
+
 
 class Glacier:
     """Provides the user with an easy way to create and perform experiments on
@@ -75,6 +109,8 @@ class Glacier:
     """
 
     _id_count = count(1)
+    # Versions of the current states, unique in the process.
+    _state_count = count()
 
     def __init__(self, bed, mass_balance, id=None):
         """Initialise a glacier object from a oggm_edu.GlacierBed and a oggm_edu.MassBalance.
@@ -138,9 +174,28 @@ class Glacier:
         self._history = None
         # Store the state history
         self._state_history = None
+        # Where to stream the history to, None keeps it in memory.
+        self._stream = None
+        # Which states to keep in the state history, and how.
+        self._retention = {"interval": 1, "dtype": None, "precision": None}
+        # Where and how often to save checkpoints, None for no checkpoints.
+        self._checkpoints = None
 
         # We want to save the eq. states.
         self._eq_states = {}
+        # And the metrics of the glacier at these states.
+        self._eq_metrics = {}
+
+    def __setattr__(self, name, value):
+        # The summary follows the current state, through its version.
+        if name == "_current_state":
+            super().__setattr__("_state_version", next(self._state_count))
+        super().__setattr__(name, value)
+
+    def __setstate__(self, state):
+        # Copies and glaciers from other processes get a new version.
+        self.__dict__.update(state)
+        self._state_version = next(self._state_count)
 
     def __repr__(self):
         """Pretty representation of the glacier object"""
@@ -179,9 +234,11 @@ class Glacier:
         # Surface height.
         self.surface_h = self.bed.bed_h
         # Forget history.
+        self._reset_stream()
         self._history = None
         self._state_history = None
         self._eq_states = {}
+        self._eq_metrics = {}
         # Age
         self._age = 0
         # Ice params.
@@ -196,7 +253,7 @@ class Glacier:
 
         # Do we have a state history yet?
         if self.state_history:
-            ice_vel = self.state_history.ice_velocity_myr.max().values
+            ice_vel = self.state_history.ice_velocity_myr.max().item()
         else:
             ice_vel = None
 
@@ -216,22 +273,131 @@ class Glacier:
         }
         return json
 
+    def _summary_key(self):
+        """Key of what the summary of the glacier depends on, cheap to
+        compute. The summary is the same as long as the key is."""
+        return (
+            type(self),
+            self.id,
+            self.age,
+            self._state_version,
+            len(self._eq_states),
+            self.creep,
+            self.basal_sliding,
+            repr(self.bed._to_json()),
+            repr(self.mass_balance._to_json()),
+        )
+
     def copy(self, id=None):
         """Return a copy of the glacier. Useful for quickly creating
         new glaciers. It does assign a new id to the glacier.
 
+        The copy is cheap: the bed arrays and the history are shared with the
+        original glacier until one of them changes. The shared bed arrays are
+        made read-only.
+
         Parameters
         ----------
         id : str, optional
             The id of the new glacier.
         """
-        copied_glacier = copy.deepcopy(self)
+        copied_glacier = copy.copy(self)
+        # Setting attributes of the bed does not affect the other glacier.
+        copied_glacier.bed = copy.copy(self.bed)
+        for value in vars(self.bed).values():
+            if isinstance(value, np.ndarray):
+                value.flags.writeable = False
+        copied_glacier._mass_balance = self.mass_balance._copy()
+        if self._history is not None:
+            copied_glacier._history = self._history.copy()
+            copied_glacier._state_history = self._state_history.copy()
+        copied_glacier._eq_states = dict(self._eq_states)
+        copied_glacier._eq_metrics = dict(self._eq_metrics)
+        # The copy keeps its history in memory, not in our file.
+        copied_glacier._stream = None
+        # The model works on the mass balance of the original glacier.
+        copied_glacier._model_state = None
         if id is None:
             copied_glacier.id = str(next(self._id_count))
         else:
             copied_glacier.id = id
         return copied_glacier
 
+    def _progress_task(self):
+        """Light copy of the glacier, without its history and with only the
+        future part of the climate. This is what is sent to worker processes
+        when progressing a GlacierCollection.
+        """
+        task = copy.copy(self)
+        if self._stream is None:
+            task._history = None
+            task._state_history = None
+        else:
+            # The task appends to our file, in chunks. It can't be written
+            # while we read it.
+            for store in [self._history, self._state_history]:
+                if store is not None:
+                    store.close()
+        task._model_state = None
+        task._eq_states = {}
+        task._eq_metrics = {}
+        task._mass_balance = self.mass_balance._climate_slice(self.age)
+        # Remember what the parent already knows about the climate.
+        task._climate_end = task.mass_balance._temp_bias_last_year
+        return task
+
+    def _progress_delta(self):
+        """What changed on a progressed task from ``_progress_task``: the new
+        part of the history, the final state and the updated mass balance.
+        The history of a glacier streaming it is in its file, only the stores
+        are sent back.
+        """
+        delta = {
+            "current_state": self.current_state,
+            "age": self.age,
+            "eq_states": self._eq_states,
+            "eq_metrics": self._eq_metrics,
+            "mass_balance": self.mass_balance._climate_delta(self._climate_end),
+        }
+        if self._stream is None:
+            delta["history"] = self.history
+            delta["state_history"] = self.state_history
+        else:
+            delta["stores"] = (self._history, self._state_history)
+        return delta
+
+    def _merge_progress(self, delta):
+        """Update the glacier in place with a delta from ``_progress_delta``.
+
+        Parameters
+        ----------
+        delta : dict
+            Delta produced by a progressed task of this glacier.
+        """
+        # Nothing happened, e.g. the glacier outgrew its domain.
+        if delta["age"] == self.age:
+            return
+        if "stores" in delta:
+            # The task wrote to our file.
+            self._history, self._state_history = delta["stores"]
+        else:
+            # The setters append to the existing history.
+            self.history = delta["history"]
+            # The task kept the states following our retention policy.
+            self._add_states(delta["state_history"], thin=False)
+        self._current_state = delta["current_state"]
+        # The model stayed with the worker.
+        self._model_state = None
+        self.age = delta["age"]
+        self._eq_states.update(delta["eq_states"])
+        # The task did not know the earlier eq. states, the response times
+        # need the history of the glacier.
+        for year, metrics in delta["eq_metrics"].items():
+            self._eq_metrics[year] = dict(
+                metrics, response_time=self._eq_response_time(year)
+            )
+        self.mass_balance._merge_climate(delta["mass_balance"])
+
     def _init_flowline(self):
         # Initialise a RectangularBedFlowline for the glacier.
         return RectangularBedFlowline(
@@ -240,6 +406,16 @@ class Glacier:
             widths=self.bed.widths,
             map_dx=self.bed.map_dx,
         )
+
+    def _flowline_from_thick(self, thick):
+        """A flowline on the bed of the glacier with the given ice thickness."""
+        return RectangularBedFlowline(
+            surface_h=self.bed.bed_h + thick,
+            bed_h=self.bed.bed_h,
+            widths=self.bed.widths,
+            map_dx=self.bed.map_dx,
+        )
+
     @property
     def id(self):
         """The id property."""
@@ -314,28 +490,145 @@ class Glacier:
         """The history of the glacier. Contains the history of notably
         the length, area and volume of the glacier.
         """
-        return self._history
+        if self._history is None:
+            return None
+        return self._history.to_dataset()
 
     @property
     def state_history(self):
         """The state history of the glacier, i.e. geometrical changes over time.
         For instance ice thickness.
         """
-        return self._state_history
+        if self._state_history is None:
+            return None
+        return self._state_history.to_dataset()
 
     @state_history.setter
     def state_history(self, obj):
         """Setting/updating the state history"""
+        self._add_states(obj)
+
+    def _add_states(self, ds, last=True, thin=True):
+        """Add the states of a run to the state history, following the
+        retention policy.
+
+        Parameters
+        ----------
+        ds : xarray.Dataset
+            State history of the run.
+        last : bool, optional
+            Whether the last year of the dataset is the end of a progression,
+            which is always kept. True by default.
+        thin : bool, optional
+            Whether to thin out the states with the retention interval.
+            False for states which already were, e.g. those of another
+            store or of a worker. They are still stored with the dtype and
+            precision of the policy. True by default.
+        """
+        ds = self._retained(ds, last, thin=thin)
+        if not ds.sizes["time"]:
+            return
         # Is there any state history yet?
-        if self.state_history is None:
-            self._state_history = obj
+        if self._state_history is None:
+            self._state_history = self._new_store(ds, "state_history")
         # If there is, append instead.
         else:
-            # We slice the new series because we dont need the first year.
-            self._state_history = xr.combine_by_coords(
-                [self.state_history.isel(time=slice(0, -1)), obj],
-                combine_attrs="override",
+            # The new series replaces the last year, it starts there.
+            self._state_history.append(ds)
+
+    def _retained(self, ds, last=True, first=None, thin=True):
+        """The part of a state history kept by the retention policy.
+
+        ``first`` tells if the first year of the dataset starts the state
+        history, by default if there is no state history yet.
+        """
+        if first is None:
+            first = self._state_history is None
+        interval = self._retention["interval"]
+        if thin and interval != 1:
+            time = ds.time.values
+            if interval is None:
+                keep = np.zeros(len(time), dtype=bool)
+                # The first year is only a boundary for a new history.
+                keep[:1] = first
+            else:
+                keep = time % interval == 0
+            if last:
+                keep[-1:] = True
+            ds = ds.isel(time=keep)
+
+        dtype = self._retention["dtype"]
+        if dtype is not None:
+            ds = ds.copy()
+            for name, var in ds.data_vars.items():
+                if "time" in var.dims and var.dtype.kind == "f":
+                    ds[name] = var.astype(dtype)
+
+        precision = self._retention["precision"]
+        if precision is not None:
+            codes = np.round(ds.thickness_m.values / precision)
+            if codes.size and codes.max() > np.iinfo(np.uint16).max:
+                raise ValueError(
+                    "Ice thickness too large to be quantized with a precision "
+                    f"of {precision} m, use a larger precision."
+                )
+            thick = ds.thickness_m.copy(data=codes.astype(np.uint16))
+            ds = ds.assign(thickness_m=thick.assign_attrs(scale_factor=precision))
+        return ds
+
+    def set_state_history_retention(self, interval=1, dtype=None, precision=None):
+        """Choose which states of the glacier are kept in the state history,
+        and how they are stored. Applies to the states added from now on.
+
+        The state history holds the ice thickness, area, volume and velocity
+        along the whole glacier, for every year by default. For long runs,
+        keeping fewer of them, with less precision, saves a lot of memory.
+        The history (length, area, volume...) is not affected.
+
+        Parameters
+        ----------
+        interval : int or None, optional
+            Keep the states of the years which are multiples of the interval.
+            None keeps only the states at the start and end of each
+            progression, e.g. the equilibrium states. The state at the end of
+            a progression is always kept. 1 by default, i.e. every year.
+        dtype : str or numpy.dtype, optional
+            Floating point type of the stored states, e.g. "float32".
+            None keeps the type of the model output, float64.
+        precision : float, optional
+            Store the ice thickness as 16 bit integers, as multiples of the
+            precision [m]. The largest thickness which can be stored is
+            65535 times the precision.
+
+        Notes
+        -----
+        The states already kept are stored again with the new dtype and
+        precision. This is not possible for a state history streamed to a
+        file, set them before stream_history.
+        """
+        if interval is not None and (not isinstance(interval, int) or interval < 1):
+            raise ValueError("interval should be None or an integer above 0.")
+        if dtype is not None:
+            dtype = np.dtype(dtype)
+            if dtype.kind != "f":
+                raise ValueError("dtype should be a floating point type.")
+        if precision is not None and not precision > 0:
+            raise ValueError("precision should be above 0.")
+        retention = {"interval": interval, "dtype": dtype, "precision": precision}
+        # One store holds the states with one encoding.
+        encoding = self._retention["dtype"], self._retention["precision"]
+        if self._state_history is None or encoding == (dtype, precision):
+            self._retention = retention
+            return
+        if self._stream is not None:
+            raise ValueError(
+                "The dtype and precision of a streamed state history can not "
+                "be changed, set them before stream_history."
             )
+        states = self.state_history
+        self._retention = retention
+        self._state_history = None
+        self._add_states(states, thin=False)
 
     @property
     def basal_sliding(self):
@@ -434,14 +727,182 @@ class Glacier:
         we add it. If the glacier already has some history, we append it."""
         # Does it have any history?
         if self._history is None:
-            self._history = obj
+            self._history = self._new_store(obj, "history")
         # Append the history.
         else:
-            # We slice the new series because we dont need the first year.
-            self._history = xr.combine_by_coords(
-                [self.history.isel(time=slice(0, -1)), obj],
-                combine_attrs="override",
-            )
+            # The new series replaces the last year, it starts there.
+            self._history.append(obj)
+
+    def _new_store(self, ds, group):
+        """Store for the history or the state history, in memory or in the
+        file the history is streamed to."""
+        if self._stream is None:
+            return HistoryStore(ds)
+        return HistoryFile(ds, self._stream["path"], group)
+
+    def _reset_stream(self):
+        """Start over with an empty file, if the history is streamed."""
+        if self._stream is None:
+            return
+        for store in [self._history, self._state_history]:
+            if store is not None:
+                store.close()
+        netCDF4.Dataset(self._stream["path"], "w").close()
+
+    def stream_history(self, path, chunk=100):
+        """Write the history and the state history of the glacier to a netCDF
+        file, instead of keeping them in memory.
+
+        The history already there is moved to the file, in the groups
+        ``history`` and ``state_history``. From then on, progress_to_year runs
+        the model in chunks of years and appends each of them to the file,
+        so the memory used does not grow with the age of the glacier.
+        ``history``, ``state_history`` and the plots read the file lazily.
+        Use set_state_history_retention to write fewer states. Glaciers of a
+        GlacierCollection write to their file from the worker processes.
+        The adaptive equilibrium search keeps the states it runs through in
+        memory until it ends, thinned out by the retention policy.
+
+        Parameters
+        ----------
+        path : str
+            Path of the netCDF file. An existing file is overwritten.
+        chunk : int, optional
+            Number of years of output held in memory when progressing the
+            glacier. 100 by default.
+        """
+        if not isinstance(chunk, int) or chunk < 1:
+            raise ValueError("chunk should be an integer above 0.")
+        # Read what we have before the file is overwritten.
+        stores = [self._history, self._state_history]
+        if self._history is not None:
+            stores = [store.copy() for store in stores]
+        if self._stream is not None and self._history is not None:
+            self._history.close()
+            self._state_history.close()
+        self._stream = {"path": path, "chunk": chunk}
+        netCDF4.Dataset(path, "w").close()
+        self._history = self._state_history = None
+        if stores[0] is not None:
+            self.history = stores[0].to_dataset()
+            # The states were thinned out when they were added.
+            self._add_states(stores[1].to_dataset(), thin=False)
+
+    def set_checkpoints(self, path, interval=100):
+        """Save checkpoints of the glacier to a directory while it progresses,
+        to resume runs which were interrupted.
+
+        progress_to_year and progress_to_equilibrium run the model in chunks
+        of ``interval`` years and save the glacier after each of them: its
+        flowline, age, mass balance and history, and where the equilibrium
+        search is. When they are called again on the same glacier, e.g.
+        after re-creating it in a new session, they continue from the last
+        checkpoint of the run instead of starting over. This also applies to
+        the glaciers of a GlacierCollection, which are progressed in worker
+        processes.
+
+        A checkpoint holds the whole history of the glacier, unless it is
+        streamed to a file with stream_history. The adaptive search and the
+        search with a cache do not save checkpoints.
+
+        Parameters
+        ----------
+        path : str or None
+            Directory in which to save the checkpoints, created if it does
+            not exist. None stops saving checkpoints.
+        interval : int, optional
+            Number of years between two checkpoints. 100 by default.
+        """
+        if path is None:
+            self._checkpoints = None
+            return
+        if not isinstance(interval, int) or interval < 1:
+            raise ValueError("interval should be an integer above 0.")
+        os.makedirs(path, exist_ok=True)
+        self._checkpoints = {"path": path, "interval": interval}
+
+    def _chunk_ends(self, year):
+        """Years at which the model stops before ``year``, to write the
+        history to its file or to save a checkpoint."""
+        steps = []
+        if self._stream is not None:
+            steps.append(self._stream["chunk"])
+        if self._checkpoints is not None:
+            steps.append(self._checkpoints["interval"])
+        # Chunks end at multiples of their length.
+        ends = {year}
+        for step in steps:
+            ends.update(range((self.age // step + 1) * step, year, step))
+        return sorted(ends)
+
+    def _checkpoint_file(self, key):
+        return os.path.join(self._checkpoints["path"], f"checkpoint_{key}.pkl")
+
+    def _resume(self, *run):
+        """Resume a run from its checkpoint, if there is one.
+
+        Runs are identified by the method and its arguments, and by the
+        glacier at the start of the run.
+
+        Parameters
+        ----------
+        *run
+            Name and arguments of the method.
+
+        Returns
+        -------
+        key : str or None
+            Key of the run, None if no checkpoints are saved.
+        search : dict or None
+            State of the equilibrium search saved with the checkpoint.
+        """
+        if self._checkpoints is None:
+            return None, None
+        h = hashlib.blake2b(
+            repr((run, self._to_json(), self.mass_balance._to_json())).encode(),
+            digest_size=16,
+        )
+        h.update(self.bed.fingerprint.encode())
+        h.update(np.ascontiguousarray(self._state().thick, dtype=float).tobytes())
+        h.update(self.mass_balance._temp_bias_series.to_numpy(dtype=float).tobytes())
+        key = h.hexdigest()
+
+        file = self._checkpoint_file(key)
+        if not os.path.exists(file):
+            return key, None
+        with open(file, "rb") as f:
+            checkpoint = pickle.load(f)
+        state = checkpoint["glacier"]
+        # Keep our settings, the model is not saved.
+        state["_checkpoints"] = self._checkpoints
+        state["_model_state"] = None
+        self.__dict__.update(state)
+        # The state comes from another process, give it a new version.
+        self._state_version = next(self._state_count)
+        return key, checkpoint["search"]
+
+    def _save_checkpoint(self, key, last, search=None):
+        """Save a checkpoint of the run, if it is time to.
+
+        Parameters
+        ----------
+        key : str or None
+            Key of the run from ``Glacier._resume``.
+        last : bool
+            Whether this is the end of the run.
+        search : dict, optional
+            State of the equilibrium search.
+        """
+        if key is None or not (last or self.age % self._checkpoints["interval"] == 0):
+            return
+        state = dict(vars(self))
+        del state["_checkpoints"]
+        del state["_model_state"]
+        file = self._checkpoint_file(key)
+        # Replace the previous checkpoint only once this one is complete.
+        with open(file + ".tmp", "wb") as f:
+            pickle.dump({"glacier": state, "search": search}, f)
+        os.replace(file + ".tmp", file)
 
     @property
     def eq_states(self):
@@ -456,34 +917,52 @@ class Glacier:
         """The response time of the glacier.
 
         Calculates the volume response time from Oerlemans based on the
-        two latest eq. states.
+        two latest eq. states. It is computed when the eq. state is reached.
         """
-
         # If we don't have a eq. states yet
         if len(self._eq_states) < 2:
             return np.nan
-        else:
-            # We calculate the response time when we need it.
-            # Not sure if this is stupid but.
-            # Get the eq state years.
-            year_final = list(self.eq_states)[-1]
-            year_initial = list(self.eq_states)[-2]
-            # Final eq. volume
-            v_final = self.history.volume_m3.sel(time=year_final)
-            # Initial volume
-            v_initial = self.history.volume_m3.sel(time=year_initial)
-            # Volume difference
-            v_diff = v_final - (v_final - v_initial) / np.e
-            # Find the year where volume is closest to the v_diff.
-            all_vol_diff = np.abs(
-                self.history.volume_m3.sel(time=slice(year_initial, year_final))
-                - v_diff
-            )
-            # Get the index
-            idx = all_vol_diff.argmin()
-            # Response time
-            response_time = all_vol_diff.time.isel(time=idx) - year_initial
-            return response_time.values.item()
+        return self._eq_metrics[list(self._eq_states)[-1]]["response_time"]
+
+    def _eq_response_time(self, year_final):
+        """Volume response time between an eq. state and the one before.
+
+        Parameters
+        ----------
+        year_final : int
+            Year of the eq. state.
+        """
+        years = list(self._eq_states)
+        idx = years.index(year_final)
+        # If we don't have a previous eq. state
+        if idx == 0:
+            return np.nan
+        year_initial = years[idx - 1]
+        volume = self.history.volume_m3.sel(time=slice(year_initial, year_final))
+        # Final eq. volume
+        v_final = volume.values[-1]
+        # Initial volume
+        v_initial = volume.values[0]
+        # Volume difference
+        v_diff = v_final - (v_final - v_initial) / np.e
+        # Find the year where volume is closest to the v_diff.
+        idx = np.abs(volume.values - v_diff).argmin()
+        # Response time
+        return (volume.time.values[idx] - year_initial).item()
+
+    def _record_eq_state(self):
+        """Remember the current state as an eq. state, along with the
+        metrics of the glacier at this state."""
+        self._eq_states[self.age] = self.mass_balance.ela_h
+        self._eq_metrics[self.age] = {
+            "response_time": self._eq_response_time(self.age),
+            "accumulation_area_ratio": self.accumulation_area_ratio,
+            # Not defined without ice.
+            "specific_mass_balance": (
+                self.specific_mass_balance if np.any(self._state().thick > 0)
+                else np.nan
+            ),
+        }
 
     @property
     def accumulation_area_ratio(self):
@@ -560,31 +1039,74 @@ class Glacier:
 
         # If all passes
         else:
-            # Check if we have a current state already.
-            state = self._state()
-            # Initialise the model
-            model = flowline_model(
-                state,
-                mb_model=self.mass_balance,
-                y0=self.age,
-                glen_a=self.creep,
-                fs=self.basal_sliding,
-            )
-            # Run the model. Store the history.
+            key, resumed = self._resume("progress_to_year", year)
+            # The checkpoint can be the end of the run.
+            if self.age >= year:
+                return
             try:
-                out = model.run_until_and_store(year, fl_diag_path=None)
+                for last in self._run_chunks(year, resumed=resumed is not None):
+                    self._save_checkpoint(key, last)
             # If it fails, see above.
             except RuntimeError:
                 raise RuntimeError("Glacier outgrew its domain and had to stop.")
 
+    def _run_chunks(self, year, stop_criterion=None, stopped=None, resumed=False):
+        """Run the model from the current state of the glacier until a year,
+        in chunks if the history is streamed to a file or checkpoints are
+        saved. The glacier is updated after each chunk.
+
+        Each chunk gets a new model starting where the previous one stopped,
+        the result is the same as a single run.
+
+        Parameters
+        ----------
+        year : int
+            Year until which to run the model.
+        stop_criterion : callable, optional
+            Stop criterion of the model run.
+        stopped : callable, optional
+            Tells if the stop criterion stopped the run.
+        resumed : bool, optional
+            Whether the run continues an earlier one, whose last year is
+            already in the history.
+
+        Yields
+        ------
+        bool
+            After each chunk, whether it is the last one.
+        """
+        fs = self.basal_sliding
+        for i, end in enumerate(self._chunk_ends(year)):
+            model = flowline_model(
+                self._state(),
+                mb_model=self.mass_balance,
+                y0=self.age,
+                glen_a=self.creep,
+                fs=fs,
+            )
+            out = model.run_until_and_store(
+                end, fl_diag_path=None, stop_criterion=stop_criterion
+            )
+            history, state_history = out[0], out[1][0]
+            # A chunk starts with the last year of the previous one.
+            if i > 0 or resumed:
+                history = history.isel(time=slice(1, None))
+                state_history = state_history.isel(time=slice(1, None))
+            last = end == year or (stopped is not None and stopped())
             # Update attributes.
-            self.history = out[0]
-            self.state_history = out[1][0]
+            self.history = history
+            self._add_states(state_history, last=last)
             self._current_state = model.fls[0]
             self._model_state = model
             self.age = model.yr
+            # The stop criterion can change the sliding, e.g. for surges.
+            fs = model.fs
+            yield last
+            if last:
+                return
 
-    def progress_to_equilibrium(self, years=2500, t_rate=0.0001):
+    def progress_to_equilibrium(self, years=2500, t_rate=0.0001, adaptive=False,
+                                cache=None):
         """Progress the glacier to equilibrium.
 
         Parameters
@@ -595,11 +1117,19 @@ class Glacier:
         t_rate : float, optional
             Specify how slow the glacier is allowed to change without
             reaching equilibrium.
+        adaptive : bool, optional
+            Run the model in chunks of years whose length adapts to how
+            fast the glacier changes, instead of checking for equilibrium
+            after every year. Gives the same equilibrium year and state,
+            faster. False by default.
+        cache : oggm_edu.EquilibriumCache, optional
+            Cache of equilibrium states. If the same search was already done,
+            the glacier gets the cached result instead of running the model.
         """
 
-        def stop_function(model, previous_state):
-            """Function to stop the simulation when equilbrium is
-            reached. Basically a re-shape of the criterium of
+        def check_state(volume, previous_state):
+            """Check if the glacier has reached equilibrium, given its volume
+            this year. Basically a re-shape of the criterium of
             run_until_equilibrium."""
             # We don't stop unless
             stop = False
@@ -621,7 +1151,7 @@ class Glacier:
                     # Increase iterations.
                     previous_state["ite"] += 1
                     # Get the current volume
-                    v_af = model.volume_m3
+                    v_af = volume
                     # If volume before is close to zero, update counter.
                     if np.isclose(previous_state["v_bef"], 0, atol=1):
                         previous_state["was_close_zero"] += 1
@@ -649,266 +1179,330 @@ class Glacier:
                     "ite": 0,
                     "was_close_zero": 0,
                     "t_rate": 1,
-                    "v_bef": model.volume_m3,
+                    "v_bef": volume,
                 }
 
             return stop, previous_state
 
+        # State of the search, kept across the chunks of the run.
+        search = {"state": None, "checked": None, "stop": False}
+
+        def stop_function(model, previous_state):
+            """Function to stop the simulation when equilbrium is
+            reached."""
+            # A chunk starts with the last year of the previous one.
+            if model.yr == search["checked"]:
+                return False, previous_state
+            search["checked"] = model.yr
+            search["stop"], search["state"] = check_state(
+                model.volume_m3, search["state"]
+            )
+            return search["stop"], search["state"]
+
         # Do we have a future temperature changes assigned?
-        if self.age < self.mass_balance._temp_bias_series.year.iloc[-1]:
-            # If so, progress normally until finished.
-            self.progress_to_year(self.mass_balance._temp_bias_series.year.iloc[-1])
+        self._progress_scenario()
+
+        if cache is not None:
+            key = self._equilibrium_lookup(cache, years, t_rate)
+            # Cache hit.
+            if key is None:
+                return
+            start_age = self.age
+            self.progress_to_equilibrium(years=years, t_rate=t_rate, adaptive=adaptive)
+            # Only cache if the search did not fail.
+            if self.age > start_age:
+                cache.put(key, self._equilibrium_entry(start_age, years, cache, t_rate))
+            return
+
+        if adaptive:
+            self._adaptive_equilibrium(years, t_rate, check_state)
+            return
+
+        key, resumed = self._resume("progress_to_equilibrium", years, t_rate)
+        if resumed is not None:
+            search.update(resumed)
+            # The checkpoint is the end of the search.
+            if search["stop"] or self.age >= years:
+                return
+
         # Then we can find the eq. state.
-        # Initialise the model
-        state = self._state()
-        model = flowline_model(
-            state,
-            mb_model=self.mass_balance,
-            y0=self.age,
-            glen_a=self.creep,
-            fs=self.basal_sliding,
-        )
-        # Run the model.
         try:
-            #  Run with a stopping criteria.
-            out = model.run_until_and_store(
-                years, fl_diag_path=None, stop_criterion=stop_function
+            chunks = self._run_chunks(
+                years,
+                stop_criterion=stop_function,
+                stopped=lambda: search["stop"],
+                resumed=resumed is not None,
             )
+            for last in chunks:
+                if last:
+                    # Remember the eq. year
+                    self._record_eq_state()
+                self._save_checkpoint(key, last, dict(search))
 
         except RuntimeError:
             # We chose to print and return instead of raising since the
             # collection will then be able to continue.
             msg = "Glacier grew out of its domain before reaching an equilibrium state."
             warnings.warn(msg)
-            return
 
-        # Update attributes.
-        self.history = out[0]
-        self.state_history = out[1][0]
-        self._current_state = model.fls[0]
-        self.age = model.yr
-        self._model_state = model
-        # Remember the eq. year
-        self._eq_states[self.age] = self.mass_balance.ela_h
+    def _progress_scenario(self):
+        """Progress the glacier until the end of its temperature bias scenario."""
+        # Do we have a future temperature changes assigned?
+        if self.age < self.mass_balance._temp_bias_series.year.iloc[-1]:
+            # If so, progress normally until finished.
+            self.progress_to_year(self.mass_balance._temp_bias_series.year.iloc[-1])
 
-    def _decide_xlim(self):
-        return self.bed._decide_xlim()
+    def _equilibrium_lookup(self, cache, years, t_rate):
+        """Look for the equilibrium search of the glacier in a cache. On a hit
+        the glacier is updated with the cached result.
 
-    def _decide_ylim(self):
-        return self.bed.bottom, self.current_state.surface_h[0] + 200
+        Parameters
+        ----------
+        cache : oggm_edu.EquilibriumCache
+            The cache.
+        years : int
+            ``years`` argument of the search.
+        t_rate : float
+            ``t_rate`` argument of the search.
+
+        Returns
+        -------
+        The key to store the result of the search under, None on a hit.
+        """
+        def valid(entry):
+            """Would the search have found the same, with the years left,
+            and kept the same states?"""
+            if entry is None or entry["duration"] > years - self.age:
+                return False
+            if entry["ran_out"] and entry["duration"] != years - self.age:
+                return False
+            # The states are replayed as they were kept.
+            if entry.get("retention") != self._retention:
+                return False
+            interval = self._retention["interval"]
+            if interval is None or interval == 1:
+                return True
+            return (self.age - entry["start_age"]) % interval == 0
+
+        key = cache.key(self, t_rate)
+        entry = cache.get(key)
+        # Start a new glacier from the closest known eq. state.
+        if not valid(entry) and cache.warm_start and self._history is None:
+            nearest = cache.nearest(self, t_rate)
+            if nearest is not None:
+                self._current_state = self._flowline_from_thick(nearest["thick"])
+                key = cache.key(self, t_rate)
+                entry = cache.get(key)
+        if not valid(entry):
+            return key
+
+        # Append the cached run to the glacier.
+        self.history = _shift_time(entry["history"], self.age)
+        self._add_states(_shift_time(entry["state_history"], self.age), thin=False)
+        self._current_state = self._flowline_from_thick(entry["thick"])
+        self._model_state = None
+        self.age = self.age + entry["duration"]
+        # The climate stays constant during the search.
+        mb = self.mass_balance
+        while mb._temp_bias_last_year < self.age:
+            mb._append_temp_bias(mb.temp_bias)
+        self._record_eq_state()
+        return None
 
-    @edu_plotter
-    def plot(self, axes=None, title_number=None):
-        """Plot the current state of the glacier."""
-
-        title = None
-        if title_number is not None:
-            title = ''
-        _, ax1, ax2 = self.bed._create_base_plot(axes=axes, title=title)
-
-        # If we have a current state, plot it.
-        if self.current_state is not None:
-            # Some masking shenanigans
-            diff = self.current_state.surface_h - self.bed.bed_h
-            mask = diff > 0
-            idx = diff.argmin()
-            mask[: idx + 1] = True
-            # Fill the glacier.
-            ax1.fill_between(
-                self.bed.distance_along_glacier,
-                self.bed.bed_h,
-                self.current_state.surface_h,
-                where=mask,
-                color="white",
-                lw=2,
-            )
-            # Add outline
-            ax1.plot(
-                self.bed.distance_along_glacier[mask],
-                self.current_state.surface_h[mask],
-                lw=2,
-                label="Current glacier outline",
-            )
-            # Fill in the glacier in the topdown view.
-            # Where does the glacier have thickness?
-            filled = np.where(self.current_state.thick > 0, self.bed.widths, 0)
-            # Fill between them
-            ax2.fill_between(
-                self.bed.distance_along_glacier,
-                -filled / 2 * self.bed.map_dx,
-                filled / 2 * self.bed.map_dx,
-                where=filled > 0,
-                color="white",
-                edgecolor="C0",
-                lw=2,
-            )
-            ax1.set_ylim(self._decide_ylim())
-
-        # ELA
-        if self.ela is not None:
-            ax1.axhline(self.ela, ls="--", c="k", lw=1)
-            ax1.text(
-                self.bed.distance_along_glacier[-1],
-                self.ela + 10,
-                "ELA",
-                horizontalalignment="right",
-                verticalalignment="bottom",
-            )
-            # Where along the bed is the ELA? Convert height to
-            # distance along glacier kind of.
-            if self.current_state is not None:
-                idx = (np.abs(self.current_state.surface_h - self.ela)).argmin()
-                # Plot the ELA in top down
-                ax2.vlines(
-                    self.bed.distance_along_glacier[idx],
-                    ymin=-self.bed.widths[idx] / 2 * self.bed.map_dx,
-                    ymax=self.bed.widths[idx] / 2 * self.bed.map_dx,
-                    color="k",
-                    ls="--",
-                    lw=1,
-                )
-            # If we don't have a state yet, plot the ELA on the bed.
-            else:
-                # Where is the ela in regards to the bed height?
-                idx = (np.abs(self.bed.bed_h - self.ela)).argmin()
-                # Add vertical line.
-                ax2.vlines(
-                    self.bed.distance_along_glacier[idx],
-                    ymin=-self.bed.widths[idx] / 2 * self.bed.map_dx,
-                    ymax=self.bed.widths[idx] / 2 * self.bed.map_dx,
-                    color="k",
-                    ls="--",
-                    lw=1,
-                )
+    def _equilibrium_entry(self, start_age, years, cache, t_rate):
+        """Cache entry of an equilibrium search, see EquilibriumCache.
 
-        # Decorations
-        if title_number is None:
-            title = f"Glacier state at year {int(self.age)}"
-        else:
-            title = f"Glacier {title_number}: state at year {int(self.age)}"
-        ax1.set_title(title, loc='left')
-        ax1.legend(loc="lower left")
-        ax2.set_xlabel("Distance along glacier [km]")
-
-    @edu_plotter
-    def plot_mass_balance(self):
-        """Plot the mass balance profile of the glacier."""
-        f, ax = plt.subplots()
-        ax.plot(
-            self.annual_mass_balance,
-            self.bed.bed_h,
-            label="Mass balance",
-            c="tab:orange",
-        )
-        ax.set_xlabel("Annual mass balance [m yr-1]")
-        ax.set_ylabel("Altitude [m]")
-
-        # Add ELA and 0 lines.
-        ax.axvline(x=0, ls="--", lw=0.8, label="Mass balance = 0", c="tab:green")
-        ax.axhline(y=self.ela, ls="--", lw=0.8, label="ELA", c="tab:blue")
-        ax.set_title("Mass balance profile")
-        ax.legend()
-
-    def _create_history_plot_components(
-        self, show_bias=False, window=None, time_range=None, invert=False
-    ):
-        """Create components for the history plot of the glacier."""
-
-        if show_bias:
-            fig, (ax1, ax2, ax3, ax4) = plt.subplots(nrows=4, sharex=True)
-        else:
-            fig, (ax1, ax2, ax3) = plt.subplots(nrows=3, sharex=True)
-
-        # First point to all data.
-        data = self.history
-        bias_series = self.mass_balance.temp_bias_series
-        # If the user supplied a time_range.
-        if isinstance(time_range, Sequence):
-            if time_range[0] >= self.age:
-                raise ValueError(
-                    "Lower end of time_range should be before age of glacier."
-                )
-            # Select data from time range only.
-            data = self.history.sel(time=slice(time_range[0], time_range[1]))
-            bias_series = bias_series.loc[
-                (bias_series["year"] >= time_range[0])
-                & (bias_series["year"] <= time_range[1])
-            ]
+        Parameters
+        ----------
+        start_age : int
+            Age of the glacier at the start of the search.
+        years : int
+            ``years`` argument of the search.
+        cache : oggm_edu.EquilibriumCache
+            The cache the entry is for.
+        t_rate : float
+            ``t_rate`` argument of the search.
+        """
+        return {
+            "duration": self.age - start_age,
+            "ran_out": self.age >= years,
+            "history": _shift_time(
+                self.history.sel(time=slice(start_age, None)).copy(deep=True),
+                -start_age,
+            ),
+            "state_history": _shift_time(
+                self.state_history.sel(time=slice(start_age, None)).copy(deep=True),
+                -start_age,
+            ),
+            "thick": self.current_state.thick.copy(),
+            # Which states were kept, and the year they were kept from.
+            "retention": dict(self._retention),
+            "start_age": start_age,
+            # Used to find warm starts.
+            "family": cache._family(self, t_rate),
+            "mb_profile": self.mass_balance.get_annual_mb(self.bed.bed_h),
+        }
 
-        # Plot the length, volume and area if we have a history.
-        if self.history is not None:
-            data.length_m.plot(ax=ax1)
-            data.volume_m3.plot(ax=ax2)
-            data.area_m2.plot(ax=ax3)
-        # If not, we print a message along with the empty plot.
-        else:
-            print("Glacier has no history yet, try progressing the glacier.")
-        # Labels and such.
-        ax1.set_xlabel("")
-        ax1.set_title(f"Glacier history at year {int(self.age)}")
-        ax1.annotate(
-            "Glacier length",
-            (0.98, 0.1),
-            xycoords="axes fraction",
-            bbox={"boxstyle": "Round", "color": "lightgrey"},
-            ha="right",
-        )
-        ax1.set_ylabel("Length [m]")
-        # Volume labels.
-        ax2.set_xlabel("")
-        ax2.annotate(
-            "Glacier volume",
-            (0.98, 0.1),
-            xycoords="axes fraction",
-            bbox={"boxstyle": "Round", "color": "lightgrey"},
-            ha="right",
-        )
-        ax2.set_ylabel("Volume [m$^3$]")
-        # Area labels.
-        ax3.set_xlabel("Year")
-        ax3.annotate(
-            "Glacier area",
-            (0.98, 0.1),
-            xycoords="axes fraction",
-            bbox={"boxstyle": "Round", "color": "lightgrey"},
-            ha="right",
+    def _adaptive_equilibrium(self, years, t_rate, check_state, window=30,
+                              min_stride=8, max_stride=64):
+        """Adaptive search of the equilibrium state, see progress_to_equilibrium.
+
+        The model runs in chunks of years. The stride doubles while the
+        glacier is far from equilibrium. Closer to it, the chunks end at the
+        equilibrium year predicted by the trend of the yearly volume changes
+        over the last ``window`` years. All years of a chunk are then checked
+        with the same criterion as the yearly search, and if the equilibrium
+        was reached inside the chunk we rewind to it.
+
+        Parameters
+        ----------
+        years : int
+            Year until which we try to find an equilibrium state.
+        t_rate : float
+            How slow the glacier is allowed to change without reaching
+            equilibrium.
+        check_state : callable
+            The equilibrium criterion, taking the volume of the year and
+            the state of the search.
+        window : int, optional
+            Number of years used to fit the trend.
+        min_stride, max_stride : int, optional
+            Bounds of the number of years simulated between two checks.
+        """
+        model = _AnnualMbModel(
+            self._state(),
+            mb_model=self.mass_balance,
+            y0=self.age,
+            glen_a=self.creep,
+            fs=self.basal_sliding,
         )
-        ax3.set_ylabel("Area [m$^2$]")
-
-        # Grid
-        ax1.grid(True)
-        ax2.grid(True)
-        ax3.grid(True)
-
-        if show_bias and self.history:
-            window_str = ""
-            if window:
-                bias_series.bias.rolling(
-                    window, min_periods=0, center=True
-                ).mean().plot(ax=ax4)
-                window_str = f", {window} yr. mean"
+        history = state_history = None
+        # States of the last chunk, the rewind needs them all.
+        states = None
+        volumes = []
+        previous_state = None
+        eq_year = None
+        stride = 1
+        while eq_year is None and model.yr < years:
+            y1 = min(model.yr + stride, years)
+            try:
+                out = model.run_until_and_store(y1, fl_diag_path=None)
+            except RuntimeError:
+                # Same as the yearly search, let collections continue.
+                msg = "Glacier grew out of its domain before reaching an equilibrium state."
+                warnings.warn(msg)
+                return
+            # Chunks start with the last year of the previous one.
+            if history is None:
+                history = HistoryStore(out[0])
+                new = out[0].volume_m3.values
             else:
-                bias_series.bias.plot(ax=ax4)
-            ax4.grid(True)
-            ax4.set_xlabel("Year")
-            ax4.set_ylabel("Bias [°C]")
-
-            ax4.annotate(
-                "Temperature bias" + window_str,
-                (0.98, 0.1),
-                xycoords="axes fraction",
-                bbox={"boxstyle": "Round", "color": "lightgrey"},
-                ha="right",
-            )
-            if invert:
-                ax4.invert_yaxis()
+                history.append(out[0])
+                new = out[0].volume_m3.values[1:]
+                # The chunk before is complete, keep what the policy keeps.
+                state_history = self._add_chunk_states(state_history, states)
+            states = out[1][0].isel(time=slice(-len(new), None))
+
+            # Check the new years, as the yearly search would do.
+            for i, volume in enumerate(new):
+                stop, previous_state = check_state(volume, previous_state)
+                if stop:
+                    eq_year = int(y1) - len(new) + 1 + i
+                    break
+            volumes.extend(new)
+
+            # Trend of the yearly rate of change, fitted in log space.
+            prediction = None
+            v = np.asarray(volumes[-window - 1:])
+            if len(v) > window and np.all(v > 1):
+                rates = np.abs(np.diff(v)) / v[:-1]
+                if np.all(rates > 0):
+                    t = np.arange(window)
+                    slope, intercept = np.polyfit(t, np.log(rates), 1)
+                    if slope < 0:
+                        # Years until the rate is below t_rate.
+                        prediction = (np.log(t_rate) - intercept) / slope - t[-1]
+            if prediction is None:
+                stride = min(2 * stride, max_stride)
+            else:
+                stride = int(np.clip(np.ceil(prediction), min_stride, max_stride))
+
+        if eq_year is None:
+            eq_year = int(model.yr)
+        # Rewind to the eq. year if we went past it.
+        overshoot = int(model.yr) - eq_year
+        if overshoot > 0:
+            history.truncate(history.size - overshoot)
+            states = states.isel(time=slice(None, -overshoot))
+            thick = states.thickness_m.values[-1]
+            self._current_state = self._flowline_from_thick(thick)
+            self._model_state = None
+            # Forget the climate of the years we went past.
+            mb = self.mass_balance
+            mb._temp_bias_series = mb._temp_bias_series[
+                mb._temp_bias_series.year <= eq_year
+            ]
+            mb._update_temp_bias_lookup()
+        else:
+            self._current_state = model.fls[0]
+            self._model_state = model
+
+        state_history = self._add_chunk_states(state_history, states, last=True)
+
+        # Update attributes.
+        self.history = history.to_dataset()
+        self._add_states(state_history.to_dataset(), thin=False)
+        self.age = eq_year
+        # Remember the eq. year
+        self._record_eq_state()
 
-            return fig, ax1, ax2, ax3, ax4
+    def _add_chunk_states(self, store, ds, last=False):
+        """Add the states of a chunk of a search to the store of the search,
+        following the retention policy.
 
-        return fig, ax1, ax2, ax3
+        Parameters
+        ----------
+        store : oggm_edu.history.HistoryStore or None
+            States of the search so far, None if none were kept yet.
+        ds : xarray.Dataset
+            States of the chunk, without the last year of the previous one.
+        last : bool, optional
+            Whether this is the last chunk of the search.
+
+        Returns
+        -------
+        The store.
+        """
+        first = store is None and self._state_history is None
+        ds = self._retained(ds, last, first=first)
+        if not ds.sizes["time"]:
+            return store
+        if store is None:
+            return HistoryStore(ds)
+        store.append(ds)
+        return store
+
+    def _decide_xlim(self):
+        return self.bed._decide_xlim()
 
-    @edu_plotter
-    def plot_history(self, show_bias=False, window=None, time_range=None, invert=False):
+    def _decide_ylim(self):
+        return self.bed.bottom, self.current_state.surface_h[0] + 200
+
+    def plot(self, axes=None, title_number=None, **kwargs):
+        """Plot the current state of the glacier. See
+        oggm_edu.plotting.plot_glacier, ``live=True`` returns a plot which
+        can be updated in place."""
+        from oggm_edu.plotting import plot_glacier
+        return plot_glacier(self, axes=axes, title_number=title_number, **kwargs)
+
+    def plot_mass_balance(self, **kwargs):
+        """Plot the mass balance profile of the glacier. See
+        oggm_edu.plotting.plot_mass_balance."""
+        from oggm_edu.plotting import plot_mass_balance
+        return plot_mass_balance(self, **kwargs)
+
+    def plot_history(self, show_bias=False, window=None, time_range=None,
+                     invert=False, **kwargs):
         """Plot the history of the glacier.
 
         Parameters
@@ -924,18 +1518,11 @@ class Glacier:
         invert : bool, optional
             Chose to invert the y-axis on the bias plot. False by default.
         """
-        # Get the components
-        if show_bias:
-            fig, ax1, ax2, ax3, ax4 = self._create_history_plot_components(
-                show_bias=show_bias, window=window, time_range=time_range, invert=invert
-            )
-        else:
-            fig, ax1, ax2, ax3 = self._create_history_plot_components(
-                window=window, time_range=time_range
-            )
+        from oggm_edu.plotting import plot_history
+        return plot_history(self, show_bias=show_bias, window=window,
+                            time_range=time_range, invert=invert, **kwargs)
 
-    @edu_plotter
-    def plot_state_history(self, interval=50, eq_states=False):
+    def plot_state_history(self, interval=50, eq_states=False, **kwargs):
         """Plot the state history of the glacier (thicknesses) at specified
         intervals.
 
@@ -947,116 +1534,34 @@ class Glacier:
             Plot the different equilibrium states, if there are any. This takes
             precedence over the intervals.
         """
-        # Get the base plotting components from the bed.
-        _, ax1, ax2 = self.bed._create_base_plot()
+        from oggm_edu.plotting import plot_state_history
+        return plot_state_history(self, interval=interval, eq_states=eq_states,
+                                  **kwargs)
 
-        # We need a manual color cycle for the top down view.
-        prop_cycle = plt.rcParams["axes.prop_cycle"]
-        colors = cycle(prop_cycle.by_key()["color"])
+    def animate(self, path, stride=1, max_frames=None, fps=10, **kwargs):
+        """Write a movie of the evolution of the glacier, from its state
+        history. See oggm_edu.plotting.animate_glacier.
 
-        # Do we have any states?
-        if not self.state_history:
-            print(
-                "Glacier doesn't have a state history yet, try progressing the glacier."
-            )
-            # We don't want to do anything else, since some operation depend on the state_history.
-            return
-        # If we don't want eq. states.
-        elif not eq_states:
-            # Want to plot thickness at specified intervals. So we slice it.
-            states = self.state_history.thickness_m.isel(
-                time=slice(interval, -1, interval)
-            )
-            # Length of state. Needed for sorting.
-            len_states = self.history.length_m.isel(time=slice(interval, -1, interval))
-            # Title
-            title = "Glacier states"
-        # If we want eq. states
-        else:
-            if self.eq_states:
-                # Get the states.
-                years = list(self.eq_states)
-                states = self.state_history.thickness_m.sel(time=years)
-                # Length of state. Needed for sorting.
-                len_states = self.history.length_m.sel(time=years)
-                # Title
-                title = "Glacier equilibirum states"
-            else:
-                print("No equilbrium states to plot yet.")
-                return
-
-        sorted_index = np.argsort(len_states.values)
-        # Sort the states by length and plot it in reverse.
-        # I.e. plot the longest state first.
-        states = states.values[sorted_index][::-1]
-        # Loop over states.
-        for i, state in zip(sorted_index[::-1], states):
-            # Some masking shenanigans
-            mask = state > 0
-            idx = state.argmin()
-            mask[: idx + 1] = True
-            # Fill the glacier.
-            ax1.fill_between(
-                self.bed.distance_along_glacier,
-                self.bed.bed_h,
-                state + self.bed.bed_h,
-                where=mask,
-                color="white",
-                lw=2,
-            )
-            # Label for outline
-            if not eq_states:
-                label = interval + i * interval
-            else:
-                label = list(self.eq_states)[i]
-                ela = self.eq_states[label]
-
-                # Add hline for ELAS
-                ax1.axhline(ela, ls=":")
-                ax1.text(
-                    self.bed.distance_along_glacier[-1] - 0.2,
-                    ela + 5,
-                    f"ELA at year {label}",
-                    ha="right",
-                )
-            # Add outline
-            # Modify the zorder to get lines to show up nice.
-            ax1.plot(
-                self.bed.distance_along_glacier[mask],
-                state[mask] + self.bed.bed_h[mask],
-                lw=2,
-                label=f"Glacier outline at year {label}",
-                # zorder=4+i*0.1
-            )
-            # Fill in the glacier in the topdown view.
-            # Where does the glacier have thickness?
-            filled = np.where(state > 0, self.bed.widths, 0)
-            # Fill between them
-            # Modify the zorder to get lines to show up nice.
-            ax2.fill_between(
-                self.bed.distance_along_glacier,
-                -filled / 2 * self.bed.map_dx,
-                filled / 2 * self.bed.map_dx,
-                where=filled > 0,
-                facecolor="white",
-                edgecolor=next(colors),
-                lw=2,
-                # zorder=1+i*0.1
-            )
-        # New title.
-        ax1.set_title(title)
-        # Nat. sort. Thanks stackoverflow.
-        ax1.legend(
-            *zip(
-                *sorted(
-                    zip(*ax1.get_legend_handles_labels()),
-                    key=lambda s: [
-                        int(t) if t.isdigit() else t.lower()
-                        for t in re.split(r"(\d+)", s[1])
-                    ],
-                )
-            )
-        )
+        Parameters
+        ----------
+        path : str
+            File to write the movie to, e.g. ``glacier.mp4`` or ``glacier.gif``.
+        stride : int, optional
+            Use every stride-th state of the state history. 1 by default.
+        max_frames : int, optional
+            Maximum number of frames. Long histories are decimated evenly to
+            this number of frames.
+        fps : int, optional
+            Frames per second of the movie. 10 by default.
+
+        Returns
+        -------
+        str
+            The path of the movie.
+        """
+        from oggm_edu.plotting import animate_glacier
+        return animate_glacier(self, path, stride=stride, max_frames=max_frames,
+                               fps=fps, **kwargs)
 
 
 class SurgingGlacier(Glacier):
@@ -1101,6 +1606,14 @@ class SurgingGlacier(Glacier):
         }
         return json
 
+    def _summary_key(self):
+        """Key of what the summary of the glacier depends on."""
+        return super()._summary_key() + (
+            self.normal_years,
+            self.surging_years,
+            self._normal_period,
+        )
+
     def reset(self):
         """Reset the state of the surging glacier."""
         # Extend from glacier.
@@ -1203,99 +1716,84 @@ class SurgingGlacier(Glacier):
 
         # If all passes
         else:
-            # How many years to have left to simulate
-            years_left = year - self.age
-            # While we have years to run we do the following...
-            while years_left:
-                # Check if we have a current state already.
-                state = self._state()
-                # If in a normal period
-                if self._normal_period:
-                    # How many years should we run?
-                    # We either run for the normal period amount of
-                    # yeasrs. Or for the years left we have left.
-                    # or the normal years left from a previous run.
-                    years_to_run = np.min(
-                        [
-                            years_left,
-                            self.normal_years,
-                            self._normal_years_left,
-                        ]
-                    )
-                    # Cast to int
-                    years_to_run = int(years_to_run + self.age)
-                    # Update normal_years_left
-                    self._normal_years_left -= years_to_run - self.age
-                    # If we have no normal years left we change state.
-                    if self._normal_years_left == 0:
-                        # Re-set it
-                        self._normal_years_left = self.normal_years
-                        # Not normal anymore
-                        self._normal_period = not self._normal_period
-
-                    # Initialise the model, width the normal basal_slidng
-                    model = flowline_model(
-                        state,
-                        mb_model=self.mass_balance,
-                        y0=self.age,
-                        glen_a=self.creep,
-                        fs=self.basal_sliding,
-                    )
-                    # Run the model. Store the history.
-                    try:
-                        out = model.run_until_and_store(years_to_run, fl_diag_path=None)
-                    except RuntimeError:
-                        warnings.warn("Glacier outgrew its domain and had to stop.")
-                        # We should break here.
-                        break
-
-                # If we are not in normal state, we do a surging period.
-                else:
-                    # How many years should we run?
-                    # Same as above but now we run for surging period amount
-                    # of years.
-                    years_to_run = np.min(
-                        [
-                            years_left,
-                            self.surging_years,
-                            self._surging_years_left,
-                        ]
-                    )
-                    # Cast to int
-                    years_to_run = int(years_to_run + self.age)
-                    #  Update surging years left
-                    self._surging_years_left -= years_to_run - self.age
-                    # If there are no surging years left, we change state
-                    if self._surging_years_left == 0:
-                        # Re-set
-                        self._surging_years_left = self.surging_years
-                        # Not surging anymore
-                        self._normal_period = not self._normal_period
-
-                    # Initialise the model, with the surging basal_sliding
-                    model = flowline_model(
-                        state,
-                        mb_model=self.mass_balance,
-                        y0=self.age,
-                        glen_a=self.creep,
-                        fs=self.basal_sliding_surge,
+            # Where we are in the cycle after the last complete chunk, to go
+            # back there if the run fails.
+            cycle = (
+                self._normal_period,
+                self._normal_years_left,
+                self._surging_years_left,
+            )
+
+            def surge_cycle(model, state):
+                """Called by the model after every stored year, to set the
+                basal sliding of the next year. It never stops the run."""
+                # The first year of a chunk is the last one of the previous.
+                if state is None and model.yr > start:
+                    return False, True
+                if model.yr < year:
+                    model.fs = self._next_sliding()
+                return False, True
+
+            # One model per chunk, the sliding is switched in place.
+            start = self.age
+            try:
+                for _ in self._run_chunks(year, stop_criterion=surge_cycle):
+                    cycle = (
+                        self._normal_period,
+                        self._normal_years_left,
+                        self._surging_years_left,
                     )
-                    # Run the model. Store the history.
-                    try:
-                        out = model.run_until_and_store(years_to_run, fl_diag_path=None)
-                    except RuntimeError:
-                        warnings.warn("Glacier outgrew its domain and had to stop.")
-                        # We should break here.
-                        break
-
-                # Update attributes.
-                self.history = out[0]
-                self.state_history = out[1][0]
-                self._current_state = model.fls[0]
-                self._model_state = model
-                self.age = model.yr
-                # Check where we are
-                years_left = year - self.age
+            except RuntimeError:
+                warnings.warn("Glacier outgrew its domain and had to stop.")
+                (
+                    self._normal_period,
+                    self._normal_years_left,
+                    self._surging_years_left,
+                ) = cycle
+
+    def _next_sliding(self):
+        """Basal sliding of the next year, moving one year forward in the
+        surging cycle."""
+        # If in a normal period
+        if self._normal_period:
+            sliding = self.basal_sliding
+            self._normal_years_left -= 1
+            # If we have no normal years left we change state.
+            if self._normal_years_left == 0:
+                # Re-set it
+                self._normal_years_left = self.normal_years
+                # Not normal anymore
+                self._normal_period = not self._normal_period
+        # If we are not in normal state, we are surging.
+        else:
+            sliding = self.basal_sliding_surge
+            self._surging_years_left -= 1
+            # If there are no surging years left, we change state
+            if self._surging_years_left == 0:
+                # Re-set
+                self._surging_years_left = self.surging_years
+                # Not surging anymore
+                self._normal_period = not self._normal_period
+        return sliding
+
+    def _progress_delta(self):
+        """Extends ``Glacier._progress_delta`` with the surging cycle."""
+        delta = super()._progress_delta()
+        delta["surge_cycle"] = (
+            self._normal_period,
+            self._normal_years_left,
+            self._surging_years_left,
+        )
+        return delta
+
+    def _merge_progress(self, delta):
+        """Extends ``Glacier._merge_progress`` with the surging cycle."""
+        super()._merge_progress(delta)
+        (
+            self._normal_period,
+            self._normal_years_left,
+            self._surging_years_left,
+        ) = delta["surge_cycle"]
 
     def progress_to_equilibrium(self):
         """Surging glaciers do not really have an eq. state."""
@@ -1303,31 +1801,8 @@ class SurgingGlacier(Glacier):
             "Surging glaciers do not progress to equilibrium. Yet..."
         )
 
-    @edu_plotter
-    def plot_history(self):
+    def plot_history(self, **kwargs):
         """Plot the history of the surging glacier.
         Extends the Glacier.plot_history() method."""
-        # Get the base plotting components.
-        fig, ax1, ax2, ax3 = self._create_history_plot_components()
-
-        # We then want to add markers for the surging years.
-        # How many surges do we have?
-        nr_surges = int(self.age / (self.normal_years + self.surging_years))
-        # Loop over the surges
-        for i in range(nr_surges):
-            # When should the span start
-            start = (i + 1) * self.normal_years + i * self.surging_years
-            # and end.
-            end = (
-                (i + 1) * self.normal_years
-                + self.surging_years
-                + i * self.surging_years
-            )
-            # Add spans
-            ax1.axvspan(start, end, color="tab:orange", alpha=0.3)
-            ax2.axvspan(start, end, color="tab:orange", alpha=0.3)
-            ax3.axvspan(start, end, color="tab:orange", alpha=0.3)
-
-        # Legend entry
-        patch = Patch(facecolor="tab:orange", alpha=0.3, label="Surging period")
-        fig.legend(handles=[patch], loc="upper left", bbox_to_anchor=(0.9, 0.89))
+        from oggm_edu.plotting import plot_surging_history
+        return plot_surging_history(self, **kwargs)
@@ -2,17 +2,14 @@
 glacier bed to use with the Glacier and SurgingGlacier classes.
 """
 
-from oggm_edu.funcs import edu_plotter
 from collections.abc import Sequence
 
 # Other libraries.
 import numpy as np
+import hashlib
 import pandas as pd
 import warnings
 
-# Plotting
-from matplotlib import pyplot as plt
-
 
 class GlacierBed:
     """The glacier bed used to construct a ``oggm_edu.Glacier``.
@@ -26,6 +23,9 @@ class GlacierBed:
         Bottom altitude of the glacier domain. [m]
     distance_along_glacier : array(float)
         Horisontal distance along the glacier bed. [km]
+    fingerprint : str
+        Hash of the bed heights, widths and resolution. Beds with the same
+        fingerprint are the same.
     map_dx :  int
         Grid resolution. [m]
     nx : int
@@ -213,26 +213,12 @@ class GlacierBed:
         # we create a bed with variable width.
         elif len(altitudes) == len(widths):
             self.width = widths
-            # First create a constant bed.
-            tmp_w = np.zeros(self.nx)
-
-            # Make sure we have lists.
-            altitudes = list(altitudes)
-            widths = list(widths)
             # Check that the provided altitudes make sense.
-            altitudes_tmp = altitudes.copy()
-            altitudes_tmp.sort(reverse=True)
-            if not altitudes_tmp == altitudes:
+            altitudes = np.asarray(altitudes, dtype=float)
+            if np.any(np.diff(altitudes) > 0):
                 raise ValueError("Please provides altitudes in descending order.")
-            # Loop over the altitude/width pairs and do a linear
-            # interpolations between them.
-            for i, alt in enumerate(altitudes[1:]):
-                # We want to interpolate to the previos altitude step.
-                inter_top = altitudes[i]
-                # Select the values that we interpolate.
-                mask = np.logical_and(self.bed_h <= inter_top, self.bed_h >= alt)
-                # Linear interpolation between the widths.
-                tmp_w[mask] = np.linspace(self.width[i], self.width[i + 1], mask.sum())
+            # Linear interpolation between the altitude/width pairs.
+            tmp_w = _section_widths(self.bed_h, altitudes, widths)
             # Assign the varied widths it.
             self.widths = tmp_w / self.map_dx
 
@@ -240,6 +226,67 @@ class GlacierBed:
         else:
             raise ValueError("Provided arguments are not compatible.")
 
+        # Compute it once, beds are compared often.
+        self.fingerprint
+
+    @classmethod
+    def from_arrays(cls, altitudes, widths, nx=200, map_dx=100):
+        """Create many beds with variable widths at once. Does the same as
+        the constructor with ``altitudes`` and ``widths``, for every row of
+        the arrays, but the checks and the interpolation are done for all
+        the beds together.
+
+        Parameters
+        ----------
+        altitudes : array_like, 2-D
+            Altitudes of the altitude/width pairs, one bed per row, in
+            descending order. First and last values are the top and bottom.
+        widths : array_like, 2-D
+            Widths of the altitude/width pairs, same shape as altitudes.
+        nx : int
+            Number of grid points.
+        map_dx : int
+            Grid point spacing in meters.
+
+        Returns
+        -------
+        list of GlacierBed
+        """
+        altitudes = np.asarray(altitudes)
+        if altitudes.ndim != 2:
+            raise ValueError("altitudes and widths should be 2-D arrays.")
+        return list(
+            GlacierBedGenerator(
+                len(altitudes), altitudes=altitudes, widths=widths, nx=nx,
+                map_dx=map_dx,
+            )
+        )
+
+    def __setattr__(self, name, value):
+        # The fingerprint has to follow the bed.
+        if name in ("bed_h", "widths", "map_dx"):
+            self.__dict__.pop("_fingerprint", None)
+        super().__setattr__(name, value)
+
+    @property
+    def fingerprint(self):
+        """Hash of the bed heights, widths and resolution. Beds with the same
+        fingerprint are the same. The arrays should not be modified in place.
+
+        The arrays are rounded to 1e-6 before hashing, so that the same bed
+        built in different ways, e.g. by GlacierBedGenerator, has the same
+        fingerprint despite round-off errors.
+        """
+        if "_fingerprint" not in self.__dict__:
+            h = hashlib.blake2b(digest_size=16)
+            for array in [self.bed_h, self.widths]:
+                # Adding 0 turns -0 into 0.
+                array = np.round(np.asarray(array, dtype=float), 6) + 0.0
+                h.update(array.tobytes())
+            h.update(repr(self.map_dx).encode())
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
     def __repr__(self):
 
         # Get the json representation of the object.
@@ -278,60 +325,320 @@ class GlacierBed:
     def _decide_xlim(self):
         return 0, self.distance_along_glacier[-1] * 1.02
 
-    def _create_base_plot(self, axes=None, title=None):
-        """Create the base plot the glacier bed"""
+    def plot(self, **kwargs):
+        """Plot the bed. See oggm_edu.plotting.plot_bed."""
+        from oggm_edu.plotting import plot_bed
+        return plot_bed(self, **kwargs)
+
 
-        if axes is not None:
-            fig = plt.gcf()
-            ax1, ax2 = axes
+def _section_widths(bed_h, altitudes, widths):
+    """Widths along a bed from its altitude/width pairs.
+
+    Between two altitudes, the widths go linearly from one width to the
+    other over the grid points of the section, as np.linspace does. A grid
+    point at one of the altitudes takes the width of the lower section.
+
+    Parameters
+    ----------
+    bed_h : array(float)
+        Bed heights. [m]
+    altitudes : array_like
+        Altitudes of the pairs, in descending order.
+    widths : array_like
+        Widths of the pairs.
+    """
+    altitudes = np.asarray(altitudes, dtype=float)
+    widths = np.asarray(widths, dtype=float)
+    tmp_w = np.zeros(len(bed_h))
+    # With holes in the bed the grid points of a section are not contiguous.
+    if np.any(np.diff(bed_h) > 0):
+        for i in range(len(altitudes) - 1):
+            mask = np.logical_and(bed_h <= altitudes[i], bed_h >= altitudes[i + 1])
+            tmp_w[mask] = np.linspace(widths[i], widths[i + 1], mask.sum())
+        return tmp_w
+
+    # First and last grid point of each section, the bed goes down.
+    start = np.searchsorted(-bed_h, -altitudes[:-1], side="left")
+    stop = np.searchsorted(-bed_h, -altitudes[1:], side="right")
+    # Section of each grid point, the lowest one it is in.
+    inside = np.flatnonzero((bed_h <= altitudes[0]) & (bed_h >= altitudes[-1]))
+    section = np.searchsorted(-altitudes, -bed_h[inside], side="right") - 1
+    section = np.minimum(section, len(altitudes) - 2)
+
+    # The same operations as np.linspace, for the same values.
+    k = (inside - start[section]).astype(float)
+    div = stop[section] - start[section] - 1
+    w0, w1 = widths[section], widths[section + 1]
+    delta = w1 - w0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        step = delta / div
+        values = np.where(step == 0, k / div * delta, k * step) + w0
+    values = np.where(div == 0, w0, values)
+    values = np.where((k == div) & (div > 0), w1, values)
+    tmp_w[inside] = values
+    return tmp_w
+
+
+def _sample(value, rng, n, name, ndim=1):
+    """Values of a bed parameter for n beds.
+
+    Parameters
+    ----------
+    value : scalar, array_like or callable
+        The same value for all the beds, one value (or row for 2-D
+        parameters) per bed, or a callable drawing them, called as
+        ``value(rng, n)``.
+    rng : numpy.random.Generator
+    n : int
+        Number of beds.
+    name : str
+        Name of the parameter, for the error message.
+    ndim : int, optional
+        Number of dimensions of the values for all beds, 2 for parameters
+        which are sequences.
+    """
+    if callable(value):
+        value = value(rng, n)
+    value = np.asarray(value)
+    # The same for all the beds.
+    if value.ndim == ndim - 1:
+        value = np.broadcast_to(value, (n,) + value.shape)
+    if value.ndim != ndim or len(value) != n:
+        raise ValueError(f"{name} should have one value per bed.")
+    return value
+
+
+class GlacierBedGenerator:
+    """Create large families of glacier beds, e.g. for sensitivity studies.
+
+    The parameters of the beds are drawn or given for all the beds at once,
+    checked together and the geometry of all the beds is computed together.
+    The bed heights, widths and distances sit in 2-D arrays, one row per bed,
+    which batch computations can use directly. Beds shorter than the longest
+    one are padded with NaN.
+
+    Iterating over the generator yields the GlacierBed objects, one at a
+    time. Their arrays are read-only views on the rows of the 2-D arrays.
+
+    Attributes
+    ----------
+    bed_h : array(float), 2-D
+        Bed heights of the beds. [m]
+    widths : array(float), 2-D
+        Widths of the beds, in grid points.
+    distance_along_glacier : array(float), 2-D
+        Horisontal distance along the beds. [km]
+    nx : array(int)
+        Number of grid points of each bed.
+    """
+
+    def __init__(
+        self,
+        n,
+        top=None,
+        bottom=None,
+        width=None,
+        altitudes=None,
+        widths=None,
+        slopes=None,
+        slope_sections=None,
+        nx=200,
+        map_dx=100,
+        seed=None,
+    ):
+        """Draw the parameters of the beds and compute their geometry.
+
+        The parameters are the ones of GlacierBed. Each of them can be a
+        single value (or sequence, for ``altitudes``, ``widths``, ``slopes``
+        and ``slope_sections``) used for all the beds, one value (or row) per
+        bed, or a callable drawing the values, called as ``value(rng, n)``
+        with ``rng`` a ``numpy.random.Generator``. For instance
+        ``slopes=lambda rng, n: rng.uniform(10, 30, n)``.
+
+        Parameters
+        ----------
+        n : int
+            Number of beds.
+        top, bottom : scalar, array_like or callable
+            Elevation at the top and bottom of the beds in meters.
+        width : scalar, array_like or callable
+            Constant width of the beds in meters.
+        altitudes, widths : array_like or callable
+            Altitude/width pairs of beds with variable widths.
+        slopes : scalar, array_like or callable
+            Slope of the beds, in degrees. Without ``slope_sections``, a
+            single slope per bed.
+        slope_sections : array_like or callable
+            Altitude spans of the slopes, from the top to the bottom.
+        nx : int
+            Number of grid points, for beds without slopes.
+        map_dx : scalar, array_like or callable
+            Grid point spacing in meters.
+        seed : int, optional
+            Seed of the random generator given to the callables.
+        """
+        # Arg checks, same as GlacierBed.
+        if not isinstance(n, int) or n < 1:
+            raise ValueError("n should be an integer above 0.")
+        if (top is None) == (altitudes is None) or (bottom is None) == (
+            altitudes is None
+        ):
+            raise ValueError("Provide either a top and bottom or altitudes.")
+        if (width is None) == (widths is None):
+            raise ValueError("Provide either a single width or a list of widths")
+        if (altitudes is None) != (widths is None):
+            raise ValueError("Provided arguments are not compatible.")
+        if slope_sections is not None and slopes is None:
+            raise ValueError("slope_sections need slopes.")
+
+        rng = np.random.default_rng(seed)
+        self.n = n
+        # Parameters as given, for the attributes of the beds.
+        if altitudes is not None:
+            altitudes = _sample(altitudes, rng, n, "altitudes", ndim=2)
+            widths = _sample(widths, rng, n, "widths", ndim=2)
+            if altitudes.shape != widths.shape:
+                raise ValueError("Length of altitudes and widths should match.")
+            if np.any(np.diff(altitudes, axis=1) > 0):
+                raise ValueError("Please provides altitudes in descending order.")
+            top, bottom = altitudes[:, 0], altitudes[:, -1]
         else:
-            fig, (ax1, ax2) = plt.subplots(
-                nrows=2, gridspec_kw={"height_ratios": [2, 1]}, sharex=True
+            top = _sample(top, rng, n, "top")
+            bottom = _sample(bottom, rng, n, "bottom")
+            width = _sample(width, rng, n, "width")
+        if np.any(top <= bottom) or np.any(bottom < 0):
+            raise ValueError(
+                "Top of the bed has to be above the bottom."
+                + " Bottom also has to be above 0"
             )
+        map_dx = _sample(map_dx, rng, n, "map_dx")
+        if np.any(map_dx <= 10):
+            msg = ("Setting the map resolution below 10 meters may lead to "
+                   "very long runtimes.")
+            warnings.warn(msg)
 
-        # Plot the bed
-        ax1.plot(
-            self.distance_along_glacier,
-            self.bed_h,
-            label="Bedrock",
-            ls=":",
-            c="k",
-            lw=2,
-            zorder=3,
-        )
-        # And fill it.
-        ax1.fill_between(self.distance_along_glacier, -100, self.bed_h,
-                         color="lightgrey")
-        # Some labels etc.
-        ax1.set_ylabel("Altitude [m]")
-        ax1.set_facecolor("#ADD8E6")
-        ax1.set_ylim(self.bottom, self.top + 400)
-
-        # Fill the bed.
-        ax2.fill_between(
-            self.distance_along_glacier,
-            -self.widths / 2 * self.map_dx,
-            self.widths / 2 * self.map_dx,
-            color="lightgrey",
-        )
-        # More styling.
-        ax2.set_facecolor("darkgrey")
-        ax2.axhline(0, c="k")
-        # We add 2% of the bed length to the plot to have some space.
-        ax2.set_xlim(self._decide_xlim())
-        ax2.set_xlabel("Distance along glacier [km]")
-        ax2.set_ylabel("Width [m]")
-        if title is None:
-            ax1.set_title("Glacier domain")
+        if slopes is not None:
+            if slope_sections is None:
+                # A single slope per bed, from the top to the bottom.
+                slopes = _sample(slopes, rng, n, "slopes")[:, None]
+                slope_sections = np.stack([top, bottom], axis=1)
+            else:
+                slopes = _sample(slopes, rng, n, "slopes", ndim=2)
+                slope_sections = _sample(
+                    slope_sections, rng, n, "slope_sections", ndim=2
+                )
+            if np.any(slopes < -90) or np.any(slopes > 90):
+                raise ValueError("Slopes should be above -85 and below 80 degrees.")
+            if slope_sections.shape[1] != slopes.shape[1] + 1:
+                raise ValueError(
+                    "Number of slope sections should be one more then number of slopes"
+                )
+            if np.any(slope_sections[:, 0] != top) or np.any(
+                slope_sections[:, -1] != bottom
+            ):
+                raise ValueError(
+                    "First and last value of slope_sections should match top and bottom."
+                )
+
+        self._top, self._bottom = top, bottom
+        self._width = width
+        self._altitudes, self._widths = altitudes, widths
+        self._map_dx = map_dx
+        self._slopes, self._slope_sections = slopes, slope_sections
+        self._geometry(nx)
+
+    def _geometry(self, nx):
+        """Compute the heights, widths and distances of all the beds."""
+        n = self.n
+        top = self._top.astype(float)
+        bottom = self._bottom.astype(float)
+        map_dx = self._map_dx.astype(float)[:, None]
+        rows = np.arange(n)[:, None]
+
+        if self._slopes is None:
+            self.nx = np.full(n, nx)
+            bed_h = np.linspace(top, bottom, nx, axis=1)
+            distance = np.linspace(0, nx, nx) * map_dx * 1e-3
         else:
-            ax1.set_title(title)
-        ax1.legend()
-
-        return fig, ax1, ax2
-
-    @edu_plotter
-    def plot(self):
-        """Plot the bed"""
-        # Since we are not modifying the base here, we don't need to assign
-        # any of the returns.
-        self._create_base_plot()
+            sections = self._slope_sections.astype(float)
+            # How long do the segments have to be to have the correct slopes?
+            x_segments = np.abs(np.diff(sections, axis=1)) / np.tan(
+                np.deg2rad(self._slopes)
+            )
+            x_segments = np.concatenate(
+                [np.zeros((n, 1)), x_segments.cumsum(axis=1)], axis=1
+            )
+            total_length = x_segments.max(axis=1)
+            self.nx = (total_length / map_dx[:, 0]).astype(int)
+            if np.any(self.nx < 2):
+                raise ValueError("The beds should be at least two grid points long.")
+            # Distance along each bed, the padding stays at its end.
+            step = total_length / (self.nx - 1)
+            distance = np.arange(self.nx.max()) * step[:, None]
+            distance = np.minimum(distance, total_length[:, None])
+            distance[np.arange(n), self.nx - 1] = total_length
+            # Interpolate the heights of all the beds in one go, each of them
+            # shifted to its own range of distances.
+            shift = rows * (total_length.max() + 1)
+            bed_h = np.interp(
+                (distance + shift).ravel(),
+                (x_segments + shift).ravel(),
+                sections.ravel(),
+            ).reshape(distance.shape)
+            distance = distance * 1e-3
+
+        if self._width is not None:
+            widths = np.broadcast_to(
+                self._width.astype(float)[:, None] / map_dx, bed_h.shape
+            )
+        else:
+            # Same as GlacierBed, bed by bed.
+            widths = np.full(bed_h.shape, np.nan)
+            for i in range(n):
+                widths[i, : self.nx[i]] = _section_widths(
+                    bed_h[i, : self.nx[i]], self._altitudes[i], self._widths[i]
+                )
+            widths /= map_dx
+
+        # One contiguous, read-only buffer per array, padded with NaN.
+        padding = np.arange(bed_h.shape[1]) >= self.nx[:, None]
+        for name, array in [
+            ("bed_h", bed_h),
+            ("widths", widths),
+            ("distance_along_glacier", np.broadcast_to(distance, bed_h.shape)),
+        ]:
+            array = np.array(array, dtype=float, order="C")
+            array[padding] = np.nan
+            array.flags.writeable = False
+            setattr(self, name, array)
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        for i in range(self.n):
+            yield self._bed(i)
+
+    def _bed(self, i):
+        """The i-th bed, without going through the checks of GlacierBed."""
+        nx = int(self.nx[i])
+        bed = GlacierBed.__new__(GlacierBed)
+        bed.top = self._top[i].item()
+        bed.bottom = self._bottom[i].item()
+        bed.map_dx = self._map_dx[i].item()
+        if self._slopes is None:
+            bed.slopes = None
+            bed.slope_sections = None
+        else:
+            bed.slopes = self._slopes[i].tolist()
+            bed.slope_sections = self._slope_sections[i]
+        bed.nx = nx
+        bed.bed_h = self.bed_h[i, :nx]
+        bed.distance_along_glacier = self.distance_along_glacier[i, :nx]
+        if self._width is not None:
+            bed.width = self._width[i].item()
+        else:
+            bed.width = self._widths[i].tolist()
+        bed.widths = self.widths[i, :nx]
+        bed.fingerprint
+        return bed
@@ -4,7 +4,8 @@ the handling of multiple glaciers.
 
 # Internals
 from oggm_edu.glacier import Glacier
-from oggm_edu.funcs import edu_plotter, expression_parser
+from oggm_edu.ensemble import EnsembleFlowlineModel
+from oggm_edu.funcs import expression_parser
 
 # Other libraries.
 import warnings
@@ -13,18 +14,64 @@ import numpy as np
 from collections.abc import Sequence
 from multiprocessing import Pool
 from functools import partial
-
-# Plotting
-from matplotlib import pyplot as plt
+from oggm import cfg
+
+
+# What are we allowed to change??
+VALID_ATTRS = (
+    "gradient",
+    "ela",
+    "basal_sliding",
+    "creep",
+    "normal_years",
+    "surging_years",
+    "basal_sliding_surge",
+)
+MB_ATTRS = ("gradient", "ela")
+
+
+def change_attribute(glacier, key, value):
+    """Change one attribute of a glacier, as GlacierCollection.change_attributes
+    does.
+
+    Parameters
+    ----------
+    glacier : oggm_edu.Glacier
+    key : str
+        One of the attributes of ``VALID_ATTRS``.
+    value : numeric or str
+        New value, or partial mathematical expression e.g. ``"* 10"``.
+    """
+    # Should we act on the glacier or mass balance?
+    if key in MB_ATTRS:
+        obj = glacier.mass_balance
+    # Just the glacier
+    else:
+        obj = glacier
+
+    # If value is a string (a partial expression) we set the value
+    # using the expression_parser.
+    if isinstance(value, str):
+        # Get the current value of the attribute.
+        curr_value = getattr(obj, key)
+        # Calculate the value based on the partial expression.
+        value = expression_parser(value, curr_value)
+    # If value is not a string we can just assign it directly.
+    # Use built in setattr. Should respect the defined
+    # setters, with error messages an such.
+    setattr(obj, key, value)
 
 
 class GlacierCollection:
     """This is an object used to store multiple glaciers.
 
     It provides methods to progress and compare the glaciers in the collection.
+    The glaciers are progressed by a pool of worker processes, which is created
+    the first time it is needed and then reused. Close it with ``close()``
+    or by using the collection as a context manager.
     """
 
-    def __init__(self, glacier_list=None):
+    def __init__(self, glacier_list=None, n_workers=None):
         """Initialise the glacier collection.
 
         Parameters
@@ -32,9 +79,17 @@ class GlacierCollection:
         glacier_list : list of glaciers objects
             Defaults to none. Has the possibility to add glaciers on the go.
             Glaciers need to have the same bed slope.
+        n_workers : int, optional
+            Number of worker processes used to progress the glaciers.
+            Defaults to the number of CPUs.
         """
 
         self._glaciers = []
+        # Last summary, with the keys of the glaciers it was made from.
+        self._summary = None
+        # The worker pool is created lazily.
+        self._pool = None
+        self.n_workers = n_workers
 
         # Do we have a list of glaciers?
         if glacier_list:
@@ -44,6 +99,53 @@ class GlacierCollection:
     def __repr__(self):
         return f"Glacier collection with {len(self._glaciers)} glaciers."
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def __getstate__(self):
+        # The pool can't be pickled, a copy will have to start its own.
+        state = self.__dict__.copy()
+        state["_pool"] = None
+        return state
+
+    @property
+    def n_workers(self):
+        """Number of worker processes used to progress the glaciers.
+        None means the number of CPUs."""
+        return self._n_workers
+
+    @n_workers.setter
+    def n_workers(self, value):
+        """Set the number of worker processes. A running pool is closed
+        and a new one started the next time it is needed.
+
+        Parameters
+        ----------
+        value : int or None
+            Number of worker processes.
+        """
+        if value is not None and (not isinstance(value, int) or value < 1):
+            raise ValueError("n_workers should be an integer above 0, or None.")
+        self.close()
+        self._n_workers = value
+
+    def _get_pool(self):
+        """Get the worker pool, start it if needed."""
+        if self._pool is None:
+            self._pool = Pool(processes=self.n_workers)
+        return self._pool
+
+    def close(self):
+        """Shut down the worker pool of the collection. A new pool is started
+        if the collection is progressed again."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
     def _repr_html_(self):
         # Pretty representation for notebooks.
         # Return the html representation of the summary dataframe.
@@ -52,42 +154,114 @@ class GlacierCollection:
         else:
             pass
 
-    def summary(self):
-        """Returns a summary of the collection in the form of a pandas dataframe."""
+    def summary(self, cache=True):
+        """Returns a summary of the collection in the form of a pandas dataframe.
 
-        # Get the first glacier and base the creation of the dataframe of this.
+        Parameters
+        ----------
+        cache : bool, optional
+            Return the previous summary if no glacier changed since then.
+            True by default.
+        """
         # If we have glaciers in the collection.
         if len(self._glaciers) > 0:
-            json = {
-                **self._glaciers[0]._to_json(),
-                **self._glaciers[0].bed._to_json(),
-                **self._glaciers[0].mass_balance._to_json(),
-            }
-            # Create the dataframe.
-            df = pd.DataFrame(json, index=[0])
-            # We then loop over the rest of the collection.
-            for glacier in self._glaciers[1:]:
-                # Next json representation
+            keys = [glacier._summary_key() for glacier in self._glaciers]
+            if cache and self._summary is not None and self._summary[0] == keys:
+                return self._summary[1].copy()
+
+            # Gather the values of each field, glacier after glacier.
+            columns = {}
+            for i, glacier in enumerate(self._glaciers):
                 json = {
                     **glacier._to_json(),
                     **glacier.bed._to_json(),
                     **glacier.mass_balance._to_json(),
                 }
-                # Add it to the df.
-                df2 = pd.DataFrame(json)
-                with warnings.catch_warnings():
-                    warnings.simplefilter("ignore", FutureWarning)
-                    df = pd.concat([df, df2], ignore_index=True)
+                for key, value in json.items():
+                    # Fields missing for the glaciers before.
+                    column = columns.setdefault(key, [np.nan] * i)
+                    # Values wrapped in a list are lists, or arrays, in one cell.
+                    if isinstance(value, list):
+                        value = value[0]
+                    column.append(value)
+                # Fields missing for this glacier.
+                for column in columns.values():
+                    if len(column) == i:
+                        column.append(np.nan)
+            # Create the dataframe.
+            df = pd.DataFrame(columns)
 
             # Set the index name.
-            df = df.reindex()
             df.index += 1
             df.index.name = "Glacier"
-            return df
+            self._summary = (keys, df)
+            return df.copy()
 
         else:
             pass
 
+    def metrics(self):
+        """Response time, accumulation area ratio and specific mass balance of
+        the glaciers, in the form of a pandas dataframe.
+
+        The response times are the ones computed when the glaciers reached
+        equilibrium. The other metrics are computed for all the glaciers at
+        once, from their current state.
+        """
+        columns = [
+            "Id",
+            "Age",
+            "Response time [yrs]",
+            "AAR [%]",
+            "Specific mass balance [m w.e. yr^-1]",
+        ]
+        glaciers = self._glaciers
+        if not glaciers:
+            return pd.DataFrame(columns=columns)
+
+        # Put the glaciers one after the other, and reduce per glacier.
+        states = [glacier._state() for glacier in glaciers]
+        sizes = [len(state.thick) for state in states]
+        starts = np.cumsum([0] + sizes[:-1])
+        thick = np.concatenate([state.thick for state in states])
+        surface_h = np.concatenate([state.surface_h for state in states])
+        bin_area = np.concatenate([state.bin_area_m2 for state in states])
+        widths = np.concatenate([glacier.bed.widths for glacier in glaciers])
+        ela = np.repeat([glacier.mass_balance.ela_h for glacier in glaciers], sizes)
+        mb = np.concatenate([glacier.annual_mass_balance for glacier in glaciers])
+
+        # Accumulation area ratio, of the glaciers which have a current state
+        # and an accumulation area.
+        above = surface_h > ela
+        with np.errstate(invalid="ignore", divide="ignore"):
+            aar = np.add.reduceat(np.where(above, bin_area, 0), starts) / (
+                np.add.reduceat(bin_area, starts)
+            )
+        progressed = np.array([glacier.current_state is not None for glacier in glaciers])
+        aar[~progressed | ~np.logical_or.reduceat(above, starts)] = np.nan
+
+        # Specific mass balance, the average weighted by the widths where
+        # there is ice.
+        weights = np.where(thick > 0, widths, 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mb_s = np.add.reduceat(mb * weights, starts) / np.add.reduceat(
+                weights, starts
+            )
+        mb_s *= cfg.PARAMS["ice_density"] / 1000.0
+
+        df = pd.DataFrame(
+            {
+                columns[0]: [glacier.id for glacier in glaciers],
+                columns[1]: [glacier.age for glacier in glaciers],
+                columns[2]: [glacier.response_time for glacier in glaciers],
+                columns[3]: aar * 100,
+                columns[4]: mb_s,
+            }
+        )
+        df.index += 1
+        df.index.name = "Glacier"
+        return df
+
     def reset(self):
         """Reset all glaciers in the collection"""
         # If we have glaciers,
@@ -103,22 +277,30 @@ class GlacierCollection:
         Make sure that the glaciers have the same bed.
         """
 
-        # If there is only one glacier in the collection, it is always ok.
-        if len(self._glaciers) <= 1:
+        groups = self._bed_groups()
+        # If there is only one bed in the collection, it is always ok.
+        if len(groups) <= 1:
             return True
 
-        # Compare the glacier beds
-        beds = [glacier.bed.bed_h for glacier in self._glaciers]
-        # Do we get all ok?
-        ok = []
-        # We only have to check all the beds against one reference bed.
-        for bed in beds[1:]:
-            # Is the pair equal?
-            ok.append(np.array_equal(beds[0], bed))
+        # Beds with different widths can still have the same heights.
+        beds = [group[0].bed.bed_h for group in groups.values()]
+        return all(np.array_equal(beds[0], bed) for bed in beds[1:])
 
-        # Any fails?
-        ok = np.asarray(ok).all()
-        return ok
+    def _bed_groups(self):
+        """Glaciers of the collection grouped by their current bed, with the
+        fingerprints of the beds as keys. Glaciers can get a new bed, or be
+        added and removed through ``glaciers``, so the groups are made from
+        the glaciers every time."""
+        groups = {}
+        for glacier in self._glaciers:
+            groups.setdefault(glacier.bed.fingerprint, []).append(glacier)
+        return groups
+
+    @property
+    def bed_groups(self):
+        """Glaciers of the collection grouped by bed, in a dictionary with
+        the fingerprints of the beds as keys."""
+        return self._bed_groups()
 
     @property
     def glaciers(self):
@@ -232,21 +414,10 @@ class GlacierCollection:
         if not isinstance(attributes_to_change, dict):
             raise TypeError("attributes_to_change should be a dictionary.")
 
-        # What are we allowed to change??
-        valid_attrs = (
-            "gradient",
-            "ela",
-            "basal_sliding",
-            "creep",
-            "normal_years",
-            "surging_years",
-            "basal_sliding_surge",
-        )
-        mb_attrs = ("gradient", "ela")
         # For each key-value pair:
         for key, values in attributes_to_change.items():
             # Is current key valid?
-            if key not in valid_attrs:
+            if key not in VALID_ATTRS:
                 raise ValueError(f"Attribute {key} not a valid attribute for function.")
             # Are the value valid?
             elif not isinstance(values, Sequence):
@@ -259,26 +430,49 @@ class GlacierCollection:
             else:
                 # Set values and glaciers.
                 for (glacier, value) in zip(self.glaciers, values):
-                    # Should we act on the glacier or mass balance?
-                    if key in mb_attrs:
-                        obj = glacier.mass_balance
-                    # Just the glacier
-                    else:
-                        obj = glacier
-
-                    # If value is a string (a partial expression) we set the value
-                    # using the expression_parser.
-                    if isinstance(value, str):
-                        # Get the current value of the attribute.
-                        curr_value = getattr(obj, key)
-                        # Calculate the value based on the partial expression.
-                        value = expression_parser(value, curr_value)
-                    # If value is not a string we can just assign it directly.
-                    # Use built in setattr. Should respect the defined
-                    # setters, with error messages an such.
-                    setattr(obj, key, value)
-
-    def _partial_progression(self, year, glacier):
+                    change_attribute(glacier, key, value)
+
+    def set_checkpoints(self, path, interval=100):
+        """Save checkpoints of the glaciers in the collection while they
+        progress, see Glacier.set_checkpoints. A collection created again
+        with the same glaciers resumes their interrupted runs.
+
+        Parameters
+        ----------
+        path : str or None
+            Directory in which to save the checkpoints. None stops saving
+            checkpoints.
+        interval : int, optional
+            Number of years between two checkpoints. 100 by default.
+        """
+        for glacier in self._glaciers:
+            glacier.set_checkpoints(path, interval)
+
+    def _run_tasks(self, func, glaciers=None):
+        """Progress glaciers of the collection in the worker pool.
+
+        Only light copies of the glaciers are sent to the workers, and only
+        the changes are sent back and merged into the glaciers.
+
+        Parameters
+        ----------
+        func : callable
+            Partial progression function, taking a glacier task and returning
+            a delta.
+        glaciers : list, optional
+            Glaciers of the collection to progress. All of them by default.
+        """
+        if glaciers is None:
+            glaciers = self._glaciers
+        tasks = [glacier._progress_task() for glacier in glaciers]
+        # We use pool.map to evaluate the partial function on all glaciers in the collection.
+        deltas = self._get_pool().map(func, tasks)
+        # After this, update the glaciers with the results.
+        for glacier, delta in zip(glaciers, deltas):
+            glacier._merge_progress(delta)
+
+    @staticmethod
+    def _partial_progression(year, glacier):
         """Function used to create partial tasks which can be passed to pool of workers.
 
         Parameters
@@ -286,14 +480,15 @@ class GlacierCollection:
         year : int
             Which year to progress the glacier
         glacier : oggm_edu.Glacier
-            Instance which should be progressed.
+            Light copy of the glacier which should be progressed, from
+            ``Glacier._progress_task``.
         """
         # Simply progress the glacier to desired year.
         glacier.progress_to_year(year)
-        # Return the glacier.
-        return glacier
+        # Only send back what changed.
+        return glacier._progress_delta()
 
-    def progress_to_year(self, year):
+    def progress_to_year(self, year, batched=False):
         """Progress the glaciers within the collection to
         the specified year.
 
@@ -301,20 +496,101 @@ class GlacierCollection:
         ----------
         year : int
             Which year to progress the glaciers.
+        batched : bool, optional
+            Progress the glaciers sharing a bed in one vectorised run, instead
+            of one run per glacier in the worker pool. Much faster for large
+            collections, but it requires the glaciers to be normal glaciers,
+            of the same age when they share a bed. False by default.
+
+        If the run of a glacier fails, e.g. because it outgrew its domain,
+        none of the glaciers is progressed.
         """
         if len(self._glaciers) < 1:
             raise ValueError("Collection is empty")
 
+        if batched:
+            self._progress_batched(year)
+            return
+
         # Create a partial function, with the year specified.
         partial_progression = partial(self._partial_progression, year)
 
-        # Pool context manager.
-        with Pool() as p:
-            # We use pool.map to evaluate the partial function on all glaciers in the collection.
-            # After this, "update" the collection with the resulting glaciers.
-            self._glaciers = p.map(partial_progression, self._glaciers)
+        self._run_tasks(partial_progression)
+
+    def _progress_batched(self, year):
+        """Progress the glaciers of the collection with the
+        EnsembleFlowlineModel, one run per bed.
+
+        Parameters
+        ----------
+        year : int
+            Which year to progress the glaciers.
+        """
+        if any(type(glacier) is not Glacier for glacier in self._glaciers):
+            raise TypeError("Batched progression only works with normal glaciers.")
+        groups = self._bed_groups()
+        ages = {}
+        for key, glaciers in groups.items():
+            ages[key] = {glacier.age for glacier in glaciers}
+            if len(ages[key]) > 1:
+                raise ValueError(
+                    "Batched progression needs glaciers on the same bed to "
+                    "be of the same age."
+                )
 
-    def _partial_eq_progression(self, years, t_rate, glacier):
+        # Same checks as Glacier.progress_to_year.
+        if year < 0:
+            raise ValueError("Year has to be above zero")
+
+        # Run all the beds before updating any glacier, so that a failed run
+        # leaves the whole collection as it was.
+        runs = []
+        for key, glaciers in groups.items():
+            age = ages[key].pop()
+            if year <= age:
+                msg = ("Year has to be above the current age of the glaciers. It "
+                       "is not possible to de-age the glaciers. Geometry will "
+                       "remain the same.")
+                warnings.warn(msg)
+                continue
+
+            # The run extends the climate of the mass balances, it is only
+            # merged back once all the beds ran.
+            mbs = [glacier.mass_balance._climate_slice(age) for glacier in glaciers]
+            ends = [mb._temp_bias_last_year for mb in mbs]
+            model = EnsembleFlowlineModel(
+                glaciers[0].bed,
+                mbs,
+                glen_a=[glacier.creep for glacier in glaciers],
+                fs=[glacier.basal_sliding for glacier in glaciers],
+                thick=np.stack([glacier._state().thick for glacier in glaciers]),
+                y0=age,
+            )
+            try:
+                diag_dss, fl_diag_dss = model.run_until_and_store(year)
+            except RuntimeError as e:
+                ids = ", ".join(glacier.id for glacier in glaciers)
+                raise RuntimeError(
+                    f"Glacier outgrew its domain and had to stop, in the run of "
+                    f"the glaciers {ids}. No glacier of the collection was "
+                    f"progressed."
+                ) from e
+            runs.append((glaciers, model, diag_dss, fl_diag_dss, ends))
+
+        # Update the glaciers.
+        for glaciers, model, diag_dss, fl_diag_dss, ends in runs:
+            for i, glacier in enumerate(glaciers):
+                glacier.mass_balance._merge_climate(
+                    model.mass_balances[i]._climate_delta(ends[i])
+                )
+                glacier.history = diag_dss[i]
+                glacier.state_history = fl_diag_dss[i]
+                glacier._current_state = glacier._flowline_from_thick(model.thick[i])
+                glacier._model_state = None
+                glacier.age = model.yr
+
+    @staticmethod
+    def _partial_eq_progression(years, t_rate, adaptive, glacier):
         """Function used to create partial tasks which can be passed to pool of workers.
         Progress to equilibrium state.
 
@@ -326,15 +602,19 @@ class GlacierCollection:
         t_rate : float
             Specify how slow the glacier is allowed to change without
             reaching equilibrium.
+        adaptive : bool
+            Use the adaptive search, see Glacier.progress_to_equilibrium.
         glacier : oggm_edu.Glacier
-            Instance which should be progressed.
+            Light copy of the glacier which should be progressed, from
+            ``Glacier._progress_task``.
         """
         # Simply progress the glacier to desired year.
-        glacier.progress_to_equilibrium(years=years, t_rate=t_rate)
-        # Return the new glacier
-        return glacier
+        glacier.progress_to_equilibrium(years=years, t_rate=t_rate, adaptive=adaptive)
+        # Only send back what changed.
+        return glacier._progress_delta()
 
-    def progress_to_equilibrium(self, years=2500, t_rate=0.0001):
+    def progress_to_equilibrium(self, years=2500, t_rate=0.0001, adaptive=False,
+                                cache=None):
         """Progress the glaciers to equilibrium.
 
         Parameters
@@ -345,316 +625,61 @@ class GlacierCollection:
         t_rate : float, optional
             Specify how slow the glacier is allowed to change without
             reaching equilibrium.
+        adaptive : bool, optional
+            Search the equilibrium with an adaptive stride, see
+            Glacier.progress_to_equilibrium. False by default.
+        cache : oggm_edu.EquilibriumCache, optional
+            Cache of equilibrium states. Glaciers whose search was already
+            done get the cached result, the others are progressed and added
+            to the cache.
         """
         if len(self._glaciers) < 1:
             raise ValueError("Collection is empty")
 
-        partial_eq_progression = partial(self._partial_eq_progression, years, t_rate)
-
-        # Pool context manager.
-        with Pool() as p:
-            # We use pool.map to evaluate the partial function on all glaciers in the collection.
-            # After this, "update" the collection with the resulting glaciers.
-            self._glaciers = p.map(partial_eq_progression, self._glaciers)
-
-    @edu_plotter
-    def plot(self):
-        """Plot the glaciers in the collection to compare them."""
-
-        if len(self._glaciers) < 1:
-            raise ValueError("Collection is empty")
-
-        elif not self._check_collection():
-            msg = ("We can only plot glacier surfaces if the glaciers "
-                   "all have the same bed. Try .plot_side_by_side() "
-                   "instead.")
-            raise ValueError(msg)
-
-        # We use this to plot the bedrock etc.
-        gl1 = self._glaciers[0]
-        # Get the ax from the first plot
-        fig, ax = plt.subplots()
-        # Bedrock
-        ax.plot(
-            gl1.bed.distance_along_glacier,
-            gl1.bed.bed_h,
-            label="Bedrock",
-            ls=":",
-            c="k",
-            lw=2,
-            zorder=3,
-        )
-        ax.set_ylim((gl1.bed.bottom, gl1.bed.top + 200))
-        # Fill it in.
-        ax.fill_betweenx(
-            gl1.bed.bed_h, gl1.bed.distance_along_glacier, facecolor="lightgrey"
+        partial_eq_progression = partial(
+            self._partial_eq_progression, years, t_rate, adaptive
         )
 
-        # Set the title.
-        ax.set_title("Glacier collection")
+        if cache is None:
+            self._run_tasks(partial_eq_progression)
+            return
 
-        elas = []
-        # Loop over the collection.
+        # Look the glaciers up in the parent process, only run the misses.
+        misses = []
         for glacier in self._glaciers:
-            # Plot the surface
-            if glacier.current_state is not None:
-                # Masking shenanigans.
-                diff = glacier.current_state.surface_h - glacier.bed.bed_h
-                mask = diff > 0
-                idx = diff.argmin()
-                mask[: idx + 1] = True
-                # Fill the ice.
-                ax.fill_between(
-                    glacier.bed.distance_along_glacier,
-                    glacier.current_state.surface_h,
-                    glacier.bed.bed_h,
-                    where=mask,
-                    facecolors="white",
-                    # edgecolors=color_cycler(i),
-                    # lw=2,
-                )
-                # Plot outline
-                ax.plot(
-                    glacier.bed.distance_along_glacier[mask],
-                    glacier.current_state.surface_h[mask],
-                    label=f"Glacier {glacier.id} at year" + f" {glacier.age}",
-                )
-                # Ylim
-                ax.set_ylim((gl1.bed.bottom, gl1.current_state.surface_h[0] + 200))
-            elas.append(glacier.ela)
-
-        # If all elas are equal.
-        if len(set(elas)) == 1:
-            # Plot the ELA
-            ax.axhline(elas[0], ls="--", zorder=1)
-            ax.text(
-                glacier.bed.distance_along_glacier[-1],
-                elas[0] + 10,
-                "All ELAs are equal",
-                ha="right",
-                va="bottom",
-            )
-        # If elas not equal.
-        else:
-            # Do we have some elas that are equal?
-            # Get a set dictionary of ELAs.
-            elas_d = {key: "" for key in set(elas)}
-            # Fill it.
-            for i, key in enumerate(elas):
-                elas_d[key] += f"{i+1}, "
-
-            # Loop the unique ELAs.
-            for ela, string in elas_d.items():
-                # Add the annotation.
-                ax.text(
-                    glacier.bed.distance_along_glacier[-1],
-                    ela + 10,
-                    f"ELA glacier {string[:-2]}",
-                    ha="right",
-                    va="bottom",
-                )
-                # Plot the ELA
-                ax.axhline(ela, ls="--", zorder=1)
-
-        # axis labels.
-        ax.set_xlabel("Distance along glacer [km]")
-        ax.set_ylabel("Altitude [m]")
-        # Add 2% of bed length as padding to the plot.
-        ax.set_xlim((0, gl1.bed.distance_along_glacier[-1] * 1.02))
-        ax.set_facecolor("#ADD8E6")
-        plt.legend(loc="lower left")
-        # Add a second legend with infos.
-        # It would be cool to only show attributes that are different.
-        labels = []
-        for glacier in self._glaciers:
-            # Create the label
-            label = (
-                f"Id: {(glacier).id}\n"
-                f"Type: {type(glacier).__name__}\n"
-                f"ELA: {glacier.ela} \n"
-                f"MB grad: {glacier.mb_gradient} \n"
-                f"Age: {glacier.age} \n"
-                f"Creep: {glacier.creep_str} \n"
-                f"Sliding: {glacier.basal_sliding_str}"
-            )
-            # Append the label to the list.
-            labels.append(label)
-        # Get the handles back
-        handles, _ = ax.get_legend_handles_labels()
-        # Create the legend
-        fig.legend(
-            handles[1:],
-            labels,
-            title="Glacier info",
-            loc="upper left",
-            bbox_to_anchor=(0.9, 0.89),
-        )
-
-    @edu_plotter
-    def plot_side_by_side(self):
+            glacier._progress_scenario()
+            key = glacier._equilibrium_lookup(cache, years, t_rate)
+            if key is not None:
+                misses.append((key, glacier, glacier.age))
+        glaciers = [glacier for _, glacier, _ in misses]
+        if glaciers:
+            self._run_tasks(partial_eq_progression, glaciers)
+        for key, glacier, start_age in misses:
+            # Only cache if the search did not fail.
+            if glacier.age > start_age:
+                cache.put(key, glacier._equilibrium_entry(start_age, years, cache, t_rate))
+
+    def plot(self, **kwargs):
+        """Plot the glaciers in the collection to compare them. See
+        oggm_edu.plotting.plot_collection, ``live=True`` returns a plot which
+        can be updated in place."""
+        from oggm_edu.plotting import plot_collection
+        return plot_collection(self, **kwargs)
+
+    def plot_side_by_side(self, **kwargs):
         """Plot the collection but side by side.
 
         Useful for glaciers with different bed slopes for example.
         """
-        if len(self._glaciers) < 1:
-            raise ValueError("Collection is empty")
-
-        # Get the axes
-        fig, axes = plt.subplots(
-            nrows=2, ncols=len(self._glaciers),
-            gridspec_kw={"height_ratios": [2, 1]},
-            sharex=True,
-        )
+        from oggm_edu.plotting import plot_collection_side_by_side
+        return plot_collection_side_by_side(self, **kwargs)
 
-        # Loop over the collection.
-        if len(self._glaciers) == 1:
-            self._glaciers[0].plot(axes=axes)
-        else:
-            ax0 = None
-            for i, (axs, glacier) in enumerate(zip(axes.T, self._glaciers)):
-                glacier.plot(axes=axs, title_number=i+1)
-                if ax0 is None:
-                    xr = glacier._decide_xlim()
-                    yr = glacier._decide_ylim()
-                    ax0 = axs[0]
-                    ax1 = axs[1]
-                else:
-                    xr = np.append(xr, glacier._decide_xlim())
-                    yr = np.append(yr, glacier._decide_ylim())
-                    axs[0].sharey(ax0)
-                    axs[1].sharey(ax1)
-            ax0.set_xlim(np.min(xr), np.max(xr))
-            ax0.set_ylim(np.min(yr), np.max(yr))
-        plt.tight_layout()
-
-    @edu_plotter
-    def plot_history(self):
+    def plot_history(self, **kwargs):
         """Plot the histories of the collection."""
+        from oggm_edu.plotting import plot_collection_history
+        return plot_collection_history(self, **kwargs)
 
-        fig, (ax1, ax2, ax3) = plt.subplots(nrows=3, sharex=True)
-
-        # Check so that the glacier has a history.
-        for i, glacier in enumerate(self._glaciers):
-            if glacier.history is not None:
-                # Plot the length.
-                glacier.history.length_m.plot(ax=ax1)
-                # Plot the volume
-                glacier.history.volume_m3.plot(ax=ax2)
-                # Plot the area
-                glacier.history.area_m2.plot(
-                    ax=ax3,
-                    label=(
-                        f"Id: {(glacier).id}\n"
-                        f"Glacier {i+1}\n"
-                        f"Type: {type(glacier).__name__}\n"
-                        f"ELA: {glacier.ela}\n"
-                        f"MB grad: {glacier.mb_gradient}\n"
-                        f"Age: {glacier.age}\n"
-                        f"Creep: {glacier.creep_str}\n"
-                        f"Sliding: {glacier.basal_sliding_str}"
-                    ),
-                )
-            else:
-                print("Glacier history missing")
-        # Decorations
-        ax1.set_xlabel("")
-        ax1.set_title("Glacier collection evolution")
-        ax1.annotate(
-            "Glacier length",
-            (0.98, 0.1),
-            xycoords="axes fraction",
-            bbox={"boxstyle": "Round", "color": "lightgrey"},
-            ha="right",
-        )
-        ax1.set_ylabel("Length [m]")
-        ax2.set_xlabel("")
-        ax2.annotate(
-            "Glacier volume",
-            (0.98, 0.1),
-            xycoords="axes fraction",
-            bbox={"boxstyle": "Round", "color": "lightgrey"},
-            ha="right",
-        )
-        ax2.set_ylabel("Volume [m$^3$]")
-        ax3.set_xlabel("Year")
-        ax3.annotate(
-            "Glacier area",
-            (0.98, 0.1),
-            xycoords="axes fraction",
-            bbox={"boxstyle": "Round", "color": "lightgrey"},
-            ha="right",
-        )
-        ax3.set_ylabel("Area [m$^2$]")
-        # Grid on.
-        ax1.grid(True)
-        ax2.grid(True)
-        ax3.grid(True)
-
-        handles, labels = ax3.get_legend_handles_labels()
-        fig.legend(
-            handles,
-            labels,
-            loc="upper left",
-            ncol=1,
-            title="Glacier info",
-            bbox_to_anchor=(0.9, 0.89),
-        )
-
-    @edu_plotter
-    def plot_mass_balance(self):
+    def plot_mass_balance(self, **kwargs):
         """Plot the mass balance(s) for the glaciers in the collection."""
-
-        fig, ax = plt.subplots()
-
-        # How many unique ELAS do we have?
-        elas = []
-
-        # Plot annual mass balance for each glacier.
-        for glacier in self.glaciers:
-            ax.plot(
-                glacier.annual_mass_balance,
-                glacier.bed.bed_h,
-                label=f"Glacier {glacier.id}, " + f"gradient {glacier.mass_balance.gradient}",
-            )
-            # Add each ELA.
-            elas.append(glacier.mass_balance.ela)
-        # Add labels.
-        ax.set_xlabel("Annual mass balance [m yr-1]")
-        ax.set_ylabel("Altitude [m]")
-
-        # Add 0 lines.
-        ax.axvline(x=0, ls=":", label="Mass balance = 0", c="tab:green")
-
-        # Plot the ELAs.
-        # If all elas are equal.
-        if len(set(elas)) == 1:
-            # Plot the ELA
-            ax.axhline(elas[0], ls="--", zorder=1)
-            # Where to place the annotation?
-            extent = np.array(self.annual_mass_balance).min()
-            ax.text(extent, elas[0] + 2, "All ELAs are equal", ha="left", va="bottom")
-        # If elas not equal.
-        else:
-            # Do we have some elas that are equal?
-            # Get a set dictionary of ELAs.
-            elas_d = {key: "" for key in set(elas)}
-            # Fill it.
-            for i, key in enumerate(elas):
-                elas_d[key] += f"{i+1}, "
-
-            # Loop the unique ELAs.
-            for ela, string in elas_d.items():
-                # Add the annotation.
-                extent = np.array(self.annual_mass_balance).min()
-                ax.text(
-                    extent,
-                    ela + 2,
-                    f"ELA  glacier {string[:-2]}",
-                    ha="left",
-                    va="bottom",
-                )
-                # Plot the ELA
-                ax.axhline(ela, ls="--", zorder=1)
-        ax.set_title("Mass balance profiles")
-
-        plt.legend()
+        from oggm_edu.plotting import plot_collection_mass_balance
+        return plot_collection_mass_balance(self, **kwargs)
@@ -0,0 +1,346 @@
+"""This module provides the utility classes used by the Glacier to store its
+history and state history. Appending to a HistoryStore is cheap, independent
+of how much history the glacier already has. A HistoryFile writes the history
+to a netCDF file instead of keeping it in memory.
+"""
+
+# Other libraries
+import numpy as np
+import copy
+import netCDF4
+import weakref
+import xarray as xr
+
+
+class HistoryStore:
+    """Append-optimised storage for the time series produced by OGGM runs.
+
+    The data along the time dimension is kept in pre-allocated numpy buffers
+    which grow geometrically, so appending a run is amortised O(1) per year.
+    The data is exposed as an xarray dataset when accessed.
+
+    Attributes
+    ----------
+    size : int
+        Number of time steps in the store.
+    capacity : int
+        Number of time steps the buffers can hold before they have to grow.
+    """
+
+    def __init__(self, ds, dim="time", growth=2):
+        """Initialise the store from a dataset.
+
+        Parameters
+        ----------
+        ds : xarray.Dataset
+            First dataset, e.g. the output of ``run_until_and_store``.
+        dim : str, optional
+            Name of the dimension to append along.
+        growth : int or float, optional
+            Factor by which the buffers grow when they are full.
+        """
+        if growth <= 1:
+            raise ValueError("growth should be above 1.")
+        self.dim = dim
+        self.growth = growth
+        self.attrs = dict(ds.attrs)
+        # Order of the variables, coordinates first, to rebuild the dataset.
+        self._coord_names = [name for name in ds.coords if name != dim]
+        self._var_names = list(ds.data_vars)
+        # Variables along the time dimension go in the buffers, the rest is static.
+        self._meta = {}
+        self._static = {}
+        for name in self._coord_names + self._var_names:
+            var = ds.variables[name]
+            if dim in var.dims:
+                var = var.transpose(dim, ...)
+                self._meta[name] = (var.dims, dict(var.attrs))
+            else:
+                self._static[name] = var.copy()
+        self._time_attrs = dict(ds[dim].attrs)
+
+        self.size = 0
+        self.capacity = 0
+        self._time = np.empty(0, dtype=ds[dim].dtype)
+        self._buffers = {
+            name: np.empty((0,) + ds.variables[name].transpose(dim, ...).shape[1:],
+                           dtype=ds.variables[name].dtype)
+            for name in self._meta
+        }
+        # Cached dataset, and whether the buffers are shared with it.
+        self._ds = None
+        self._shared = False
+        # Whether the buffers are shared with a copy of the store.
+        self._borrowed = False
+        self.append(ds)
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self, needed):
+        """Re-allocate the buffers to hold at least ``needed`` time steps."""
+        capacity = max(needed, int(np.ceil(self.capacity * self.growth)), 16)
+        time = np.empty(capacity, dtype=self._time.dtype)
+        time[: self.size] = self._time[: self.size]
+        self._time = time
+        # A new dict, copies of the store share the old one.
+        buffers = {}
+        for name, buf in self._buffers.items():
+            buffers[name] = np.empty((capacity,) + buf.shape[1:], dtype=buf.dtype)
+            buffers[name][: self.size] = buf[: self.size]
+        self._buffers = buffers
+        self.capacity = capacity
+        self._shared = False
+        self._borrowed = False
+
+    def append(self, ds, overlap=1):
+        """Append a dataset to the store.
+
+        Parameters
+        ----------
+        ds : xarray.Dataset
+            Dataset with the same variables as the store.
+        overlap : int, optional
+            Number of time steps at the end of the store replaced by the
+            new data. A new run starts at the last year of the previous one,
+            which is why this is 1 by default. Ignored for an empty store.
+            Time steps before the start of the new data are never replaced,
+            e.g. when the stored states are thinned out.
+        """
+        if set(ds.data_vars) != set(self._var_names):
+            raise ValueError("Dataset variables do not match the history.")
+        start = max(self.size - overlap, 0)
+        if ds.sizes[self.dim]:
+            start = max(
+                start,
+                np.searchsorted(self._time[: self.size], ds[self.dim].values[0]),
+            )
+        end = start + ds.sizes[self.dim]
+        # The cached dataset is a view of the buffers, don't modify it.
+        # Copies of the store write in their own buffers.
+        if (
+            end > self.capacity
+            or self._borrowed
+            or (self._shared and start < self.size)
+        ):
+            self._grow(end)
+        self._time[start:end] = ds[self.dim].values
+        for name, buf in self._buffers.items():
+            buf[start:end] = ds.variables[name].transpose(self.dim, ...).values
+        self.size = end
+        self._ds = None
+
+    def copy(self):
+        """Copy of the store, sharing the buffers until one of them is
+        appended to.
+
+        Returns
+        -------
+        HistoryStore
+        """
+        new = copy.copy(self)
+        new.attrs = dict(self.attrs)
+        new._ds = None
+        new._shared = False
+        # The first append of either store re-allocates its buffers.
+        new._borrowed = True
+        self._borrowed = True
+        return new
+
+    def truncate(self, size):
+        """Drop the time steps after the first ``size`` ones.
+
+        Parameters
+        ----------
+        size : int
+            Number of time steps to keep.
+        """
+        if not 0 <= size <= self.size:
+            raise ValueError(f"size should be between 0 and {self.size}.")
+        self.size = size
+        self._ds = None
+
+    def to_dataset(self):
+        """The history as an xarray dataset.
+
+        The dataset is a read-only view on the store, valid until the
+        next append.
+        """
+        if self._ds is None:
+            variables = {}
+            for name in self._coord_names + self._var_names:
+                if name in self._static:
+                    variables[name] = self._static[name]
+                else:
+                    dims, attrs = self._meta[name]
+                    data = self._buffers[name][: self.size]
+                    # Quantized data is decoded, as when reading a file.
+                    if "scale_factor" in attrs:
+                        attrs = dict(attrs)
+                        data = data * attrs.pop("scale_factor")
+                    data.flags.writeable = False
+                    variables[name] = xr.Variable(dims, data, attrs)
+            time = self._time[: self.size]
+            time.flags.writeable = False
+            coords = {self.dim: xr.Variable(self.dim, time, self._time_attrs)}
+            coords.update({name: variables[name] for name in self._coord_names})
+            data_vars = {name: variables[name] for name in self._var_names}
+            self._ds = xr.Dataset(data_vars, coords=coords, attrs=self.attrs)
+            self._shared = True
+        return self._ds
+
+
+class HistoryFile:
+    """Storage for the time series produced by OGGM runs, written incrementally
+    to a group of a netCDF file.
+
+    Only the data being appended is held in memory. The data is read lazily
+    from the file when accessed.
+
+    Attributes
+    ----------
+    path : str
+        Path of the netCDF file.
+    group : str
+        Group of the file the data is written in.
+    size : int
+        Number of time steps in the store.
+    """
+
+    # Stores with a dataset read from their file. Writing to a file needs
+    # all of them closed.
+    _readers = weakref.WeakSet()
+
+    def __init__(self, ds, path, group, dim="time"):
+        """Initialise the store from a dataset. The file has to exist, the
+        group is created in it.
+
+        Parameters
+        ----------
+        ds : xarray.Dataset
+            First dataset, e.g. the output of ``run_until_and_store``.
+        path : str
+            Path of the netCDF file.
+        group : str
+            Name of the group to create in the file.
+        dim : str, optional
+            Name of the dimension to append along.
+        """
+        self.path = path
+        self.group = group
+        self.dim = dim
+        self._var_names = list(ds.data_vars)
+        self._time_vars = [
+            name for name, var in ds.variables.items() if dim in var.dims
+        ]
+        self.size = 0
+        self._last = None
+        self._ds = None
+
+        with netCDF4.Dataset(path, "a") as nc:
+            grp = nc.createGroup(group)
+            attrs = self._nc_attrs(ds.attrs)
+            # So that the coordinates are read as such.
+            coords = [name for name in ds.coords if name not in ds.dims]
+            if coords:
+                attrs["coordinates"] = " ".join(coords)
+            grp.setncatts(attrs)
+            grp.createDimension(dim, None)
+            for name, size in ds.sizes.items():
+                if name != dim:
+                    grp.createDimension(name, size)
+            for name, var in ds.variables.items():
+                if dim in var.dims:
+                    var = var.transpose(dim, ...)
+                nc_var = grp.createVariable(name, var.dtype, var.dims)
+                nc_var.setncatts(self._nc_attrs(var.attrs))
+                if dim not in var.dims:
+                    nc_var[:] = var.values
+        self.append(ds)
+
+    def __len__(self):
+        return self.size
+
+    def __getstate__(self):
+        # The dataset read from the file can't be pickled, it is read again.
+        state = self.__dict__.copy()
+        state["_ds"] = None
+        return state
+
+    @staticmethod
+    def _nc_attrs(attrs):
+        """Attributes which can be written to netCDF."""
+        return {
+            key: int(value) if isinstance(value, bool) else value
+            for key, value in attrs.items()
+            if value is not None
+        }
+
+    def close(self):
+        """Close the dataset read from the file, if any."""
+        if self._ds is not None:
+            self._ds.close()
+            self._ds = None
+            self._readers.discard(self)
+
+    def append(self, ds, overlap=1):
+        """Append a dataset to the store.
+
+        Time steps which are not after the last one in the store are skipped,
+        a new run starts at the last year of the previous one.
+
+        Parameters
+        ----------
+        ds : xarray.Dataset
+            Dataset with the same variables as the store.
+        overlap : int, optional
+            Only there for compatibility with HistoryStore.append, the
+            overlap is given by the time coordinate.
+        """
+        if set(ds.data_vars) != set(self._var_names):
+            raise ValueError("Dataset variables do not match the history.")
+        time = ds[self.dim].values
+        keep = np.ones(len(time), dtype=bool)
+        if self._last is not None:
+            keep &= time > self._last
+        rows = np.flatnonzero(keep)
+        if not len(rows):
+            return
+
+        # Datasets read from the file would keep it open.
+        for store in list(self._readers):
+            if store.path == self.path:
+                store.close()
+        start = self.size
+        end = start + len(rows)
+        with netCDF4.Dataset(self.path, "a") as nc:
+            # Quantized data is written as is.
+            nc.set_auto_scale(False)
+            grp = nc[self.group]
+            for name in self._time_vars:
+                var = ds.variables[name].transpose(self.dim, ...)
+                grp[name][start:end] = var.values[rows]
+        self.size = end
+        self._last = time[rows[-1]]
+
+    def copy(self):
+        """Copy of the data in memory.
+
+        Returns
+        -------
+        HistoryStore
+        """
+        return HistoryStore(self.to_dataset(), dim=self.dim)
+
+    def to_dataset(self):
+        """The history as an xarray dataset, read lazily from the file.
+
+        The dataset is valid until the next append to a store of the same
+        file.
+        """
+        if self._ds is None:
+            ds = xr.open_dataset(self.path, group=self.group, cache=False)
+            # The file can hold more, e.g. when resuming from a checkpoint.
+            self._ds = ds.isel({self.dim: slice(None, self.size)})
+            self._readers.add(self)
+        return self._ds
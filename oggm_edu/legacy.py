@@ -3,7 +3,6 @@ oggm-edu - useful functions - legacy module in versions prior to 1.0
 """
 import numpy as np
 import xarray as xr
-import urllib
 import pandas as pd
 import matplotlib.pyplot as plt
 from oggm.core.flowline import (
@@ -22,13 +21,17 @@ from oggm import entity_task
 
 # allow to plot pictures as subplots
 import matplotlib.image as mpimg
-from PIL import Image
+
+from oggm_edu.funcs import glacier_graphic, _init_oggm
 
 # Module logger
 import logging
 
 log = logging.getLogger(__name__)
 
+# The legacy functions expect an initialized OGGM.
+_init_oggm()
+
 
 graphics_url = (
     "https://raw.githubusercontent.com/OGGM/glacier-graphics/master/"
@@ -37,7 +40,7 @@ graphics_url = (
 
 
 def plot_glacier_graphics(num="01", title=False):
-    plt.imshow(Image.open(urllib.request.urlopen(graphics_url.format(num))))
+    plt.imshow(glacier_graphic(num))
     ax = plt.gca()
     ax.patch.set_visible(False)
     ax.axis("off")
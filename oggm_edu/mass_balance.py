@@ -3,9 +3,15 @@ the OGGM mass balance model which is to be used with the Glacier and
 SurgingGlacier classes.
 """
 
+# Internals
+from oggm_edu.funcs import _init_oggm
+
 # Other libraries.
+import copy
+import hashlib
 import numpy as np
 import pandas as pd
+from collections import OrderedDict
 from collections.abc import Sequence
 
 # Import OGGM things.
@@ -30,6 +36,11 @@ class MassBalance(MassBalanceModel):
         Original equilibrium line altitude of the mass balance profile. Unit: m.
     temp_bias : float
         Current temperature bias applied to the mass balance. Unit: C.
+    cache_size : int
+        Maximum number of mass balance profiles kept in the profile cache.
+        0 means that the cache is disabled.
+    max_mb : float or None
+        Maximum mass balance, the profile is capped at this value. Unit: mm/yr.
 
     """
 
@@ -41,6 +52,7 @@ class MassBalance(MassBalanceModel):
         max_mb=None,
         hemisphere=None,
         density=None,
+        cache_size=0,
     ):
         """Initialise the mass balance from the ELA and the gradient. Optionally pass breakpoints
         in the case of multiple gradients.
@@ -54,10 +66,28 @@ class MassBalance(MassBalanceModel):
             If array like with int/float, a mass balance with multiple gradients will be
             initialised.
         breakpoints : array_like(int or float) (Optional)
-            Specify the altitude breakpoints between mass balance gradients.
+            Specify the altitude breakpoints between mass balance gradients, in
+            descending order: gradient i applies above breakpoint i and gradient
+            i + 1 below it. Which gradient applies is decided by the height
+            itself, not by the grid node closest to the breakpoint. Breakpoints
+            which are not in descending order raise a ValueError.
+        cache_size : int (Optional)
+            Number of mass balance profiles to keep in a least recently used cache,
+            keyed by the heights. Only used outside of model runs, where the
+            heights change every step: e.g. for the annual mass balance of a
+            glacier which is asked for many times by plots and summaries.
+            Disabled (0) by default.
         """
+        # The density of ice comes from the OGGM parameters.
+        _init_oggm()
         super().__init__()
 
+        # Profile cache, has to exist before the setters are used.
+        self._mb_cache = OrderedDict()
+        self._mb_cache_hits = 0
+        self._mb_cache_misses = 0
+        self.cache_size = cache_size
+
         self.hemisphere = "nh"
         self.valid_bounds = [-1e4, 2e4]
 
@@ -83,9 +113,14 @@ class MassBalance(MassBalanceModel):
                 raise ValueError(
                     "Gradients and breakpoints have to be above, or equal to, 0."
                 )
+            elif np.any(np.diff(breakpoints) >= 0):
+                raise ValueError("Please provide breakpoints in descending order.")
             else:
                 self.grad = gradient
                 self._breakpoints = breakpoints
+                # Array versions used to evaluate the profile.
+                self._gradients = np.asarray(gradient, dtype=float)
+                self._breakpoints_arr = np.asarray(breakpoints, dtype=float)
         # If we get multiple gradients but no break points.
         elif isinstance(gradient, Sequence) and not breakpoints:
             raise ValueError(
@@ -104,6 +139,7 @@ class MassBalance(MassBalanceModel):
         # Temperature bias evolution
         self._temp_bias = 0
         self._temp_bias_series = pd.DataFrame({"year": [0], "bias": [self.temp_bias]})
+        self._update_temp_bias_lookup()
 
     def _to_json(self):
         json = {
@@ -141,6 +177,7 @@ class MassBalance(MassBalanceModel):
         # Temperature bias evolution
         self._temp_bias = 0
         self._temp_bias_series = pd.DataFrame({"year": [0], "bias": [self.temp_bias]})
+        self._update_temp_bias_lookup()
 
     @property
     def gradient(self):
@@ -188,6 +225,39 @@ class MassBalance(MassBalanceModel):
         else:
             raise ValueError("ELA below 0 not allowed.")
 
+    # The profile depends on these attributes, setting them empties the cache.
+    @property
+    def ela_h(self):
+        """Altitude of the equilibrium line (m)."""
+        return self._ela_h
+
+    @ela_h.setter
+    def ela_h(self, value):
+        # The ELA is set at every model step, only a new value changes the profile.
+        if value != getattr(self, "_ela_h", None):
+            self.cache_clear()
+        self._ela_h = value
+
+    @property
+    def grad(self):
+        """Gradient(s) of the mass balance profile (mm/m/yr)."""
+        return self._grad
+
+    @grad.setter
+    def grad(self, value):
+        self.cache_clear()
+        self._grad = value
+
+    @property
+    def max_mb(self):
+        """Maximum mass balance (mm/yr), None if the profile is not capped."""
+        return self._max_mb
+
+    @max_mb.setter
+    def max_mb(self, value):
+        self.cache_clear()
+        self._max_mb = value
+
     def get_monthly_mb(self, heights, year=None, **kwargs):
         """Calculate the monthly mass balance for the glacier.
 
@@ -211,29 +281,67 @@ class MassBalance(MassBalanceModel):
             # the mass balance.
             year = year + 1
             # If we have a future climate scenario essentially.
-            if year <= self.temp_bias_series.year.iloc[-1]:
+            if year <= self._temp_bias_last_year:
                 # We get a temp bias from the series, update the ela of our mb.
                 # Uses the temp_bias setter.
-                self.temp_bias = self.temp_bias_series.bias[
-                    self.temp_bias_series.year == year
-                ].values[0]
+                self.temp_bias = self._temp_bias_lookup[
+                    int(year - self._temp_bias_first_year)
+                ]
             # If there is no future climate scenario, we simply append the current bias to the history.
             # e.g. when climate remains constant.
             else:
                 # Add the current temperature bias (unchanged) to the history.
-                self.temp_bias_series = [self.temp_bias]
+                self._append_temp_bias(self.temp_bias)
+
+        # Do we have this profile already? Not during model runs, the surface
+        # heights are new at every step.
+        if self.cache_size and year is None:
+            heights = np.asarray(heights)
+            digest = hashlib.blake2b(heights.tobytes(), digest_size=16).digest()
+            key = (heights.shape, heights.dtype.str, digest)
+            if key in self._mb_cache:
+                self._mb_cache_hits += 1
+                self._mb_cache.move_to_end(key)
+                return self._mb_cache[key].copy()
+            self._mb_cache_misses += 1
+            mb = self._compute_mb(heights)
+            self._mb_cache[key] = mb
+            # Forget the least recently used profile.
+            if len(self._mb_cache) > self.cache_size:
+                self._mb_cache.popitem(last=False)
+            return mb.copy()
+
+        return self._compute_mb(heights)
+
+    def _compute_mb(self, heights):
+        """Compute the mass balance profile for the current state of the
+        mass balance.
 
+        Parameters
+        ----------
+        heights : np.ndarray
+            altitudes at which to compute the MB
+
+        Returns
+        -------
+        The mass-balances for each height.
+        """
+        heights = np.asarray(heights)
         # Compute the mb
-        # We use the _gradient_lookup to get an array of gradients matching the length of heights.
-        # _breakpoint_diff computes the mb difference at the breakpoint height for the two different
-        # gradients. Used to adjust the intercept of the new gradient curve.
-        mb = (np.asarray(heights) - self.ela_h) * self._gradient_lookup(
-            heights
-        ) + self._breakpoint_diff(heights)
+        # The profile is piecewise linear: every height belongs to a gradient segment,
+        # the segment gradient gives the slope and _segment_offsets the intercept which
+        # makes the segments match at the breakpoints.
+        if isinstance(self.gradient, Sequence):
+            segments = self._segment_index(heights)
+            mb = (heights - self.ela_h) * self._gradients[
+                segments
+            ] + self._segment_offsets()[segments]
+        else:
+            mb = (heights - self.ela_h) * float(self.grad)
 
         # Adjust intercept for the case when breakpoint is above ELA.
         # Essentially making sure that the mb profile is zero at the ELA.
-        ela_idx = np.argmin(np.abs(np.asarray(heights) - self.ela_h))
+        ela_idx = np.argmin(np.abs(heights - self.ela_h))
         mb = mb - mb[ela_idx]
         # Should we cap the mb?
         if self.max_mb:
@@ -241,6 +349,46 @@ class MassBalance(MassBalanceModel):
 
         return mb / SEC_IN_YEAR / self.rho
 
+    @property
+    def cache_size(self):
+        """Maximum number of profiles in the mass balance cache. 0 disables it."""
+        return self._cache_size
+
+    @cache_size.setter
+    def cache_size(self, value):
+        """Set the size of the mass balance cache.
+
+        Parameters
+        ----------
+        value : int
+            Maximum number of profiles to keep. 0 disables the cache.
+        """
+        if not isinstance(value, int) or value < 0:
+            raise ValueError("cache_size should be an integer above, or equal to, 0.")
+        self._cache_size = value
+        # Trim the cache if it shrunk.
+        while len(self._mb_cache) > value:
+            self._mb_cache.popitem(last=False)
+
+    def cache_info(self):
+        """Statistics of the mass balance cache.
+
+        Returns
+        -------
+        dict
+            Number of hits, misses, current size and maximum size of the cache.
+        """
+        return {
+            "hits": self._mb_cache_hits,
+            "misses": self._mb_cache_misses,
+            "size": len(self._mb_cache),
+            "maxsize": self.cache_size,
+        }
+
+    def cache_clear(self):
+        """Empty the mass balance cache. The hit and miss counters are kept."""
+        self._mb_cache.clear()
+
     def get_annual_mb(self, heights, year=None, **kwargs):
         """Get the annual mass balance.
 
@@ -255,6 +403,42 @@ class MassBalance(MassBalanceModel):
         """
         return self.get_monthly_mb(heights, year)
 
+    def _segment_index(self, heights):
+        """Find the gradient segment of each height.
+
+        Parameters
+        ----------
+        heights : array_like(float or int)
+            Collection of heights, in any order.
+
+        Returns
+        -------
+        segments : array
+            Array of length == len(heights), where value at position i is the index of
+            the gradient applying to height at pos. i. A height at, or below, breakpoint
+            j belongs to segment j + 1.
+        """
+        # Breakpoints are descending, searchsorted needs them ascending.
+        return np.searchsorted(
+            -self._breakpoints_arr, -np.asarray(heights), side="right"
+        )
+
+    def _segment_offsets(self):
+        """Intercept shift of every gradient segment, for the curves to match
+        at the breakpoints.
+
+        Returns
+        -------
+        offsets : array
+            Array of length == number of gradients. Segment 0 is not shifted.
+        """
+        # The mass balance difference between two gradients at the break point,
+        # accumulated from the top and down.
+        mb_diff = (self._breakpoints_arr - self.ela_h) * (
+            self._gradients[:-1] - self._gradients[1:]
+        )
+        return np.concatenate([[0.0], np.cumsum(mb_diff)])
+
     def _gradient_lookup(self, heights):
         """Compute the mass balance gradient for the given heights.
 
@@ -270,23 +454,12 @@ class MassBalance(MassBalanceModel):
             corresponding to height at pos. i. E.g. [15, 15, 15, 7, 7, 5].
 
         """
-        # How many gradients do we need?
-        gradients = np.zeros(len(heights))
-        # If we hace multiple gradients
+        # If we have multiple gradients
         if isinstance(self.gradient, Sequence):
-            # We start with a linear profile
-            gradients[:] = self.gradient[0]
-            # Then we want to change the profile, per breakpoint
-            for breakpoint, grad in zip(self._breakpoints, self.gradient[1:]):
-                # Get the breakpoint index
-                idx = np.argmin(np.abs(np.asarray(heights) - breakpoint))
-                # Semi-broadcast, set the new gradient from the breakpoint and down.
-                gradients[idx:] = grad
+            return self._gradients[self._segment_index(heights)]
         # Single gradient
         else:
-            gradients[:] = self.grad
-
-        return gradients
+            return np.full(len(heights), self.grad, dtype=float)
 
     def _breakpoint_diff(self, heights):
         """Calculate how much a new section of the mb curve has to be shifted at the gradient
@@ -302,28 +475,78 @@ class MassBalance(MassBalanceModel):
         diff : array
             Array matching the length of heights with values to shift the mass balance.
         """
-
-        # We begin with zero difference.
-        diff = np.zeros(len(heights))
-
-        # If we hace multiple gradients.
+        # If we have multiple gradients.
         if isinstance(self.gradient, Sequence):
-            # We loop over the breakpoints again.
-            for i, breakpoint in enumerate(self._breakpoints):
-                # From where in the diff array do we add the diff?
-                idx = np.argmin(np.abs(np.asarray(heights) - breakpoint))
-                # The mass balance difference between two gradients at the break point.
-                mb_diff = (breakpoint - self.ela_h) * (
-                    self.gradient[i] - self.gradient[i + 1]
-                )
-                # Add the mb_diff from breakpoint and down.
-                diff[idx:] += mb_diff
-
+            return self._segment_offsets()[self._segment_index(heights)]
         # If we only have one gradient, return a 0 diff.
         else:
-            pass
+            return np.zeros(len(heights))
+
+    def _update_temp_bias_lookup(self):
+        """Rebuild the dense year -> bias array from the temperature bias series.
+
+        The model asks for the bias many times per simulated year, so instead of
+        masking the dataframe on every call we index into this array with
+        ``year - first_year``. Has to be called every time the series changes.
+        """
+        years = self._temp_bias_series.year.to_numpy()
+        biases = self._temp_bias_series.bias.to_numpy()
+        self._temp_bias_first_year = years[0]
+        self._temp_bias_last_year = years[-1]
+        # Years are usually contiguous, then the bias column is the lookup.
+        idx = (years - years[0]).astype(int)
+        if len(idx) == idx[-1] + 1:
+            self._temp_bias_lookup = biases
+        # Gaps in the series are years without a bias.
+        else:
+            self._temp_bias_lookup = np.full(idx[-1] + 1, np.nan)
+            self._temp_bias_lookup[idx] = biases
+        # The lookup is a view on this buffer, which grows with _append_temp_bias.
+        self._temp_bias_buffer = self._temp_bias_lookup
+
+    def _append_temp_bias(self, value):
+        """Append the bias of one more year to the series.
+
+        This happens every simulated year when the climate is constant. The
+        lookup array grows geometrically and the dataframe is only updated
+        the next time it is accessed, so the append is cheap.
+
+        Parameters
+        ----------
+        value : float
+            Temperature bias of the year after the last year of the series.
+        """
+        self._temp_bias_pending.append(value)
+        self._temp_bias_last_year = self._temp_bias_last_year + 1
+        n = len(self._temp_bias_lookup) + 1
+        buffer = self._temp_bias_buffer
+        dtype = np.result_type(buffer.dtype, np.asarray(value).dtype)
+        if n > len(buffer) or dtype != buffer.dtype:
+            buffer = np.empty(max(2 * len(buffer), n), dtype=dtype)
+            buffer[: n - 1] = self._temp_bias_lookup
+            self._temp_bias_buffer = buffer
+        buffer[n - 1] = value
+        self._temp_bias_lookup = buffer[:n]
+
+    @property
+    def _temp_bias_series(self):
+        """The temperature bias dataframe, with the pending yearly appends added."""
+        if self._temp_bias_pending:
+            next_year = self._temp_bias_df.year.iloc[-1] + 1
+            years = np.arange(next_year, next_year + len(self._temp_bias_pending))
+            df = pd.DataFrame(
+                {"year": years, "bias": np.asarray(self._temp_bias_pending)}
+            )
+            self._temp_bias_df = pd.concat([self._temp_bias_df, df]).reset_index(
+                drop=True
+            )
+            self._temp_bias_pending = []
+        return self._temp_bias_df
 
-        return diff
+    @_temp_bias_series.setter
+    def _temp_bias_series(self, df):
+        self._temp_bias_df = df
+        self._temp_bias_pending = []
 
     @property
     def temp_bias(self):
@@ -380,6 +603,74 @@ class MassBalance(MassBalanceModel):
             self._temp_bias_series = pd.concat(
                 [self._temp_bias_series, df]
             ).reset_index(drop=True)
+            self._update_temp_bias_lookup()
+
+    def _copy(self):
+        """Light copy of the mass balance. The temperature bias series is
+        shared until one of the copies extends it, the profile cache is not.
+        """
+        mb = copy.copy(self)
+        mb._mb_cache = OrderedDict()
+        mb._mb_cache_hits = 0
+        mb._mb_cache_misses = 0
+        # Also gives the copy its own list of pending appends.
+        mb._temp_bias_series = self._temp_bias_series
+        # The lookup is only read. The buffer is full, so the first append of
+        # the copy re-allocates it.
+        mb._temp_bias_buffer = mb._temp_bias_lookup
+        return mb
+
+    def _climate_slice(self, year):
+        """Light copy of the mass balance, holding only the climate from the
+        given year and on. Used to send the mass balance to worker processes.
+
+        Parameters
+        ----------
+        year : int
+            Current age of the glacier.
+        """
+        mb = copy.copy(self)
+        mb._mb_cache = OrderedDict()
+        # The model reads the bias of the next year, keep the current one as well.
+        year = min(year, self._temp_bias_last_year)
+        mb._temp_bias_series = self._temp_bias_series[
+            self._temp_bias_series.year >= year
+        ].reset_index(drop=True)
+        mb._update_temp_bias_lookup()
+        return mb
+
+    def _climate_delta(self, year):
+        """State of the mass balance and the part of the temperature bias series
+        after the given year. Counterpart of ``_merge_climate``.
+
+        Parameters
+        ----------
+        year : int
+            Last year of the series already known by the receiving mass balance.
+        """
+        return {
+            "ela_h": self.ela_h,
+            "temp_bias": self._temp_bias,
+            "temp_bias_series": self._temp_bias_series[
+                self._temp_bias_series.year > year
+            ],
+        }
+
+    def _merge_climate(self, delta):
+        """Update the mass balance with a delta from ``_climate_delta``.
+
+        Parameters
+        ----------
+        delta : dict
+            Delta produced by ``_climate_delta`` of a slice of this mass balance.
+        """
+        self.ela_h = delta["ela_h"]
+        self._temp_bias = delta["temp_bias"]
+        if len(delta["temp_bias_series"]):
+            self._temp_bias_series = pd.concat(
+                [self._temp_bias_series, delta["temp_bias_series"]]
+            ).reset_index(drop=True)
+            self._update_temp_bias_lookup()
 
     def add_temp_bias(self, temp_bias, duration, noise=None):
         """Add a gradual temperature bias to the mass balance of the
@@ -467,3 +758,4 @@ class MassBalance(MassBalanceModel):
             self._temp_bias_series = pd.concat(
                 [self._temp_bias_series, df]
             ).reset_index(drop=True)
+            self._update_temp_bias_lookup()
@@ -0,0 +1,1158 @@
+"""This module provides the plotting layer of OGGM-Edu: the functions behind
+the plot methods of the glaciers, beds and collections.
+
+The simulation classes don't import it, nor matplotlib, until one of their
+plot methods is called. The functions can also be used directly, e.g.
+``plot_glacier(glacier)`` is the same as ``glacier.plot()``.
+"""
+
+# Internals
+from oggm_edu.funcs import edu_plotter
+
+# Other libraries
+import numpy as np
+import os
+import re
+import warnings
+from itertools import cycle
+from collections.abc import Sequence
+
+# Plotting
+from matplotlib import animation
+from matplotlib import pyplot as plt
+from matplotlib.artist import Artist
+from matplotlib.patches import Patch, Polygon
+
+
+@edu_plotter
+def plot_bed(bed):
+    """Plot the bed.
+
+    Parameters
+    ----------
+    bed : oggm_edu.GlacierBed
+    """
+    # Since we are not modifying the base here, we don't need to assign
+    # any of the returns.
+    _bed_axes(bed)
+
+
+def _bed_axes(bed, axes=None, title=None):
+    """Create the base plot the glacier bed"""
+
+    if axes is not None:
+        fig = plt.gcf()
+        ax1, ax2 = axes
+    else:
+        fig, (ax1, ax2) = plt.subplots(
+            nrows=2, gridspec_kw={"height_ratios": [2, 1]}, sharex=True
+        )
+
+    # Plot the bed
+    ax1.plot(
+        bed.distance_along_glacier,
+        bed.bed_h,
+        label="Bedrock",
+        ls=":",
+        c="k",
+        lw=2,
+        zorder=3,
+    )
+    # And fill it.
+    ax1.fill_between(bed.distance_along_glacier, -100, bed.bed_h,
+                     color="lightgrey")
+    # Some labels etc.
+    ax1.set_ylabel("Altitude [m]")
+    ax1.set_facecolor("#ADD8E6")
+    ax1.set_ylim(bed.bottom, bed.top + 400)
+
+    # Fill the bed.
+    ax2.fill_between(
+        bed.distance_along_glacier,
+        -bed.widths / 2 * bed.map_dx,
+        bed.widths / 2 * bed.map_dx,
+        color="lightgrey",
+    )
+    # More styling.
+    ax2.set_facecolor("darkgrey")
+    ax2.axhline(0, c="k")
+    # We add 2% of the bed length to the plot to have some space.
+    ax2.set_xlim(bed._decide_xlim())
+    ax2.set_xlabel("Distance along glacier [km]")
+    ax2.set_ylabel("Width [m]")
+    if title is None:
+        ax1.set_title("Glacier domain")
+    else:
+        ax1.set_title(title)
+    ax1.legend()
+
+    return fig, ax1, ax2
+
+
+def _polygon(x, lower, upper):
+    """Vertices of the polygon between the lower and upper lines."""
+    return np.column_stack(
+        [np.concatenate([x, x[::-1]]), np.concatenate([upper, lower[::-1]])]
+    )
+
+
+class _LivePlot:
+    """Base of the plots which are updated in place.
+
+    Subclasses draw the static parts of the figure once and keep the artists
+    which change in ``self._artists``. ``draw`` then only redraws those,
+    blitting them over a saved background where the canvas supports it.
+    """
+
+    def _connect(self, blit):
+        self.blit = blit and self.fig.canvas.supports_blit
+        self._background = None
+        self._capturing = False
+        self.fig.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def _on_draw(self, event):
+        # A full redraw, e.g. after a resize, invalidates the background.
+        if not self._capturing:
+            self._background = None
+
+    def _capture(self):
+        """Draw the figure without the updated artists and save it."""
+        canvas = self.fig.canvas
+        visible = [artist.get_visible() for artist in self._artists]
+        self._capturing = True
+        try:
+            for artist in self._artists:
+                artist.set_visible(False)
+            canvas.draw()
+            self._background = canvas.copy_from_bbox(self.fig.bbox)
+        finally:
+            for artist, v in zip(self._artists, visible):
+                artist.set_visible(v)
+            self._capturing = False
+
+    def draw(self):
+        """Draw the updated artists, blitting them if possible."""
+        canvas = self.fig.canvas
+        if not self.blit:
+            canvas.draw_idle()
+            return
+        if self._background is None:
+            self._capture()
+        canvas.restore_region(self._background)
+        for artist in self._artists:
+            self.fig.draw_artist(artist)
+        canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+
+
+class GlacierPlot(_LivePlot):
+    """Plot of the state of a glacier, updated in place.
+
+    The bed is drawn once, ``update`` only changes the data of the ice,
+    width and ELA artists. Use it to follow a glacier in an interactive
+    loop, e.g. a slider progressing it year by year. Returned by
+    ``plot_glacier(glacier, live=True)``.
+
+    Attributes
+    ----------
+    glacier : oggm_edu.Glacier
+        The plotted glacier.
+    fig : matplotlib.figure.Figure
+    axes : tuple of matplotlib axes
+        Side and top-down axes.
+    blit : bool
+        Whether the updates are blitted, only redrawing the artists which
+        changed. If False, they are drawn with the next redraw of the canvas.
+    """
+
+    def __init__(self, glacier, axes=None, title_number=None, blit=True):
+        """Draw the bed and the current state of the glacier.
+
+        Parameters
+        ----------
+        glacier : oggm_edu.Glacier
+        axes : tuple of matplotlib axes, optional
+            Side and top-down axes to plot on. A new figure by default.
+        title_number : int, optional
+            Number of the glacier in the title, for side by side plots.
+        blit : bool, optional
+            Blit the updates where the canvas supports it. True by default.
+        """
+        self.glacier = glacier
+        self._title_number = title_number
+
+        title = None
+        if title_number is not None:
+            title = ''
+        self.fig, ax1, ax2 = _bed_axes(glacier.bed, axes=axes, title=title)
+        self.axes = ax1, ax2
+
+        # The glacier, and its outline.
+        empty = np.empty((0, 2))
+        self._ice = ax1.add_patch(Polygon(empty, color="white", lw=0))
+        (self._outline,) = ax1.plot([], [], lw=2, label="Current glacier outline")
+        # The glacier in the topdown view.
+        self._width = ax2.add_patch(
+            Polygon(empty, facecolor="white", edgecolor="C0", lw=2)
+        )
+        # ELA, on the side and top down.
+        self._ela = ax1.axhline(0, ls="--", c="k", lw=1)
+        self._ela_text = ax1.text(
+            glacier.bed.distance_along_glacier[-1],
+            0,
+            "ELA",
+            horizontalalignment="right",
+            verticalalignment="bottom",
+        )
+        (self._ela_width,) = ax2.plot([], [], c="k", ls="--", lw=1)
+        # A fixed position, titles are otherwise moved when one is hidden.
+        self._title = ax1.set_title("", loc="left", y=1.0)
+        ax1.legend(loc="lower left")
+
+        self._artists = [
+            self._ice,
+            self._outline,
+            self._width,
+            self._ela,
+            self._ela_text,
+            self._ela_width,
+            self._title,
+        ]
+        self._connect(blit)
+        state = glacier.current_state
+        self._set_state(None if state is None else state.thick, glacier.ela, glacier.age)
+
+    def _set_state(self, thick, ela, age, rescale=True):
+        """Update the artists to a state of the glacier.
+
+        Parameters
+        ----------
+        thick : array_like or None
+            Ice thickness along the glacier, None if there is no ice yet.
+        ela : float or None
+            Altitude of the ELA.
+        age : int
+            Age of the glacier, for the title.
+        rescale : bool, optional
+            Adapt the y limits to the height of the glacier. True by default.
+        """
+        bed = self.glacier.bed
+        x = bed.distance_along_glacier
+        half_width = bed.widths / 2 * bed.map_dx
+        ax1 = self.axes[0]
+
+        heights = bed.bed_h
+        if thick is not None:
+            heights = bed.bed_h + thick
+            # Some masking shenanigans
+            mask = thick > 0
+            idx = thick.argmin()
+            mask[: idx + 1] = True
+            self._ice.set_xy(_polygon(x[mask], bed.bed_h[mask], heights[mask]))
+            self._outline.set_data(x[mask], heights[mask])
+            # Where does the glacier have thickness?
+            ice = thick > 0
+            self._width.set_xy(_polygon(x[ice], -half_width[ice], half_width[ice]))
+            # The limits only change with the height of the glacier, which
+            # needs a full redraw.
+            ylim = (bed.bottom, heights[0] + 200)
+            if rescale and ylim != ax1.get_ylim():
+                ax1.set_ylim(ylim)
+                self._background = None
+
+        for artist in [self._ela, self._ela_text, self._ela_width]:
+            artist.set_visible(ela is not None)
+        if ela is not None:
+            self._ela.set_ydata([ela, ela])
+            self._ela_text.set_y(ela + 10)
+            # Where along the glacier is the ELA?
+            idx = np.abs(heights - ela).argmin()
+            self._ela_width.set_data(
+                [x[idx], x[idx]], [-half_width[idx], half_width[idx]]
+            )
+
+        if self._title_number is None:
+            title = f"Glacier state at year {int(age)}"
+        else:
+            title = f"Glacier {self._title_number}: state at year {int(age)}"
+        self._title.set_text(title)
+
+    def update(self):
+        """Update the plot to the current state of the glacier."""
+        state = self.glacier.current_state
+        self._set_state(
+            None if state is None else state.thick, self.glacier.ela, self.glacier.age
+        )
+        self.draw()
+
+
+@edu_plotter
+def plot_glacier(glacier, axes=None, title_number=None, live=False):
+    """Plot the current state of the glacier.
+
+    Parameters
+    ----------
+    glacier : oggm_edu.Glacier
+    axes : tuple of matplotlib axes, optional
+        Side and top-down axes to plot on. A new figure by default.
+    title_number : int, optional
+        Number of the glacier in the title, for side by side plots.
+    live : bool, optional
+        Return the plot, to update it in place with ``GlacierPlot.update``
+        after the glacier changed. False by default.
+
+    Returns
+    -------
+    GlacierPlot or None
+        The plot, if live.
+    """
+    plot = GlacierPlot(glacier, axes=axes, title_number=title_number)
+    if live:
+        return plot
+
+
+@edu_plotter
+def plot_mass_balance(glacier):
+    """Plot the mass balance profile of the glacier.
+
+    Parameters
+    ----------
+    glacier : oggm_edu.Glacier
+    """
+    f, ax = plt.subplots()
+    ax.plot(
+        glacier.annual_mass_balance,
+        glacier.bed.bed_h,
+        label="Mass balance",
+        c="tab:orange",
+    )
+    ax.set_xlabel("Annual mass balance [m yr-1]")
+    ax.set_ylabel("Altitude [m]")
+
+    # Add ELA and 0 lines.
+    ax.axvline(x=0, ls="--", lw=0.8, label="Mass balance = 0", c="tab:green")
+    ax.axhline(y=glacier.ela, ls="--", lw=0.8, label="ELA", c="tab:blue")
+    ax.set_title("Mass balance profile")
+    ax.legend()
+
+
+def _history_axes(glacier, show_bias=False, window=None, time_range=None,
+                  invert=False):
+    """Create components for the history plot of the glacier."""
+
+    if show_bias:
+        fig, (ax1, ax2, ax3, ax4) = plt.subplots(nrows=4, sharex=True)
+    else:
+        fig, (ax1, ax2, ax3) = plt.subplots(nrows=3, sharex=True)
+
+    # First point to all data.
+    data = glacier.history
+    bias_series = glacier.mass_balance.temp_bias_series
+    # If the user supplied a time_range.
+    if isinstance(time_range, Sequence):
+        if time_range[0] >= glacier.age:
+            raise ValueError(
+                "Lower end of time_range should be before age of glacier."
+            )
+        # Select data from time range only.
+        data = glacier.history.sel(time=slice(time_range[0], time_range[1]))
+        bias_series = bias_series.loc[
+            (bias_series["year"] >= time_range[0])
+            & (bias_series["year"] <= time_range[1])
+        ]
+
+    # Plot the length, volume and area if we have a history.
+    if glacier.history is not None:
+        data.length_m.plot(ax=ax1)
+        data.volume_m3.plot(ax=ax2)
+        data.area_m2.plot(ax=ax3)
+    # If not, we print a message along with the empty plot.
+    else:
+        print("Glacier has no history yet, try progressing the glacier.")
+    # Labels and such.
+    ax1.set_xlabel("")
+    ax1.set_title(f"Glacier history at year {int(glacier.age)}")
+    ax1.annotate(
+        "Glacier length",
+        (0.98, 0.1),
+        xycoords="axes fraction",
+        bbox={"boxstyle": "Round", "color": "lightgrey"},
+        ha="right",
+    )
+    ax1.set_ylabel("Length [m]")
+    # Volume labels.
+    ax2.set_xlabel("")
+    ax2.annotate(
+        "Glacier volume",
+        (0.98, 0.1),
+        xycoords="axes fraction",
+        bbox={"boxstyle": "Round", "color": "lightgrey"},
+        ha="right",
+    )
+    ax2.set_ylabel("Volume [m$^3$]")
+    # Area labels.
+    ax3.set_xlabel("Year")
+    ax3.annotate(
+        "Glacier area",
+        (0.98, 0.1),
+        xycoords="axes fraction",
+        bbox={"boxstyle": "Round", "color": "lightgrey"},
+        ha="right",
+    )
+    ax3.set_ylabel("Area [m$^2$]")
+
+    # Grid
+    ax1.grid(True)
+    ax2.grid(True)
+    ax3.grid(True)
+
+    if show_bias and glacier.history:
+        window_str = ""
+        if window:
+            bias_series.bias.rolling(
+                window, min_periods=0, center=True
+            ).mean().plot(ax=ax4)
+            window_str = f", {window} yr. mean"
+        else:
+            bias_series.bias.plot(ax=ax4)
+        ax4.grid(True)
+        ax4.set_xlabel("Year")
+        ax4.set_ylabel("Bias [°C]")
+
+        ax4.annotate(
+            "Temperature bias" + window_str,
+            (0.98, 0.1),
+            xycoords="axes fraction",
+            bbox={"boxstyle": "Round", "color": "lightgrey"},
+            ha="right",
+        )
+        if invert:
+            ax4.invert_yaxis()
+
+        return fig, ax1, ax2, ax3, ax4
+
+    return fig, ax1, ax2, ax3
+
+
+@edu_plotter
+def plot_history(glacier, show_bias=False, window=None, time_range=None, invert=False):
+    """Plot the history of the glacier.
+
+    Parameters
+    ----------
+    glacier : oggm_edu.Glacier
+    show_bias : bool, optional
+        Add a fourth axis, showing the history of the temperature bias.
+        False by default.
+    window : int, optional
+        Controls the size (year) of the rolling window used to smooth the
+        temperature bias.
+    time_range : array_like(int, int), optional
+        Select a subset of the data to plot.
+    invert : bool, optional
+        Chose to invert the y-axis on the bias plot. False by default.
+    """
+    # Get the components
+    if show_bias:
+        fig, ax1, ax2, ax3, ax4 = _history_axes(
+            glacier, show_bias=show_bias, window=window, time_range=time_range,
+            invert=invert
+        )
+    else:
+        fig, ax1, ax2, ax3 = _history_axes(
+            glacier, window=window, time_range=time_range
+        )
+
+
+@edu_plotter
+def plot_state_history(glacier, interval=50, eq_states=False):
+    """Plot the state history of the glacier (thicknesses) at specified
+    intervals.
+
+    Parameters
+    ----------
+    glacier : oggm_edu.Glacier
+    interval : int
+        Specifies the number of years between each state in the plot.
+    eq_states : bool
+        Plot the different equilibrium states, if there are any. This takes
+        precedence over the intervals.
+    """
+    # Get the base plotting components from the bed.
+    _, ax1, ax2 = _bed_axes(glacier.bed)
+
+    # We need a manual color cycle for the top down view.
+    prop_cycle = plt.rcParams["axes.prop_cycle"]
+    colors = cycle(prop_cycle.by_key()["color"])
+
+    # Do we have any states?
+    if not glacier.state_history:
+        print(
+            "Glacier doesn't have a state history yet, try progressing the glacier."
+        )
+        # We don't want to do anything else, since some operation depend on the state_history.
+        return
+    # If we don't want eq. states.
+    elif not eq_states:
+        # Want to plot thickness at specified intervals. So we select the
+        # years, the state history might not have all of them.
+        times = glacier.state_history.time.values
+        years = times[
+            (times > times[0]) & (times < times[-1]) & (times % interval == 0)
+        ]
+        states = glacier.state_history.thickness_m.sel(time=years)
+        # Length of state. Needed for sorting.
+        len_states = glacier.history.length_m.sel(time=years)
+        # Title
+        title = "Glacier states"
+    # If we want eq. states
+    else:
+        if glacier.eq_states:
+            # Get the states.
+            years = list(glacier.eq_states)
+            states = glacier.state_history.thickness_m.sel(time=years)
+            # Length of state. Needed for sorting.
+            len_states = glacier.history.length_m.sel(time=years)
+            # Title
+            title = "Glacier equilibirum states"
+        else:
+            print("No equilbrium states to plot yet.")
+            return
+
+    sorted_index = np.argsort(len_states.values)
+    # Sort the states by length and plot it in reverse.
+    # I.e. plot the longest state first.
+    states = states.values[sorted_index][::-1]
+    # Loop over states.
+    for i, state in zip(sorted_index[::-1], states):
+        # Some masking shenanigans
+        mask = state > 0
+        idx = state.argmin()
+        mask[: idx + 1] = True
+        # Fill the glacier.
+        ax1.fill_between(
+            glacier.bed.distance_along_glacier,
+            glacier.bed.bed_h,
+            state + glacier.bed.bed_h,
+            where=mask,
+            color="white",
+            lw=2,
+        )
+        # Label for outline
+        if not eq_states:
+            label = int(years[i])
+        else:
+            label = list(glacier.eq_states)[i]
+            ela = glacier.eq_states[label]
+
+            # Add hline for ELAS
+            ax1.axhline(ela, ls=":")
+            ax1.text(
+                glacier.bed.distance_along_glacier[-1] - 0.2,
+                ela + 5,
+                f"ELA at year {label}",
+                ha="right",
+            )
+        # Add outline
+        # Modify the zorder to get lines to show up nice.
+        ax1.plot(
+            glacier.bed.distance_along_glacier[mask],
+            state[mask] + glacier.bed.bed_h[mask],
+            lw=2,
+            label=f"Glacier outline at year {label}",
+            # zorder=4+i*0.1
+        )
+        # Fill in the glacier in the topdown view.
+        # Where does the glacier have thickness?
+        filled = np.where(state > 0, glacier.bed.widths, 0)
+        # Fill between them
+        # Modify the zorder to get lines to show up nice.
+        ax2.fill_between(
+            glacier.bed.distance_along_glacier,
+            -filled / 2 * glacier.bed.map_dx,
+            filled / 2 * glacier.bed.map_dx,
+            where=filled > 0,
+            facecolor="white",
+            edgecolor=next(colors),
+            lw=2,
+            # zorder=1+i*0.1
+        )
+    # New title.
+    ax1.set_title(title)
+    # Nat. sort. Thanks stackoverflow.
+    ax1.legend(
+        *zip(
+            *sorted(
+                zip(*ax1.get_legend_handles_labels()),
+                key=lambda s: [
+                    int(t) if t.isdigit() else t.lower()
+                    for t in re.split(r"(\d+)", s[1])
+                ],
+            )
+        )
+    )
+
+
+class _Background(Artist):
+    """Image of the rendered figure, drawn pixel for pixel behind the
+    artists of a movie. Cheaper than a figimage, which is resampled."""
+
+    zorder = -1
+
+    def __init__(self, image):
+        super().__init__()
+        # Renderers draw images from the bottom row up.
+        self._image = np.ascontiguousarray(image[::-1])
+
+    def draw(self, renderer):
+        gc = renderer.new_gc()
+        renderer.draw_image(gc, 0, 0, self._image)
+        gc.restore()
+
+
+def _movie_writer(path, fps, writer):
+    """Writer for an animation, Pillow if ffmpeg is not installed.
+
+    Returns
+    -------
+    tuple
+        The writer and the path of the file, whose extension is changed to
+        .gif if the movie can only be written by Pillow.
+    """
+    if isinstance(writer, str):
+        return animation.writers[writer](fps=fps), path
+    elif writer is not None:
+        return writer, path
+    if animation.writers.is_available("ffmpeg"):
+        return animation.FFMpegWriter(fps=fps), path
+    root, ext = os.path.splitext(path)
+    if ext.lower() not in [".gif", ".webp", ".png", ".apng"]:
+        warnings.warn(
+            f"ffmpeg is not installed, can not write {ext} files. The "
+            f"animation is written to {root}.gif instead."
+        )
+        path = root + ".gif"
+    return animation.PillowWriter(fps=fps), path
+
+
+@edu_plotter
+def animate_glacier(glacier, path, stride=1, max_frames=None, fps=10, dpi=100,
+                    writer=None):
+    """Write a movie of the evolution of the glacier, from its state history.
+
+    The frames reuse the artists of a ``GlacierPlot``. The bed, axes and
+    legend are rendered once, and kept as an image behind the glacier, so
+    only the glacier and its ELA are rendered for each frame.
+
+    Parameters
+    ----------
+    glacier : oggm_edu.Glacier
+    path : str
+        File to write the movie to, e.g. ``glacier.mp4`` or ``glacier.gif``.
+    stride : int, optional
+        Use every stride-th state of the state history. 1 by default.
+    max_frames : int, optional
+        Maximum number of frames. Long histories are decimated evenly to this
+        number of frames, keeping the first and last state.
+    fps : int, optional
+        Frames per second of the movie. 10 by default.
+    dpi : int, optional
+        Resolution of the movie. 100 by default.
+    writer : matplotlib.animation.MovieWriter or str, optional
+        Writer of the movie, or the name of one. ffmpeg by default, or Pillow
+        if ffmpeg is not installed, in which case the movie is written as a
+        gif. The fps of a given writer are its own.
+
+    Returns
+    -------
+    str
+        The path of the movie.
+    """
+    if not glacier.state_history:
+        raise ValueError(
+            "Glacier doesn't have a state history yet, try progressing the glacier."
+        )
+    if not isinstance(stride, int) or stride < 1:
+        raise ValueError("stride should be an integer above 0.")
+    if max_frames is not None and (not isinstance(max_frames, int) or max_frames < 2):
+        raise ValueError("max_frames should be an integer above 1, or None.")
+
+    states = glacier.state_history.thickness_m
+    times = states.time.values[::stride]
+    if max_frames is not None and len(times) > max_frames:
+        times = times[np.linspace(0, len(times) - 1, max_frames).round().astype(int)]
+    thick = states.sel(time=times).values.astype(float)
+    # The ELA follows the temperature bias, from the current ELA which can
+    # have been set since the glacier was created.
+    mb = glacier.mass_balance
+    bias = mb.temp_bias_series.set_index("year").bias.reindex(times)
+    elas = mb.ela_h + (bias.fillna(mb.temp_bias).values - mb.temp_bias) * 150
+
+    plot = GlacierPlot(glacier, blit=False)
+    fig = plot.fig
+    fig.set_dpi(dpi)
+    # Fixed limits, high enough for all the frames.
+    ax1 = plot.axes[0]
+    bed = glacier.bed
+    ax1.set_ylim(bed.bottom, (bed.bed_h[0] + thick[:, 0]).max() + 200)
+
+    writer, path = _movie_writer(path, fps, writer)
+    try:
+        # The writer can adjust the size of the figure, before the background
+        # is rendered.
+        with writer.saving(fig, path, dpi):
+            # Render everything but the glacier once, and put it behind the
+            # glacier.
+            for artist in plot._artists:
+                artist.set_visible(False)
+            fig.canvas.draw()
+            background = np.array(fig.canvas.buffer_rgba())
+            for ax in plot.axes:
+                ax.set_axis_off()
+                for artist in ax.get_children():
+                    if artist not in plot._artists:
+                        artist.set_visible(False)
+            fig.patch.set_visible(False)
+            fig.add_artist(_Background(background))
+            for artist in plot._artists:
+                artist.set_visible(True)
+
+            for i in range(len(times)):
+                plot._set_state(thick[i], elas[i], times[i], rescale=False)
+                writer.grab_frame()
+    finally:
+        plt.close(fig)
+    return path
+
+
+@edu_plotter
+def plot_surging_history(glacier):
+    """Plot the history of the surging glacier.
+    Extends plot_history with the surging periods.
+
+    Parameters
+    ----------
+    glacier : oggm_edu.SurgingGlacier
+    """
+    # Get the base plotting components.
+    fig, ax1, ax2, ax3 = _history_axes(glacier)
+
+    # We then want to add markers for the surging years.
+    # How many surges do we have?
+    nr_surges = int(glacier.age / (glacier.normal_years + glacier.surging_years))
+    # Loop over the surges
+    for i in range(nr_surges):
+        # When should the span start
+        start = (i + 1) * glacier.normal_years + i * glacier.surging_years
+        # and end.
+        end = (
+            (i + 1) * glacier.normal_years
+            + glacier.surging_years
+            + i * glacier.surging_years
+        )
+        # Add spans
+        ax1.axvspan(start, end, color="tab:orange", alpha=0.3)
+        ax2.axvspan(start, end, color="tab:orange", alpha=0.3)
+        ax3.axvspan(start, end, color="tab:orange", alpha=0.3)
+
+    # Legend entry
+    patch = Patch(facecolor="tab:orange", alpha=0.3, label="Surging period")
+    fig.legend(handles=[patch], loc="upper left", bbox_to_anchor=(0.9, 0.89))
+
+
+def _glacier_info(glacier, live=False):
+    """Label of a glacier in the info legend of a collection. Live plots
+    leave out the ELA and age, which change with the glacier."""
+    if live:
+        return (
+            f"Id: {(glacier).id}\n"
+            f"Type: {type(glacier).__name__}\n"
+            f"MB grad: {glacier.mb_gradient} \n"
+            f"Creep: {glacier.creep_str} \n"
+            f"Sliding: {glacier.basal_sliding_str}"
+        )
+    return (
+        f"Id: {(glacier).id}\n"
+        f"Type: {type(glacier).__name__}\n"
+        f"ELA: {glacier.ela} \n"
+        f"MB grad: {glacier.mb_gradient} \n"
+        f"Age: {glacier.age} \n"
+        f"Creep: {glacier.creep_str} \n"
+        f"Sliding: {glacier.basal_sliding_str}"
+    )
+
+
+class CollectionPlot(_LivePlot):
+    """Plot of the glaciers of a collection, updated in place.
+
+    The bed and the legends are drawn once, ``update`` only changes the data
+    of the ice and ELA artists, and the ages in the title. Returned by
+    ``plot_collection(collection, live=True)``.
+
+    Attributes
+    ----------
+    collection : oggm_edu.GlacierCollection
+        The plotted collection. Its glaciers should not be added or removed
+        while it is plotted.
+    fig : matplotlib.figure.Figure
+    ax : matplotlib axes
+    blit : bool
+        Whether the updates are blitted, only redrawing the artists which
+        changed. If False, they are drawn with the next redraw of the canvas.
+    """
+
+    def __init__(self, collection, live=True, blit=True):
+        """Draw the bed and the current state of the glaciers.
+
+        Parameters
+        ----------
+        collection : oggm_edu.GlacierCollection
+        live : bool, optional
+            Leave the ages and ELAs, which change with the glaciers, out of
+            the legends so they don't have to be redrawn, and show the ages in
+            the title instead. True by default, False gives the static plot.
+        blit : bool, optional
+            Blit the updates where the canvas supports it. True by default.
+        """
+        if len(collection._glaciers) < 1:
+            raise ValueError("Collection is empty")
+
+        elif not collection._check_collection():
+            msg = ("We can only plot glacier surfaces if the glaciers "
+                   "all have the same bed. Try .plot_side_by_side() "
+                   "instead.")
+            raise ValueError(msg)
+
+        self.collection = collection
+        self._live = live
+        # We use this to plot the bedrock etc.
+        gl1 = collection._glaciers[0]
+        self.fig, ax = plt.subplots()
+        self.ax = ax
+        # Bedrock
+        ax.plot(
+            gl1.bed.distance_along_glacier,
+            gl1.bed.bed_h,
+            label="Bedrock",
+            ls=":",
+            c="k",
+            lw=2,
+            zorder=3,
+        )
+        ax.set_ylim((gl1.bed.bottom, gl1.bed.top + 200))
+        # Fill it in.
+        ax.fill_betweenx(
+            gl1.bed.bed_h, gl1.bed.distance_along_glacier, facecolor="lightgrey"
+        )
+
+        # Set the title.
+        self._title = ax.set_title("Glacier collection", y=1.0)
+
+        # The ice and outline of each glacier.
+        self._ice = []
+        self._outlines = []
+        for glacier in collection._glaciers:
+            self._ice.append(
+                ax.add_patch(Polygon(np.empty((0, 2)), facecolor="white", lw=0))
+            )
+            label = f"Glacier {glacier.id}"
+            if not live:
+                label += f" at year {glacier.age}"
+            self._outlines.append(ax.plot([], [], label=label)[0])
+        # One ELA per glacier at most, the ones not needed are hidden.
+        self._elas = []
+        self._ela_texts = []
+        for glacier in collection._glaciers:
+            self._elas.append(ax.axhline(0, ls="--", zorder=1))
+            self._ela_texts.append(
+                ax.text(
+                    gl1.bed.distance_along_glacier[-1], 0, "", ha="right", va="bottom"
+                )
+            )
+
+        # axis labels.
+        ax.set_xlabel("Distance along glacer [km]")
+        ax.set_ylabel("Altitude [m]")
+        # Add 2% of bed length as padding to the plot.
+        ax.set_xlim((0, gl1.bed.distance_along_glacier[-1] * 1.02))
+        ax.set_facecolor("#ADD8E6")
+        ax.legend(loc="lower left")
+        # Add a second legend with infos.
+        # It would be cool to only show attributes that are different.
+        self.fig.legend(
+            self._outlines,
+            [_glacier_info(glacier, live) for glacier in collection._glaciers],
+            title="Glacier info",
+            loc="upper left",
+            bbox_to_anchor=(0.9, 0.89),
+        )
+
+        self._artists = [
+            *self._ice,
+            *self._outlines,
+            *self._elas,
+            *self._ela_texts,
+            self._title,
+        ]
+        self._connect(blit)
+        self._set_state()
+
+    def _set_state(self):
+        """Update the artists to the current state of the glaciers."""
+        glaciers = self.collection._glaciers
+        gl1 = glaciers[0]
+        bed = gl1.bed
+        x = bed.distance_along_glacier
+        for i, glacier in enumerate(glaciers):
+            if glacier.current_state is not None:
+                # Masking shenanigans.
+                diff = glacier.current_state.surface_h - bed.bed_h
+                mask = diff > 0
+                idx = diff.argmin()
+                mask[: idx + 1] = True
+                surface_h = glacier.current_state.surface_h[mask]
+                self._ice[i].set_xy(_polygon(x[mask], bed.bed_h[mask], surface_h))
+                self._outlines[i].set_data(x[mask], surface_h)
+
+        if self._live:
+            ages = list(dict.fromkeys(glacier.age for glacier in glaciers))
+            if len(ages) == 1:
+                self._title.set_text(f"Glacier collection at year {ages[0]}")
+            else:
+                years = ", ".join(str(age) for age in ages)
+                self._title.set_text(f"Glacier collection at years {years}")
+
+        # Ylim
+        if gl1.current_state is not None:
+            ylim = (bed.bottom, gl1.current_state.surface_h[0] + 200)
+            if ylim != self.ax.get_ylim():
+                self.ax.set_ylim(ylim)
+                self._background = None
+
+        # Group the glaciers with the same ELA.
+        elas = {}
+        for i, glacier in enumerate(glaciers):
+            elas.setdefault(glacier.ela, []).append(str(i + 1))
+        for i, (line, text) in enumerate(zip(self._elas, self._ela_texts)):
+            line.set_visible(i < len(elas))
+            text.set_visible(i < len(elas))
+        for line, text, (ela, numbers) in zip(self._elas, self._ela_texts, elas.items()):
+            line.set_ydata([ela, ela])
+            text.set_y(ela + 10)
+            # If all elas are equal.
+            if len(elas) == 1:
+                text.set_text("All ELAs are equal")
+            else:
+                text.set_text(f"ELA glacier {', '.join(numbers)}")
+
+    def update(self):
+        """Update the plot to the current state of the glaciers."""
+        self._set_state()
+        self.draw()
+
+
+@edu_plotter
+def plot_collection(collection, live=False):
+    """Plot the glaciers in the collection to compare them.
+
+    Parameters
+    ----------
+    collection : oggm_edu.GlacierCollection
+    live : bool, optional
+        Return the plot, to update it in place with ``CollectionPlot.update``
+        after the glaciers changed. False by default.
+
+    Returns
+    -------
+    CollectionPlot or None
+        The plot, if live.
+    """
+    plot = CollectionPlot(collection, live=live)
+    if live:
+        return plot
+
+
+@edu_plotter
+def plot_collection_side_by_side(collection):
+    """Plot the collection but side by side.
+
+    Useful for glaciers with different bed slopes for example.
+
+    Parameters
+    ----------
+    collection : oggm_edu.GlacierCollection
+    """
+    if len(collection._glaciers) < 1:
+        raise ValueError("Collection is empty")
+
+    # Get the axes
+    fig, axes = plt.subplots(
+        nrows=2, ncols=len(collection._glaciers),
+        gridspec_kw={"height_ratios": [2, 1]},
+        sharex=True,
+    )
+
+    # Loop over the collection.
+    if len(collection._glaciers) == 1:
+        plot_glacier(collection._glaciers[0], axes=axes)
+    else:
+        ax0 = None
+        for i, (axs, glacier) in enumerate(zip(axes.T, collection._glaciers)):
+            plot_glacier(glacier, axes=axs, title_number=i+1)
+            if ax0 is None:
+                xr = glacier._decide_xlim()
+                yr = glacier._decide_ylim()
+                ax0 = axs[0]
+                ax1 = axs[1]
+            else:
+                xr = np.append(xr, glacier._decide_xlim())
+                yr = np.append(yr, glacier._decide_ylim())
+                axs[0].sharey(ax0)
+                axs[1].sharey(ax1)
+        ax0.set_xlim(np.min(xr), np.max(xr))
+        ax0.set_ylim(np.min(yr), np.max(yr))
+    plt.tight_layout()
+
+
+@edu_plotter
+def plot_collection_history(collection):
+    """Plot the histories of the collection.
+
+    Parameters
+    ----------
+    collection : oggm_edu.GlacierCollection
+    """
+
+    fig, (ax1, ax2, ax3) = plt.subplots(nrows=3, sharex=True)
+
+    # Check so that the glacier has a history.
+    for i, glacier in enumerate(collection._glaciers):
+        if glacier.history is not None:
+            # Plot the length.
+            glacier.history.length_m.plot(ax=ax1)
+            # Plot the volume
+            glacier.history.volume_m3.plot(ax=ax2)
+            # Plot the area
+            glacier.history.area_m2.plot(
+                ax=ax3,
+                label=(
+                    f"Id: {(glacier).id}\n"
+                    f"Glacier {i+1}\n"
+                    f"Type: {type(glacier).__name__}\n"
+                    f"ELA: {glacier.ela}\n"
+                    f"MB grad: {glacier.mb_gradient}\n"
+                    f"Age: {glacier.age}\n"
+                    f"Creep: {glacier.creep_str}\n"
+                    f"Sliding: {glacier.basal_sliding_str}"
+                ),
+            )
+        else:
+            print("Glacier history missing")
+    # Decorations
+    ax1.set_xlabel("")
+    ax1.set_title("Glacier collection evolution")
+    ax1.annotate(
+        "Glacier length",
+        (0.98, 0.1),
+        xycoords="axes fraction",
+        bbox={"boxstyle": "Round", "color": "lightgrey"},
+        ha="right",
+    )
+    ax1.set_ylabel("Length [m]")
+    ax2.set_xlabel("")
+    ax2.annotate(
+        "Glacier volume",
+        (0.98, 0.1),
+        xycoords="axes fraction",
+        bbox={"boxstyle": "Round", "color": "lightgrey"},
+        ha="right",
+    )
+    ax2.set_ylabel("Volume [m$^3$]")
+    ax3.set_xlabel("Year")
+    ax3.annotate(
+        "Glacier area",
+        (0.98, 0.1),
+        xycoords="axes fraction",
+        bbox={"boxstyle": "Round", "color": "lightgrey"},
+        ha="right",
+    )
+    ax3.set_ylabel("Area [m$^2$]")
+    # Grid on.
+    ax1.grid(True)
+    ax2.grid(True)
+    ax3.grid(True)
+
+    handles, labels = ax3.get_legend_handles_labels()
+    fig.legend(
+        handles,
+        labels,
+        loc="upper left",
+        ncol=1,
+        title="Glacier info",
+        bbox_to_anchor=(0.9, 0.89),
+    )
+
+
+@edu_plotter
+def plot_collection_mass_balance(collection):
+    """Plot the mass balance(s) for the glaciers in the collection.
+
+    Parameters
+    ----------
+    collection : oggm_edu.GlacierCollection
+    """
+
+    fig, ax = plt.subplots()
+
+    # How many unique ELAS do we have?
+    elas = []
+
+    # Plot annual mass balance for each glacier.
+    for glacier in collection.glaciers:
+        ax.plot(
+            glacier.annual_mass_balance,
+            glacier.bed.bed_h,
+            label=f"Glacier {glacier.id}, " + f"gradient {glacier.mass_balance.gradient}",
+        )
+        # Add each ELA.
+        elas.append(glacier.mass_balance.ela)
+    # Add labels.
+    ax.set_xlabel("Annual mass balance [m yr-1]")
+    ax.set_ylabel("Altitude [m]")
+
+    # Add 0 lines.
+    ax.axvline(x=0, ls=":", label="Mass balance = 0", c="tab:green")
+
+    # Plot the ELAs.
+    # If all elas are equal.
+    if len(set(elas)) == 1:
+        # Plot the ELA
+        ax.axhline(elas[0], ls="--", zorder=1)
+        # Where to place the annotation?
+        extent = np.array(collection.annual_mass_balance).min()
+        ax.text(extent, elas[0] + 2, "All ELAs are equal", ha="left", va="bottom")
+    # If elas not equal.
+    else:
+        # Do we have some elas that are equal?
+        # Get a set dictionary of ELAs.
+        elas_d = {key: "" for key in set(elas)}
+        # Fill it.
+        for i, key in enumerate(elas):
+            elas_d[key] += f"{i+1}, "
+
+        # Loop the unique ELAs.
+        for ela, string in elas_d.items():
+            # Add the annotation.
+            extent = np.array(collection.annual_mass_balance).min()
+            ax.text(
+                extent,
+                ela + 2,
+                f"ELA  glacier {string[:-2]}",
+                ha="left",
+                va="bottom",
+            )
+            # Plot the ELA
+            ax.axhline(ela, ls="--", zorder=1)
+    ax.set_title("Mass balance profiles")
+
+    plt.legend()
@@ -0,0 +1,255 @@
+"""This module provides ParameterSweep, which runs a glacier for every
+combination of a grid of parameters, e.g. to study how the equilibrium
+glacier depends on the ELA and the mass balance gradient.
+"""
+
+# Internals
+from oggm_edu.glacier import Glacier
+from oggm_edu.glacier_collection import VALID_ATTRS, change_attribute
+
+# Other libraries
+import numpy as np
+import pandas as pd
+import glob
+import itertools
+import os
+from collections import deque
+from collections.abc import Sequence
+from functools import partial
+from multiprocessing import Pool
+
+# The glacier the sweep starts from, in each worker process.
+_base_glacier = None
+
+
+def _init_worker(glacier):
+    """Give the glacier of the sweep to a worker, once."""
+    global _base_glacier
+    _base_glacier = glacier
+
+
+def _run_chunk(run, chunk):
+    """Run the glacier of the sweep for the points of a chunk.
+
+    Parameters
+    ----------
+    run : dict
+        Arguments of ``ParameterSweep.run``.
+    chunk : list
+        List of (index, parameters) of the points.
+
+    Returns
+    -------
+    list of dict
+        One row of results per point.
+    """
+    rows = []
+    for index, point in chunk:
+        glacier = _base_glacier.copy()
+        for key, value in point.items():
+            change_attribute(glacier, key, value)
+        row = {"Point": index, **point}
+        try:
+            if run["year"] is None:
+                glacier.progress_to_equilibrium(years=run["years"], t_rate=run["t_rate"])
+            else:
+                glacier.progress_to_year(run["year"])
+        # The glacier outgrew its domain, no results for this point.
+        except RuntimeError:
+            glacier = None
+        row.update(_results(glacier))
+        rows.append(row)
+    return rows
+
+
+def _imap_bounded(pool, func, iterable, window):
+    """Like ``pool.imap``, but the iterable is consumed as the results come
+    in, with at most ``window`` tasks given to the pool ahead.
+
+    ``pool.imap`` consumes the whole iterable at once, which would expand
+    the whole grid of a sweep in memory.
+    """
+    pending = deque()
+    for item in iterable:
+        pending.append(pool.apply_async(func, (item,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def _results(glacier):
+    """Final length, volume, area, AAR and response time of a glacier."""
+    if glacier is None:
+        return dict.fromkeys(ParameterSweep.results, np.nan)
+    state = glacier._state()
+    return {
+        "Age": glacier.age,
+        "Length [m]": state.length_m,
+        "Volume [km3]": state.volume_km3,
+        "Area [km2]": state.area_km2,
+        "AAR [%]": glacier.accumulation_area_ratio * 100,
+        "Response time [yrs]": glacier.response_time,
+    }
+
+
+class ParameterSweep:
+    """Run a glacier for every combination of a grid of parameters.
+
+    The grid is the full factorial of the values given for each parameter.
+    It is expanded lazily and run in chunks of points in a pool of worker
+    processes, with at most two chunks per worker waiting to be run. Each completed chunk can be written to a directory, so an
+    interrupted sweep continues where it stopped when run again.
+
+    Attributes
+    ----------
+    path : str or None
+        Directory where the results of the completed chunks are written.
+    chunk_size : int
+        Number of points run by a worker at once.
+    n_workers : int or None
+        Number of worker processes. None means the number of CPUs.
+    """
+
+    # Columns of the results, after the parameters.
+    results = (
+        "Age",
+        "Length [m]",
+        "Volume [km3]",
+        "Area [km2]",
+        "AAR [%]",
+        "Response time [yrs]",
+    )
+
+    def __init__(self, glacier, parameters, path=None, chunk_size=8, n_workers=None):
+        """Initialise the sweep.
+
+        Parameters
+        ----------
+        glacier : oggm_edu.Glacier
+            The glacier every point of the sweep starts from. It is copied,
+            the sweep does not change it.
+        parameters : dict
+            Dictionary where the key value pairs follow the structure
+            ``{"key": [values], ...}``. The keys are the ones of
+            ``GlacierCollection.change_attributes``, and so are the values:
+            numeric or partial mathematical expressions, e.g. ``"* 10"``.
+        path : str, optional
+            Directory in which to write the results of the completed chunks.
+            Created if it does not exist.
+        chunk_size : int, optional
+            Number of points run by a worker at once. 8 by default.
+        n_workers : int, optional
+            Number of worker processes. Defaults to the number of CPUs.
+        """
+        if not isinstance(glacier, Glacier):
+            raise TypeError("glacier should be of the type oggm_edu.Glacier.")
+        if not isinstance(parameters, dict) or not parameters:
+            raise TypeError("parameters should be a non-empty dictionary.")
+        for key, values in parameters.items():
+            if key not in VALID_ATTRS:
+                raise ValueError(f"Attribute {key} not a valid attribute for function.")
+            elif not isinstance(values, (Sequence, np.ndarray)) or not len(values):
+                raise TypeError("Provided values should be in the form of a list/tuple")
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            raise ValueError("chunk_size should be an integer above 0.")
+        if n_workers is not None and (not isinstance(n_workers, int) or n_workers < 1):
+            raise ValueError("n_workers should be an integer above 0, or None.")
+
+        self._glacier = glacier.copy(id=glacier.id)
+        self._parameters = {key: list(values) for key, values in parameters.items()}
+        self.path = path
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+        self.chunk_size = chunk_size
+        self.n_workers = n_workers
+
+    def __len__(self):
+        return int(np.prod([len(values) for values in self._parameters.values()]))
+
+    def __repr__(self):
+        return f"Parameter sweep over {', '.join(self._parameters)}, {len(self)} points."
+
+    def points(self):
+        """The points of the grid, as dictionaries of parameters, one at a time."""
+        keys = list(self._parameters)
+        for values in itertools.product(*self._parameters.values()):
+            yield dict(zip(keys, values))
+
+    def _chunks(self, done):
+        """Chunks of (index, point) of the points not done yet."""
+        points = (
+            (index, point)
+            for index, point in enumerate(self.points())
+            if index not in done
+        )
+        while True:
+            chunk = list(itertools.islice(points, self.chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def _load(self, run):
+        """Results written by an earlier run of the same sweep."""
+        if self.path is None:
+            return []
+        # Make sure the directory is for this sweep.
+        description = repr((self._parameters, run))
+        file = os.path.join(self.path, "sweep.txt")
+        if os.path.exists(file):
+            with open(file) as f:
+                if f.read() != description:
+                    raise ValueError(f"{self.path} holds the results of another sweep.")
+        else:
+            with open(file, "w") as f:
+                f.write(description)
+        files = sorted(glob.glob(os.path.join(self.path, "chunk_*.csv")))
+        return [pd.read_csv(file) for file in files]
+
+    def run(self, year=None, years=2500, t_rate=0.0001):
+        """Run the glacier for all the points of the grid which are not done
+        yet.
+
+        Parameters
+        ----------
+        year : int, optional
+            Progress the glaciers to this year. By default, progress them to
+            equilibrium instead.
+        years : int, optional
+            ``years`` argument of ``Glacier.progress_to_equilibrium``.
+        t_rate : float, optional
+            ``t_rate`` argument of ``Glacier.progress_to_equilibrium``.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per point: its parameters, and the final age, length,
+            volume, area, AAR and response time of the glacier. NaN if the
+            glacier outgrew its domain.
+        """
+        run = {"year": year, "years": years, "t_rate": t_rate}
+        frames = self._load(run)
+        done = set()
+        for df in frames:
+            done.update(df["Point"])
+
+        if len(done) < len(self):
+            with Pool(
+                processes=self.n_workers,
+                initializer=_init_worker,
+                initargs=(self._glacier,),
+            ) as pool:
+                # Keep the workers busy, with a bounded number of chunks
+                # waiting for them.
+                window = 2 * (self.n_workers or os.cpu_count() or 1)
+                for rows in _imap_bounded(
+                    pool, partial(_run_chunk, run), self._chunks(done), window
+                ):
+                    df = pd.DataFrame(rows)
+                    if self.path is not None:
+                        file = os.path.join(self.path, f"chunk_{rows[0]['Point']:08d}.csv")
+                        df.to_csv(file, index=False)
+                    frames.append(df)
+
+        df = pd.concat(frames, ignore_index=True)
+        return df.sort_values("Point").set_index("Point")
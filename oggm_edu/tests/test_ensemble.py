@@ -0,0 +1,40 @@
+from oggm_edu import Glacier, GlacierBed, MassBalance
+from oggm_edu.ensemble import EnsembleFlowlineModel
+import numpy as np
+import pytest
+
+bed = GlacierBed(top=3400, bottom=1500, width=300)
+
+
+def test_single_member():
+    """A single member should follow the OGGM SemiImplicitModel."""
+    mb = MassBalance(ela=3000, gradient=4)
+    glacier = Glacier(bed=bed, mass_balance=mb)
+    glacier.progress_to_year(50)
+
+    model = EnsembleFlowlineModel(
+        bed, [MassBalance(ela=3000, gradient=4)], [glacier.creep], [glacier.basal_sliding]
+    )
+    diag_dss, fl_diag_dss = model.run_until_and_store(50)
+
+    assert model.yr == 50
+    np.testing.assert_allclose(diag_dss[0].volume_m3, glacier.history.volume_m3)
+    np.testing.assert_allclose(diag_dss[0].length_m, glacier.history.length_m)
+    for var in glacier.state_history.data_vars:
+        np.testing.assert_allclose(
+            fl_diag_dss[0][var], glacier.state_history[var], atol=1e-6
+        )
+
+
+def test_members():
+    """Members are independent from each other."""
+    mbs = [MassBalance(ela=ela, gradient=4) for ela in [2900, 3000, 3100]]
+    model = EnsembleFlowlineModel(bed, mbs, [2.4e-24] * 3, [0, 0, 5.7e-20])
+    model.run_until(30)
+    assert model.thick.shape == (3, bed.nx)
+    # Lower ELA, larger glacier.
+    assert model.volume_m3[0] > model.volume_m3[1] > model.volume_m3[2]
+    assert np.all(model.length_m > 0)
+
+    with pytest.raises(ValueError):
+        EnsembleFlowlineModel(bed, mbs, [2.4e-24] * 2, [0] * 3)
@@ -0,0 +1,78 @@
+from oggm_edu import Glacier, GlacierBed, MassBalance, EquilibriumCache
+from numpy.testing import assert_equal
+import pytest
+
+bed = GlacierBed(top=3400, bottom=1500, width=300)
+
+
+def test_cache_hit(tmp_path):
+    """A hit should give the same glacier as the search."""
+    cache = EquilibriumCache(path=tmp_path)
+    glacier = Glacier(bed=bed, mass_balance=MassBalance(ela=3100, gradient=4))
+    glacier.progress_to_year(20)
+    cached = glacier.copy()
+    glacier.progress_to_equilibrium(cache=cache, adaptive=True)
+    assert cache.cache_info()["misses"] == 1
+
+    cached.progress_to_equilibrium(cache=cache)
+    assert cache.cache_info()["hits"] == 1
+    assert cached.age == glacier.age
+    assert cached.eq_states == glacier.eq_states
+    assert cached.history.equals(glacier.history)
+    assert cached.state_history.equals(glacier.state_history)
+    assert_equal(cached.current_state.thick, glacier.current_state.thick)
+    assert cached.mass_balance._temp_bias_series.equals(
+        glacier.mass_balance._temp_bias_series
+    )
+
+    # From the disk, for a glacier of another age.
+    cache = EquilibriumCache(path=tmp_path)
+    other = Glacier(bed=bed, mass_balance=MassBalance(ela=3100, gradient=4))
+    other.progress_to_year(20)
+    other.age = 50
+    other.progress_to_equilibrium(cache=cache)
+    assert cache.cache_info()["hits"] == 1
+    assert other.age == glacier.age + 30
+    assert list(other.eq_states) == [other.age]
+
+
+def test_repeated_experiment():
+    """A glacier repeating a two step experiment should hit on both steps."""
+    cache = EquilibriumCache()
+    glaciers = [
+        Glacier(bed=bed, mass_balance=MassBalance(ela=3100, gradient=4))
+        for _ in range(2)
+    ]
+    for glacier in glaciers:
+        glacier.progress_to_equilibrium(cache=cache)
+        glacier.add_temperature_bias(bias=1.0, duration=30)
+        glacier.progress_to_equilibrium(cache=cache)
+    assert cache.cache_info()["misses"] == 2
+    assert cache.cache_info()["hits"] == 2
+    assert glaciers[1].age == glaciers[0].age
+    assert glaciers[1].eq_states == glaciers[0].eq_states
+
+
+def test_warm_start():
+    """A new configuration should start from the closest cached state."""
+    cache = EquilibriumCache(maxsize=2, warm_start=True)
+    glacier = Glacier(bed=bed, mass_balance=MassBalance(ela=3100, gradient=4))
+    glacier.progress_to_equilibrium(cache=cache, adaptive=True)
+
+    warm = Glacier(bed=bed, mass_balance=MassBalance(ela=3150, gradient=4))
+    warm.progress_to_equilibrium(cache=cache, adaptive=True)
+    assert warm.history.volume_m3.values[0] == pytest.approx(glacier.history.volume_m3.values[-1])
+    assert warm.age < glacier.age
+    assert len(cache) == 2
+
+    # Other bed, no warm start.
+    cold = Glacier(
+        bed=GlacierBed(top=3400, bottom=1500, width=200),
+        mass_balance=MassBalance(ela=3100, gradient=4),
+    )
+    cold.progress_to_equilibrium(cache=cache, adaptive=True)
+    assert cold.history.volume_m3.values[0] == 0
+    assert len(cache) == 2
+
+    with pytest.raises(ValueError):
+        cache.maxsize = 0
@@ -1,8 +1,12 @@
 import oggm_edu
 from oggm_edu.funcs import expression_parser
 import matplotlib.pyplot as plt
+import numpy as np
 from numpy.testing import assert_equal
 import pytest
+import subprocess
+import sys
+import textwrap
 
 
 def test_plot_glacier_graphics():
@@ -10,6 +14,59 @@ def test_plot_glacier_graphics():
     assert ax
 
 
+def test_graphics_cache(tmp_path, monkeypatch):
+    """Graphics should come from the bundle, the directory or memory, and
+    only from the network on a cold miss."""
+    from PIL import Image
+
+    bundle = tmp_path / "bundle"
+    bundle.mkdir()
+    Image.new("RGB", (4, 3), "white").save(bundle / "glacier_01.png")
+    Image.new("RGB", (4, 3), "black").save(bundle / "glacier_02.png")
+    monkeypatch.setitem(oggm_edu.funcs.PARAMS, "graphics_dir", str(tmp_path / "cache"))
+
+    def offline(url):
+        raise OSError("No network")
+
+    monkeypatch.setattr(oggm_edu.funcs.urllib.request, "urlopen", offline)
+    with pytest.raises(RuntimeError):
+        oggm_edu.glacier_graphic(1)
+    assert oggm_edu.prefill_graphics(str(bundle)) == 2
+    image = oggm_edu.glacier_graphic("01")
+    assert image.shape == (3, 4, 3)
+    assert oggm_edu.glacier_graphic(1) is image
+    assert oggm_edu.plot_glacier_graphics(2)
+    plt.close("all")
+
+    # A cold miss downloads the graphic once.
+    calls = []
+
+    def online(url):
+        calls.append(url)
+        return open(bundle / "glacier_02.png", "rb")
+
+    monkeypatch.setattr(oggm_edu.funcs.urllib.request, "urlopen", online)
+    oggm_edu.funcs._graphics.clear()
+    assert_equal(oggm_edu.glacier_graphic(3), oggm_edu.glacier_graphic(2))
+    oggm_edu.funcs._graphics.clear()
+    oggm_edu.glacier_graphic(3)
+    assert len(calls) == 1
+    oggm_edu.funcs._graphics.clear()
+
+    # Checkouts have the graphics in subdirectories, next to other files.
+    checkout = tmp_path / "checkout"
+    (checkout / "glacier_intro" / "png").mkdir(parents=True)
+    (checkout / "glacier_intro" / "thumbnails").mkdir()
+    (checkout / "README.md").write_text("Glacier graphics")
+    for folder, size in [("png", (8, 6)), ("thumbnails", (2, 1))]:
+        noise = np.random.default_rng(0).integers(0, 255, size[::-1] + (3,), dtype=np.uint8)
+        Image.fromarray(noise).save(checkout / "glacier_intro" / folder / "glacier_04.png")
+    (checkout / "glacier_05.png").mkdir()
+    assert oggm_edu.prefill_graphics(str(checkout)) == 1
+    assert oggm_edu.glacier_graphic(4).shape == (6, 8, 3)
+    oggm_edu.funcs._graphics.clear()
+
+
 def test_edu_plotter_decorator():
     @oggm_edu.funcs.edu_plotter
     def plot_sth():
@@ -36,3 +93,47 @@ def test_expression_parser():
         expression_parser(" * 10", 2)
     with pytest.raises(Exception) as e_info:
         expression_parser(" * 10", "elk")
+
+
+def test_import_budget():
+    """Importing the package should not load OGGM, and running glaciers
+    should not load the plotting libraries."""
+    script = textwrap.dedent(
+        """
+        import sys
+        import oggm_edu
+        assert "oggm" not in sys.modules
+
+        from oggm_edu import Glacier, GlacierBed, GlacierCollection, MassBalance
+        glacier = Glacier(GlacierBed(top=3400, bottom=1500, width=300),
+                          MassBalance(ela=3000, gradient=4))
+        glacier.progress_to_year(10)
+        collection = GlacierCollection([glacier, glacier.copy()], n_workers=1)
+        collection.progress_to_year(20)
+        collection.close()
+        for module in ["matplotlib", "seaborn", "PIL", "oggm_edu.plotting"]:
+            assert module not in sys.modules, module
+        """
+    )
+    subprocess.run([sys.executable, "-c", script], check=True)
+
+
+@pytest.mark.parametrize(
+    "script",
+    [
+        "from oggm_edu import MassBalance\n"
+        "MassBalance(ela=3000, gradient=4)",
+        "import numpy as np\n"
+        "from oggm.core.flowline import RectangularBedFlowline\n"
+        "from oggm.core.massbalance import LinearMassBalance\n"
+        "from oggm_edu import legacy\n"
+        "bed, surface = legacy.define_linear_bed(3400, 1500, 200)\n"
+        "flowline = RectangularBedFlowline(surface_h=surface, bed_h=bed,\n"
+        "                                  widths=np.ones(200) * 3, map_dx=100)\n"
+        "legacy.init_model(flowline, LinearMassBalance(3000, grad=4), 10)",
+    ],
+    ids=["mass_balance", "legacy"],
+)
+def test_init_on_first_use(script):
+    """OGGM should be initialized by whatever is used first."""
+    subprocess.run([sys.executable, "-c", script], check=True)
@@ -1,5 +1,6 @@
-from oggm_edu import Glacier, SurgingGlacier, GlacierBed, MassBalance
-from numpy.testing import assert_equal
+from oggm_edu import (Glacier, SurgingGlacier, GlacierBed, MassBalance,
+                      GlacierCollection, EquilibriumCache)
+from numpy.testing import assert_equal, assert_allclose
 import pytest
 
 real_mb = MassBalance(ela=3000, gradient=5)
@@ -38,6 +39,33 @@ def test_copy():
     assert glacier_copy.ela != glacier.ela
 
 
+def test_copy_aged_glacier():
+    """Copies share the history until they are progressed."""
+    glacier = Glacier(bed=real_bed, mass_balance=real_mb)
+    glacier.add_temperature_bias(bias=1.0, duration=10)
+    glacier.progress_to_year(20)
+    glacier_copy = glacier.copy()
+    history = glacier.history
+
+    assert glacier_copy.history.equals(history)
+    assert glacier_copy.mass_balance._temp_bias_series.equals(
+        glacier.mass_balance._temp_bias_series
+    )
+
+    glacier_copy.progress_to_year(30)
+    glacier.progress_to_year(25)
+    assert glacier_copy.age == 30
+    assert len(glacier_copy.history.time) == 31
+    assert len(glacier.history.time) == 26
+    assert history.volume_m3.equals(glacier_copy.history.volume_m3.isel(time=slice(21)))
+    assert len(glacier_copy.mass_balance._temp_bias_series) == 31
+    assert len(glacier.mass_balance._temp_bias_series) == 26
+
+    # Shared bed arrays can not be modified.
+    with pytest.raises(ValueError):
+        glacier_copy.bed.bed_h[0] = 0
+
+
 def test_progress_to_year():
     """Test the method progress_to_year."""
     glacier = Glacier(bed=real_bed, mass_balance=real_mb)
@@ -65,6 +93,167 @@ def test_progress_to_year():
     assert len(glacier.state_history.time) == year + 1
 
 
+def test_stream_history(tmp_path):
+    """Streaming to a file should give the same history as in memory."""
+    glacier = Glacier(bed=real_bed, mass_balance=real_mb)
+    glacier.progress_to_year(20)
+    streamed = glacier.copy()
+    streamed.set_state_history_retention(interval=10)
+    streamed.stream_history(str(tmp_path / "glacier.nc"), chunk=30)
+    glacier.progress_to_year(100)
+    streamed.progress_to_year(100)
+    streamed.progress_to_year(105)
+
+    assert_equal(streamed.history.time.values, range(106))
+    assert_allclose(
+        streamed.history.volume_m3.isel(time=slice(101)), glacier.history.volume_m3
+    )
+    # The states of the first 20 years were kept before the policy was set.
+    times = [*range(21), 30, 40, 50, 60, 70, 80, 90, 100, 105]
+    assert_equal(streamed.state_history.time.values, times)
+    assert_allclose(
+        streamed.state_history.thickness_m.isel(time=slice(-1)),
+        glacier.state_history.thickness_m.sel(time=times[:-1]),
+    )
+
+    with pytest.raises(ValueError):
+        glacier.stream_history(str(tmp_path / "other.nc"), chunk=0)
+    with pytest.raises(ValueError):
+        streamed.set_state_history_retention(interval=10, dtype="float32")
+
+
+def test_stream_surging(tmp_path):
+    """A streamed surging glacier runs in chunks, with the same surges."""
+    glacier = SurgingGlacier(bed=real_bed, mass_balance=real_mb)
+    streamed = glacier.copy()
+    streamed.stream_history(str(tmp_path / "surging.nc"), chunk=7)
+    glacier.progress_to_year(60)
+    streamed.progress_to_year(60)
+
+    assert streamed._state_history.size == 61
+    assert_allclose(streamed.history.volume_m3, glacier.history.volume_m3)
+    assert_allclose(
+        streamed.state_history.thickness_m, glacier.state_history.thickness_m
+    )
+    assert streamed._normal_period == glacier._normal_period
+    assert streamed._surging_years_left == glacier._surging_years_left
+
+
+def test_checkpoints(tmp_path, monkeypatch):
+    """An interrupted search should resume from its last checkpoint and find
+    the same equilibrium."""
+    glacier = Glacier(bed=real_bed, mass_balance=real_mb, id="checkpointed")
+    glacier.add_temperature_bias(-0.5, 100)
+    interrupted = glacier.copy(id=glacier.id)
+    resumed = glacier.copy(id=glacier.id)
+    glacier.progress_to_equilibrium()
+
+    # Interrupt the search after the checkpoint of year 200.
+    save = Glacier._save_checkpoint
+
+    def interrupt(self, key, last, search=None):
+        save(self, key, last, search)
+        if self.age == 200:
+            raise KeyboardInterrupt
+
+    interrupted.set_checkpoints(tmp_path, interval=50)
+    monkeypatch.setattr(Glacier, "_save_checkpoint", interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        interrupted.progress_to_equilibrium()
+    monkeypatch.undo()
+
+    resumed.set_checkpoints(tmp_path, interval=50)
+    resumed.progress_to_equilibrium()
+    assert resumed.age == glacier.age
+    assert resumed.eq_states == glacier.eq_states
+    assert_allclose(resumed.history.volume_m3, glacier.history.volume_m3)
+    assert_allclose(
+        resumed.state_history.thickness_m, glacier.state_history.thickness_m
+    )
+    assert resumed.mass_balance._temp_bias_series.equals(
+        glacier.mass_balance._temp_bias_series
+    )
+
+    with pytest.raises(ValueError):
+        glacier.set_checkpoints(tmp_path, interval=0)
+
+
+def test_state_history_retention():
+    """Thinned and compressed states should be close to the full ones, without
+    changing the history."""
+    glacier = Glacier(bed=real_bed, mass_balance=real_mb)
+    boundaries = glacier.copy()
+    boundaries.set_state_history_retention(interval=None, dtype="float32")
+    quantized = glacier.copy()
+    quantized.set_state_history_retention(interval=20, precision=0.01)
+    for g in [glacier, boundaries, quantized]:
+        g.progress_to_year(50)
+        g.progress_to_year(110)
+        g.progress_to_equilibrium()
+
+    assert boundaries.history.equals(glacier.history)
+    times = [0, 50, 110, glacier.age]
+    assert_equal(boundaries.state_history.time.values, times)
+    assert boundaries.state_history.thickness_m.dtype == "float32"
+    assert_allclose(
+        boundaries.state_history.thickness_m,
+        glacier.state_history.thickness_m.sel(time=times),
+        rtol=1e-6,
+    )
+    times = sorted({*range(0, glacier.age, 20), 50, 110, glacier.age})
+    assert_equal(quantized.state_history.time.values, times)
+    assert_allclose(
+        quantized.state_history.thickness_m,
+        glacier.state_history.thickness_m.sel(time=times),
+        atol=0.005,
+    )
+
+    # The states kept before are stored again.
+    recoded = glacier.copy()
+    recoded.set_state_history_retention(dtype="float32", precision=0.01)
+    assert recoded._state_history._buffers["thickness_m"].dtype == "uint16"
+    assert recoded._state_history._buffers["volume_m3"].dtype == "float32"
+    recoded.progress_to_year(glacier.age + 10)
+    assert_allclose(
+        recoded.state_history.thickness_m.sel(time=slice(None, glacier.age)),
+        glacier.state_history.thickness_m,
+        atol=0.005,
+    )
+
+    with pytest.raises(ValueError):
+        glacier.set_state_history_retention(interval=0)
+    with pytest.raises(ValueError):
+        glacier.set_state_history_retention(dtype="int32")
+
+
+def test_state_history_kept_once(tmp_path):
+    """States kept by the retention policy should not be thinned out again
+    when they are moved to a file, merged from a worker or replayed from the
+    eq. cache."""
+    for interval in [None, 50]:
+        glacier = Glacier(bed=real_bed, mass_balance=real_mb)
+        glacier.set_state_history_retention(interval=interval)
+        in_collection = glacier.copy()
+        glacier.progress_to_year(333)
+        cached = [glacier.copy(), glacier.copy()]
+        glacier.progress_to_equilibrium()
+        states = glacier.state_history.copy(deep=True)
+        assert 333 in states.time
+
+        with GlacierCollection([in_collection], n_workers=2) as collection:
+            collection.progress_to_year(333)
+            collection.progress_to_equilibrium()
+        cache = EquilibriumCache()
+        for g in cached:
+            g.progress_to_equilibrium(cache=cache)
+        assert cache.cache_info()["hits"] == 1
+        glacier.stream_history(str(tmp_path / f"glacier_{interval}.nc"))
+
+        for g in [glacier, in_collection, *cached]:
+            assert_equal(g.state_history.time.values, states.time.values)
+            assert_allclose(g.state_history.thickness_m, states.thickness_m)
+
+
 def test_progress_to_equilibrium():
     """Should be possible to combine progress_to_year and progress_to_equilibrium"""
     glacier = Glacier(bed=real_bed, mass_balance=real_mb)
@@ -75,6 +264,37 @@ def test_progress_to_equilibrium():
     assert len(glacier.history.time) == len(glacier.state_history.time)
 
 
+def test_progress_to_equilibrium_adaptive():
+    """The adaptive search should find the same eq. state as the yearly one."""
+    glacier = Glacier(bed=real_bed, mass_balance=real_mb)
+    glacier.progress_to_year(100)
+    adaptive = glacier.copy()
+    thinned = glacier.copy()
+    thinned.set_state_history_retention(interval=20, precision=0.01)
+    glacier.progress_to_equilibrium()
+    adaptive.progress_to_equilibrium(adaptive=True)
+    thinned.progress_to_equilibrium(adaptive=True)
+
+    assert adaptive.age == glacier.age
+    assert adaptive.eq_states == glacier.eq_states
+
+    # The states are thinned out while searching.
+    times = [*range(101), *range(120, glacier.age, 20), glacier.age]
+    assert_equal(thinned.state_history.time.values, times)
+    assert_allclose(
+        thinned.state_history.thickness_m,
+        adaptive.state_history.thickness_m.sel(time=times),
+        atol=0.005,
+    )
+    assert_equal(adaptive.history.time.values, glacier.history.time.values)
+    assert_allclose(adaptive.history.volume_m3, glacier.history.volume_m3)
+    assert_allclose(adaptive.current_state.thick, glacier.current_state.thick)
+    assert_equal(
+        adaptive.mass_balance._temp_bias_series.values,
+        glacier.mass_balance._temp_bias_series.values,
+    )
+
+
 def test_add_temperature_bias():
     """Test to make sure that the entire temperature bias mechanism works as intended."""
     glacier = Glacier(bed=real_bed, mass_balance=real_mb)
@@ -162,3 +382,10 @@ def test_surging_glacier():
     # No eq. state method.
     with pytest.raises(Exception) as e_info:
         surging_glacier.progress_to_equilibrium()
+
+    # Progressing in steps gives the same glacier, whatever the surge phase.
+    stepped = SurgingGlacier(bed=real_bed, mass_balance=real_mb)
+    for year in [23, 52, 107, 200]:
+        stepped.progress_to_year(year)
+    assert stepped._normal_years_left == 15
+    assert_allclose(stepped.history.volume_m3, surging_glacier.history.volume_m3)
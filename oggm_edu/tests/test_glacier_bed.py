@@ -1,4 +1,4 @@
-from oggm_edu import GlacierBed
+from oggm_edu import GlacierBed, GlacierBedGenerator
 from numpy.testing import assert_equal
 import numpy as np
 import pytest
@@ -126,3 +126,121 @@ def test_non_linear_bed_constructor():
             slopes=[25, -15],
             slope_sections=[2500, 2200, 1400],
         )
+
+
+def baseline_widths(bed_h, altitudes, widths):
+    """The widths of a bed as GlacierBed used to compute them, section by
+    section."""
+    tmp_w = np.zeros(len(bed_h))
+    for i, alt in enumerate(altitudes[1:]):
+        mask = np.logical_and(bed_h <= altitudes[i], bed_h >= alt)
+        tmp_w[mask] = np.linspace(widths[i], widths[i + 1], mask.sum())
+    return tmp_w
+
+
+def test_variable_widths():
+    """The widths should be exactly the ones of the section by section
+    construction."""
+    rng = np.random.default_rng(0)
+    cases = [
+        ([3400, 2800, 1500], [500, 300, 100], 200),
+        ([3000, 3000, 2000, 2000, 1000], [100, 400, 400, 50, 300], 101),
+        ([2000, 1500], [300, 300], 7),
+    ]
+    for _ in range(20):
+        altitudes = np.sort(rng.integers(1000, 4000, rng.integers(2, 300)))[::-1]
+        if altitudes[0] == altitudes[-1]:
+            continue
+        widths = rng.integers(50, 1000, len(altitudes))
+        cases.append((altitudes.tolist(), widths.tolist(), int(rng.integers(2, 5000))))
+    for altitudes, widths, nx in cases:
+        bed = GlacierBed(altitudes=altitudes, widths=widths, nx=nx)
+        assert_equal(bed.widths, baseline_widths(bed.bed_h, altitudes, widths) / 100)
+
+    # A bed with a hole.
+    bed = GlacierBed(
+        altitudes=[3400, 2800, 1500], widths=[500, 300, 100],
+        slopes=[20, 10, 30], slope_sections=[3400, 2600, 2800, 1500],
+    )
+    assert_equal(
+        bed.widths, baseline_widths(bed.bed_h, [3400, 2800, 1500], [500, 300, 100]) / 100
+    )
+
+
+def test_from_arrays():
+    """Beds created together should be the same as beds created one by one."""
+    altitudes = np.array([[3400, 2800, 1500], [3000, 2900, 2000], [2500, 2000, 1500]])
+    widths = np.array([[500, 300, 100], [200, 400, 300], [500, 500, 250]])
+    beds = GlacierBed.from_arrays(altitudes, widths, nx=50)
+
+    assert len(beds) == 3
+    for bed, alt, w in zip(beds, altitudes, widths):
+        ref = GlacierBed(altitudes=alt.tolist(), widths=w.tolist(), nx=50)
+        assert bed.top == ref.top
+        assert bed.bottom == ref.bottom
+        assert_equal(bed.bed_h, ref.bed_h)
+        assert_equal(bed.widths, ref.widths)
+        assert_equal(bed.distance_along_glacier, ref.distance_along_glacier)
+        assert repr(bed) == repr(ref)
+        assert bed.fingerprint == ref.fingerprint
+
+    with pytest.raises(ValueError):
+        GlacierBed.from_arrays([[2000, 2100, 1500]], [[500, 400, 200]])
+    with pytest.raises(ValueError):
+        GlacierBed.from_arrays([[2000, 1500]], [[500, 400, 200]])
+
+
+def test_generator():
+    """Generated beds should be the same as beds from the constructor."""
+    gen = GlacierBedGenerator(
+        20,
+        top=3400,
+        bottom=1500,
+        width=lambda rng, n: rng.uniform(100, 600, n),
+        slopes=lambda rng, n: rng.uniform(10, 30, n),
+        seed=0,
+    )
+    assert gen.bed_h.shape == (20, gen.nx.max())
+    assert gen.bed_h.flags.c_contiguous
+    beds = list(gen)
+    assert len(beds) == 20
+    for bed in beds:
+        ref = GlacierBed(top=3400, bottom=1500, width=bed.width, slopes=bed.slopes)
+        assert bed.nx == ref.nx
+        # The same bed, despite round-off errors.
+        assert bed.fingerprint == ref.fingerprint
+        np.testing.assert_allclose(bed.bed_h, ref.bed_h)
+        np.testing.assert_allclose(bed.widths, ref.widths)
+        np.testing.assert_allclose(bed.distance_along_glacier, ref.distance_along_glacier)
+        assert repr(bed) == repr(ref)
+        # Views on the buffer.
+        assert not bed.bed_h.flags.writeable
+    assert np.isnan(gen.bed_h[gen.nx.argmin(), -1])
+
+    # Several slopes and variable widths.
+    widths = [[500, 500, 250], [300, 400, 100]]
+    gen = GlacierBedGenerator(
+        2,
+        altitudes=[2500, 2000, 1500],
+        widths=widths,
+        slopes=[25, 15],
+        slope_sections=[2500, 2200, 1500],
+    )
+    for bed, w in zip(gen, widths):
+        ref = GlacierBed(
+            altitudes=[2500, 2000, 1500],
+            widths=w,
+            slopes=[25, 15],
+            slope_sections=[2500, 2200, 1500],
+        )
+        np.testing.assert_allclose(bed.bed_h, ref.bed_h)
+        np.testing.assert_allclose(bed.widths, ref.widths)
+        assert bed.fingerprint == ref.fingerprint
+
+    # The checks are the same as the constructor's.
+    with pytest.raises(ValueError):
+        GlacierBedGenerator(2, top=[3000, 2000], bottom=2500, width=300)
+    with pytest.raises(ValueError):
+        GlacierBedGenerator(2, top=3000, bottom=2500, width=[300, 200, 100])
+    with pytest.raises(ValueError):
+        GlacierBedGenerator(2, top=3000, bottom=2500, width=300, slopes=[20, 110])
@@ -1,7 +1,8 @@
 import matplotlib.pyplot as plt
 
-from oggm_edu import GlacierBed, Glacier, MassBalance, GlacierCollection
+from oggm_edu import GlacierBed, Glacier, SurgingGlacier, MassBalance, GlacierCollection
 import numpy as np
+import pandas as pd
 import pytest
 
 mb = MassBalance(ela=3000, gradient=8)
@@ -40,11 +41,29 @@ def test_check_collection():
     # Check collection should be false. Glaciers have different beds.
     collection = GlacierCollection([glacier1, glacier3])
     assert not collection._check_collection()
+    assert glacier1.bed.fingerprint == glacier2.bed.fingerprint
+    assert glacier1.bed.fingerprint != glacier3.bed.fingerprint
 
     # Check that plot throws when we have different beds.
     with pytest.raises(Exception) as e_info:
         collection.plot()
 
+    # Only the widths differ.
+    wide = Glacier(bed=GlacierBed(top=3700, bottom=1500, width=900), mass_balance=mb)
+    collection = GlacierCollection([glacier1, glacier2, wide])
+    assert collection._check_collection()
+    assert len(collection.bed_groups) == 2
+
+    # The groups follow the beds of the glaciers, and the glaciers.
+    collection = GlacierCollection([glacier1.copy(), glacier1.copy()])
+    assert len(collection.bed_groups) == 1
+    changed = collection.glaciers[1]
+    changed.bed.widths = changed.bed.widths * 2
+    assert len(collection.bed_groups) == 2
+    assert collection.bed_groups[changed.bed.fingerprint] == [changed]
+    collection.glaciers.remove(changed)
+    assert len(collection.bed_groups) == 1
+
 
 def test_add():
     collection = GlacierCollection([glacier1, glacier2])
@@ -184,3 +203,216 @@ def test_str_collection():
 
     collection.change_attributes({'basal_sliding':[0, 5.7e-20, 10*5.7e-20]})
     assert [g.basal_sliding_str for g in collection.glaciers] == ['0', '5.7e-20', '57e-20']
+
+
+def test_worker_pool():
+    """The worker pool should be reused between calls and closed on exit."""
+    mb = MassBalance(ela=3000, gradient=8)
+    bed = GlacierBed(top=3700, bottom=1500, width=600)
+    glacier = Glacier(bed=bed, mass_balance=mb)
+
+    with GlacierCollection(n_workers=2) as collection:
+        collection.fill(glacier, 2)
+        collection.progress_to_year(10)
+        pool = collection._pool
+        assert pool is not None
+        collection.progress_to_year(20)
+        assert collection._pool is pool
+        assert collection.glaciers[0].age == 20
+    assert collection._pool is None
+
+    # Invalid number of workers.
+    with pytest.raises(ValueError):
+        GlacierCollection(n_workers=0)
+
+
+def test_progress_deltas():
+    """Progressing in the collection should give the same glaciers as
+    progressing them one by one."""
+    mb = MassBalance(ela=3000, gradient=8)
+    bed = GlacierBed(top=3700, bottom=1500, width=600)
+    glacier = Glacier(bed=bed, mass_balance=mb)
+    glacier.progress_to_year(20)
+    glacier.add_temperature_bias(1.0, 30)
+    surging = SurgingGlacier(bed=bed, mass_balance=mb)
+    ref_glacier = glacier.copy()
+    ref_surging = surging.copy()
+
+    with GlacierCollection([glacier, surging], n_workers=2) as collection:
+        collection.progress_to_year(70)
+        collection.progress_to_year(80)
+    # The glaciers are updated in place.
+    assert collection.glaciers[0] is glacier
+    ref_glacier.progress_to_year(70)
+    ref_glacier.progress_to_year(80)
+    ref_surging.progress_to_year(70)
+    ref_surging.progress_to_year(80)
+
+    for gl, ref in [(glacier, ref_glacier), (surging, ref_surging)]:
+        assert gl.age == ref.age
+        assert gl.ela == ref.ela
+        np.testing.assert_allclose(gl.current_state.surface_h, ref.current_state.surface_h)
+        np.testing.assert_allclose(gl.history.volume_m3, ref.history.volume_m3)
+        np.testing.assert_allclose(
+            gl.state_history.thickness_m, ref.state_history.thickness_m
+        )
+        pd.testing.assert_frame_equal(
+            gl.mass_balance.temp_bias_series, ref.mass_balance.temp_bias_series
+        )
+    assert surging._normal_years_left == ref_surging._normal_years_left
+
+
+def test_progress_streamed(tmp_path):
+    """Glaciers streaming their history should write it from the workers."""
+    glacier = Glacier(bed=bed, mass_balance=mb)
+    glacier.set_state_history_retention(interval=10)
+    streamed = glacier.copy()
+    path = str(tmp_path / "glacier.nc")
+    streamed.stream_history(path, chunk=25)
+
+    with GlacierCollection([streamed], n_workers=2) as collection:
+        collection.progress_to_year(60)
+        collection.progress_to_year(100)
+    glacier.progress_to_year(60)
+    glacier.progress_to_year(100)
+
+    assert streamed.age == 100
+    assert streamed._history.path == path
+    np.testing.assert_allclose(streamed.history.volume_m3, glacier.history.volume_m3)
+    np.testing.assert_equal(
+        streamed.state_history.time.values, glacier.state_history.time.values
+    )
+    np.testing.assert_allclose(
+        streamed.state_history.thickness_m, glacier.state_history.thickness_m
+    )
+
+
+def test_progress_batched():
+    """The batched progression should be close to the normal one."""
+    mb = MassBalance(ela=3000, gradient=8)
+    bed = GlacierBed(top=3700, bottom=1500, width=600)
+    glacier = Glacier(bed=bed, mass_balance=mb)
+
+    collection = GlacierCollection()
+    collection.fill(glacier, 3, attributes_to_change={"ela": [2900, 3000, 3100]})
+    batched = GlacierCollection([g.copy() for g in collection.glaciers])
+
+    collection.progress_to_year(60)
+    collection.close()
+    batched.progress_to_year(50, batched=True)
+    batched.progress_to_year(60, batched=True)
+
+    for gl, ref in zip(batched.glaciers, collection.glaciers):
+        assert gl.age == ref.age
+        assert len(gl.history.time) == len(ref.history.time)
+        np.testing.assert_allclose(gl.history.volume_m3, ref.history.volume_m3, rtol=1e-3)
+        np.testing.assert_allclose(gl.history.length_m, ref.history.length_m, atol=100)
+        np.testing.assert_allclose(
+            gl.current_state.surface_h, ref.current_state.surface_h, atol=5
+        )
+        assert set(gl.state_history.data_vars) == set(ref.state_history.data_vars)
+
+    # One run per bed.
+    collection = GlacierCollection([glacier1.copy(), glacier3.copy(), glacier1.copy()])
+    assert len(collection.bed_groups) == 2
+    collection.progress_to_year(10, batched=True)
+    ref = glacier3.copy()
+    ref.progress_to_year(10)
+    np.testing.assert_allclose(
+        collection.glaciers[1].history.volume_m3, ref.history.volume_m3, rtol=1e-3
+    )
+    # The climate moved on with the glaciers.
+    mb_batched = collection.glaciers[1].mass_balance
+    assert mb_batched.temp_bias_series.equals(ref.mass_balance.temp_bias_series)
+    assert mb_batched.temp_bias == ref.mass_balance.temp_bias
+    # Only glaciers of the same age on the same bed.
+    collection.add(glacier1.copy())
+    with pytest.raises(ValueError):
+        collection.progress_to_year(20, batched=True)
+    collection = GlacierCollection([SurgingGlacier(bed=bed, mass_balance=mb)])
+    with pytest.raises(TypeError):
+        collection.progress_to_year(10, batched=True)
+
+
+def test_failed_progression():
+    """A failed run should leave the whole collection as it was."""
+    outgrowing = Glacier(
+        bed=bed_new, mass_balance=MassBalance(ela=2600, gradient=8), id="outgrowing"
+    )
+    with GlacierCollection([glacier1.copy(), outgrowing], n_workers=2) as collection:
+        collection.glaciers[0].mass_balance.temp_bias_series = [0, 1]
+        mb_before = collection.glaciers[0].mass_balance
+        series = mb_before.temp_bias_series.copy()
+        last_year = mb_before._temp_bias_last_year
+        temp_bias, ela_h = mb_before.temp_bias, mb_before.ela_h
+        # The first bed runs fine, the second one fails.
+        with pytest.raises(RuntimeError, match="glaciers outgrowing"):
+            collection.progress_to_year(200, batched=True)
+        assert [glacier.age for glacier in collection.glaciers] == [0, 0]
+        assert collection.glaciers[0].history is None
+        # Nor did the climate of the first bed move on.
+        mb_after = collection.glaciers[0].mass_balance
+        assert mb_after._temp_bias_last_year == last_year
+        assert mb_after.temp_bias_series.equals(series)
+        assert (mb_after.temp_bias, mb_after.ela_h) == (temp_bias, ela_h)
+        # Same with a failing worker.
+        with pytest.raises(RuntimeError):
+            collection.progress_to_year(200)
+        assert [glacier.age for glacier in collection.glaciers] == [0, 0]
+        assert collection.glaciers[0].history is None
+
+
+def test_metrics():
+    """The metrics table should agree with the glacier attributes."""
+    glacier = Glacier(bed=bed, mass_balance=mb)
+    ref = glacier.copy()
+    with GlacierCollection([glacier, glacier.copy()], n_workers=2) as collection:
+        collection.progress_to_equilibrium()
+        collection.change_attributes({"ela": [3100, 3200]})
+        collection.progress_to_equilibrium()
+    ref.progress_to_equilibrium()
+    ref.mass_balance.ela = 3100
+    ref.progress_to_equilibrium()
+    df = collection.metrics()
+
+    # The response time needs the eq. states from before the last run.
+    assert glacier.response_time == ref.response_time > 0
+    for i, gl in enumerate(collection.glaciers, start=1):
+        assert df.loc[i, "Id"] == gl.id
+        assert df.loc[i, "Response time [yrs]"] == gl.response_time
+        assert df.loc[i, "AAR [%]"] == pytest.approx(gl.accumulation_area_ratio * 100)
+        assert df.loc[i, "Specific mass balance [m w.e. yr^-1]"] == pytest.approx(
+            gl.specific_mass_balance
+        )
+
+    # Glaciers without ice.
+    df = GlacierCollection([glacier1]).metrics()
+    assert np.isnan(df.loc[1, "AAR [%]"])
+    assert np.isnan(df.loc[1, "Specific mass balance [m w.e. yr^-1]"])
+
+
+def test_summary():
+    """The summary should follow changes of the glaciers."""
+    surging = SurgingGlacier(bed=bed, mass_balance=mb)
+    collection = GlacierCollection([glacier1.copy(), surging])
+    df = collection.summary()
+    assert df.loc[1].Id == collection.glaciers[0].id
+    assert np.isnan(df.loc[2].Id)
+    assert df.loc[2, "Surging periodicity (off/on)"] == [50, 5]
+    assert collection.summary().equals(df)
+
+    collection.glaciers[0].progress_to_year(10)
+    assert collection.summary().loc[1].Age == 10
+    collection.change_attributes({"ela": [3100, 3200]})
+    np.testing.assert_equal(collection.summary()["ELA [m]"].values, [3100, 3200])
+    surging.normal_years = 40
+    assert collection.summary().loc[2, "Surging periodicity (off/on)"] == [40, 5]
+
+    # A new state at the same age.
+    glacier = collection.glaciers[0]
+    volume = collection.summary().loc[1, "Volume [km3]"]
+    glacier._current_state = glacier._flowline_from_thick(glacier._state().thick * 2)
+    assert collection.summary().loc[1, "Volume [km3]"] > volume
+    # Copies have their own version.
+    copied = glacier.copy(id=glacier.id)
+    assert copied._summary_key() != glacier._summary_key()
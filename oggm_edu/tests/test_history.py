@@ -0,0 +1,127 @@
+from oggm_edu.history import HistoryStore, HistoryFile
+from numpy.testing import assert_equal
+import netCDF4
+import numpy as np
+import xarray as xr
+import pytest
+
+
+def make_ds(start, end, nx=4):
+    """Small dataset looking like the OGGM output."""
+    time = np.arange(start, end + 1, dtype=float)
+    return xr.Dataset(
+        {
+            "volume_m3": ("time", time * 10),
+            "thickness_m": (("time", "x"), np.outer(time, np.ones(nx))),
+            "bed_h": ("x", np.arange(nx, dtype=float)),
+        },
+        coords={"time": time, "x": np.arange(nx), "calendar_year": ("time", time.astype(int))},
+        attrs={"description": "test"},
+    )
+
+
+def test_append():
+    """Appending should give the same as concatenating the datasets."""
+    store = HistoryStore(make_ds(0, 5))
+    assert len(store) == 6
+    # The new run starts at the last year.
+    for start in range(5, 100, 5):
+        store.append(make_ds(start, start + 5))
+    ds = store.to_dataset()
+
+    assert_equal(ds.time.values, np.arange(101))
+    assert_equal(ds.volume_m3.values, np.arange(101) * 10)
+    assert_equal(ds.thickness_m.isel(x=0).values, np.arange(101))
+    assert_equal(ds.calendar_year.values, np.arange(101))
+    assert ds.bed_h.dims == ("x",)
+    assert ds.attrs["description"] == "test"
+    # Buffers grow geometrically.
+    assert store.capacity < 2 * len(store) + 16
+
+
+def test_views_are_not_modified():
+    """A dataset taken from the store should not change with later appends."""
+    store = HistoryStore(make_ds(0, 5))
+    ds = store.to_dataset()
+    assert store.to_dataset() is ds
+    with pytest.raises(ValueError):
+        ds.volume_m3.values[0] = 1
+
+    new = make_ds(5, 10)
+    new["volume_m3"][0] = -1
+    store.append(new)
+    assert ds.volume_m3.values[-1] == 50
+    assert store.to_dataset().volume_m3.sel(time=5) == -1
+
+    with pytest.raises(ValueError):
+        store.append(make_ds(10, 12).drop_vars("volume_m3"))
+
+
+def test_copies_grow_apart():
+    """Copies of a store growing their buffers should not change the others."""
+    store = HistoryStore(make_ds(0, 5))
+    copies = [store.copy(), store.copy()]
+    copies[0].append(make_ds(5, 50))
+    copies[1].append(make_ds(5, 10))
+    store.append(make_ds(5, 7))
+
+    assert_equal(copies[0].to_dataset().calendar_year.values, np.arange(51))
+    assert_equal(copies[1].to_dataset().calendar_year.values, np.arange(11))
+    assert_equal(store.to_dataset().calendar_year.values, np.arange(8))
+
+
+def test_truncate():
+    """Truncating and appending again should not touch earlier datasets."""
+    store = HistoryStore(make_ds(0, 10))
+    ds = store.to_dataset()
+    store.truncate(6)
+    assert_equal(store.to_dataset().time, np.arange(6))
+    store.append(make_ds(5, 8))
+    assert_equal(store.to_dataset().time, np.arange(9))
+    assert_equal(ds.time, np.arange(11))
+
+    with pytest.raises(ValueError):
+        store.truncate(20)
+
+
+def test_history_file(tmp_path):
+    """The file should hold the same data as the store."""
+    path = str(tmp_path / "history.nc")
+    netCDF4.Dataset(path, "w").close()
+    store = HistoryFile(make_ds(0, 5), path, "history")
+    other = HistoryFile(make_ds(0, 5), path, "state_history")
+    for start in range(5, 100, 5):
+        store.append(make_ds(start, start + 7))
+        # Reading a group should not prevent writing the other.
+        other.to_dataset()
+    ds = store.to_dataset()
+
+    assert len(store) == 103
+    assert_equal(ds.time.values, np.arange(103))
+    assert_equal(ds.volume_m3.values, np.arange(103) * 10)
+    assert_equal(ds.thickness_m.isel(x=0).values, np.arange(103))
+    assert "calendar_year" in ds.coords
+    assert ds.attrs["description"] == "test"
+    # Copies are in memory.
+    assert store.copy().to_dataset().equals(ds)
+
+    with pytest.raises(ValueError):
+        store.append(make_ds(102, 110).drop_vars("volume_m3"))
+
+
+def test_thinned_and_quantized():
+    """Thinned data should not replace earlier years, quantized data
+    should be decoded."""
+    ds = make_ds(0, 10)
+    ds["thickness_m"] = ds.thickness_m.copy(
+        data=(ds.thickness_m.values * 2).astype(np.uint16)
+    ).assign_attrs(scale_factor=0.5)
+    store = HistoryStore(ds.isel(time=[0, 5]))
+    store.append(ds.isel(time=[5, 6]))
+    # Does not start at the last year.
+    store.append(ds.isel(time=[10]))
+    ds = store.to_dataset()
+
+    assert_equal(ds.time.values, [0, 5, 6, 10])
+    assert_equal(ds.thickness_m.isel(x=0).values, [0, 5, 6, 10])
+    assert "scale_factor" not in ds.thickness_m.attrs
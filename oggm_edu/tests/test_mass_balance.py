@@ -108,3 +108,119 @@ def test_temp_bias_setter():
     mb.temp_bias_series = data
     assert len(mb.temp_bias_series.year) == 4
     assert_equal(mb.temp_bias_series.bias, np.array([0, 1, 1.5, 1]))
+
+
+def test_temp_bias_lookup():
+    """The array lookup should match the temperature bias series."""
+    mb = MassBalance(ela=2000, gradient=10)
+    mb.add_temp_bias(2.0, 10, noise=[-0.5, 0.5])
+    mb.add_random_climate(20, [-1.0, 1.0], 5)
+    series = mb.temp_bias_series
+
+    heights = np.linspace(3000, 1000, 10)
+    for year in series.year.iloc[:-1]:
+        mb.get_annual_mb(heights, year=float(year))
+        expected = series.bias[series.year == year + 1].values[0]
+        assert mb.temp_bias == expected
+
+    # Past the end of the series the bias stays constant and is appended.
+    last_year = float(series.year.iloc[-1])
+    mb.get_annual_mb(heights, year=last_year)
+    assert len(mb.temp_bias_series) == len(series) + 1
+    assert mb._temp_bias_last_year == last_year + 1
+    assert mb._temp_bias_lookup[-1] == mb.temp_bias
+
+    # Reset clears the lookup as well.
+    mb.reset()
+    assert_equal(mb._temp_bias_lookup, [0])
+
+
+def test_mb_cache():
+    """The profile cache should return the same mb and be invalidated."""
+    heights = np.linspace(3000, 1000, 50)
+    mb = MassBalance(ela=2000, gradient=[10, 5], breakpoints=[2000], cache_size=2)
+    ref = MassBalance(ela=2000, gradient=[10, 5], breakpoints=[2000])
+
+    assert_equal(mb.get_annual_mb(heights), ref.get_annual_mb(heights))
+    assert_equal(mb.get_annual_mb(heights), ref.get_annual_mb(heights))
+    assert mb.cache_info()["hits"] == 1
+    assert mb.cache_info()["misses"] == 1
+
+    # Changing the ela invalidates the cache.
+    mb.ela = 2100
+    ref.ela = 2100
+    assert mb.cache_info()["size"] == 0
+    assert_equal(mb.get_annual_mb(heights), ref.get_annual_mb(heights))
+
+    # Same for the gradient and the temperature bias.
+    mb = MassBalance(ela=2000, gradient=10, cache_size=2)
+    mb.get_annual_mb(heights)
+    mb.gradient = 5
+    assert mb.cache_info()["size"] == 0
+    mb.get_annual_mb(heights)
+    mb.temp_bias = 1.0
+    assert mb.cache_info()["size"] == 0
+    mb.get_annual_mb(heights)
+    mb.max_mb = 2000
+    assert mb.cache_info()["size"] == 0
+    # Setting the same bias again keeps it.
+    mb.get_annual_mb(heights)
+    mb.temp_bias = 1.0
+    assert mb.get_annual_mb(heights) is not None
+    assert mb.cache_info()["hits"] == 1
+
+    # Model runs don't use the cache.
+    info = mb.cache_info()
+    mb.get_annual_mb(heights, year=0.0)
+    assert mb.cache_info() == info
+
+    # The cache is bounded.
+    for i in range(5):
+        mb.get_annual_mb(heights + i)
+    assert mb.cache_info()["size"] == 2
+
+    with pytest.raises(ValueError):
+        mb.cache_size = -1
+
+
+def test_unsorted_heights():
+    """The profile only depends on the height, not on the order of the heights."""
+    mb = MassBalance(ela=2000, gradient=[10, 5, 3], breakpoints=[2500, 1200])
+    heights = np.linspace(3000, 1000, 41)
+    computed_mbs = mb.get_annual_mb(heights)
+
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(heights))
+    assert_equal(mb._gradient_lookup(heights[order]), mb._gradient_lookup(heights)[order])
+    np.testing.assert_allclose(
+        mb._breakpoint_diff(heights[order]), mb._breakpoint_diff(heights)[order]
+    )
+    assert_equal(mb.get_annual_mb(heights[order]), computed_mbs[order])
+
+    # Breakpoints have to be descending.
+    with pytest.raises(ValueError):
+        MassBalance(ela=2000, gradient=[10, 5, 3], breakpoints=[1200, 2500])
+
+
+def test_breakpoint_nodes():
+    """Nodes next to a breakpoint should follow the gradient of their height."""
+    mb = MassBalance(ela=2900, gradient=[10, 5, 3], breakpoints=[3100, 2500])
+    heights = np.linspace(3400, 1500, 200)
+    computed_mbs = mb.get_annual_mb(heights) * SEC_IN_YEAR * mb.rho
+
+    def profile(h):
+        return np.where(
+            h >= 3100,
+            (h - 2900) * 10,
+            np.where(h >= 2500, 2000 + (h - 3100) * 5, -1000 + (h - 2500) * 3),
+        )
+
+    ela_idx = np.argmin(np.abs(heights - 2900))
+    np.testing.assert_allclose(
+        computed_mbs, profile(heights) - profile(heights[ela_idx]), atol=1e-8
+    )
+    # The node at 3104.02 m, nearest to the breakpoint but above it, is in the
+    # upper segment.
+    idx = np.argmin(np.abs(heights - 3100))
+    assert heights[idx] > 3100
+    assert mb._gradient_lookup(heights)[idx] == 10
@@ -0,0 +1,108 @@
+from oggm_edu import (
+    Glacier, SurgingGlacier, GlacierBed, GlacierCollection, MassBalance, plotting
+)
+import matplotlib.pyplot as plt
+import pytest
+from PIL import Image
+
+bed = GlacierBed(top=3400, bottom=1500, width=300)
+
+
+def test_plot_functions():
+    """The plot methods should be the plotting functions."""
+    glacier = Glacier(bed=bed, mass_balance=MassBalance(ela=3000, gradient=4))
+    glacier.progress_to_year(120)
+
+    plotting.plot_glacier(glacier, figsize=(6, 4))
+    fig = plt.gcf()
+    assert list(fig.get_size_inches()) == [6, 4]
+    assert fig.axes[0].get_title(loc="left") == "Glacier state at year 120"
+    plt.close("all")
+
+    glacier.plot_state_history(interval=50)
+    labels = plt.gcf().axes[0].get_legend_handles_labels()[1]
+    assert "Glacier outline at year 50" in labels
+    plt.close("all")
+
+    glacier.plot_history(show_bias=True)
+    assert len(plt.gcf().axes) == 4
+    plt.close("all")
+
+    surging = SurgingGlacier(bed=bed, mass_balance=MassBalance(ela=3000, gradient=4))
+    surging.progress_to_year(120)
+    surging.plot_history()
+    assert plt.gcf().legends[0].get_texts()[0].get_text() == "Surging period"
+    plt.close("all")
+
+
+def test_live_plot():
+    """Live plots should follow the glaciers without new artists."""
+    glacier = Glacier(bed=bed, mass_balance=MassBalance(ela=3000, gradient=4))
+    plot = glacier.plot(live=True)
+    ax1, ax2 = plot.axes
+    n_artists = len(ax1.get_children()), len(ax2.get_children())
+    plot.update()
+
+    glacier.progress_to_year(80)
+    plot.update()
+    assert (len(ax1.get_children()), len(ax2.get_children())) == n_artists
+    assert ax1.get_title(loc="left") == "Glacier state at year 80"
+    x, y = plot._outline.get_data()
+    assert len(x) > 0
+    assert ax1.get_ylim()[1] == glacier.current_state.surface_h[0] + 200
+    plt.close("all")
+
+    collection = GlacierCollection([glacier, glacier.copy()])
+    collection.change_attributes({"ela": [3000, 3100]})
+    plot = collection.plot(live=True)
+    collection.progress_to_year(100)
+    plot.update()
+    assert plot.ax.get_title() == "Glacier collection at year 100"
+    texts = [text.get_text() for text in plot._ela_texts if text.get_visible()]
+    assert texts == ["ELA glacier 1", "ELA glacier 2"]
+    plt.close("all")
+
+
+def test_animate(tmp_path):
+    """The movie should have one frame per selected state."""
+    glacier = Glacier(bed=bed, mass_balance=MassBalance(ela=3000, gradient=4))
+    with pytest.raises(ValueError):
+        glacier.animate(str(tmp_path / "glacier.gif"))
+    glacier.progress_to_year(100)
+
+    path = glacier.animate(str(tmp_path / "glacier.gif"), stride=10)
+    assert Image.open(path).n_frames == 11
+    path = glacier.animate(str(tmp_path / "decimated.gif"), max_frames=5)
+    assert Image.open(path).n_frames == 5
+    # The figure is closed.
+    assert not plt.get_fignums()
+
+    with pytest.raises(ValueError):
+        glacier.animate(str(tmp_path / "glacier.gif"), stride=0)
+
+
+def test_animate_ela(tmp_path, monkeypatch):
+    """The frames should show the ELA of the glacier, also after setting it."""
+    from oggm_edu.plotting import GlacierPlot
+
+    elas = []
+    set_state = GlacierPlot._set_state
+
+    def record(self, thick, ela, *args, **kwargs):
+        elas.append(ela)
+        return set_state(self, thick, ela, *args, **kwargs)
+
+    monkeypatch.setattr(GlacierPlot, "_set_state", record)
+    glacier = Glacier(bed=bed, mass_balance=MassBalance(ela=3000, gradient=4))
+    glacier.progress_to_year(20)
+    glacier.mass_balance.ela = 3100
+    glacier.animate(str(tmp_path / "glacier.gif"), stride=10)
+    assert set(elas) == {3100}
+
+    # The ELA follows the temperature bias.
+    elas.clear()
+    glacier.add_temperature_bias(1.0, 10)
+    glacier.progress_to_year(40)
+    glacier.animate(str(tmp_path / "glacier.gif"), stride=10)
+    assert elas[-1] == glacier.ela
+    assert elas[1] == glacier.ela - 150
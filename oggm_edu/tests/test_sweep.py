@@ -0,0 +1,65 @@
+from oggm_edu import Glacier, GlacierBed, MassBalance, ParameterSweep
+from oggm_edu.sweep import _imap_bounded
+import os
+from multiprocessing import Pool
+import pandas as pd
+import pytest
+
+bed = GlacierBed(top=3400, bottom=1500, width=300)
+
+
+def test_sweep(tmp_path):
+    """The sweep should give the results of the glaciers run one by one,
+    and continue from the results on disk."""
+    glacier = Glacier(bed=bed, mass_balance=MassBalance(ela=3000, gradient=4))
+    parameters = {"ela": [2900, 3100], "gradient": [4, 6], "basal_sliding": [0, 5.7e-20]}
+    sweep = ParameterSweep(glacier, parameters, path=tmp_path, chunk_size=3, n_workers=2)
+    assert len(sweep) == 8
+    assert len(list(sweep.points())) == 8
+
+    df = sweep.run(year=50)
+    assert list(df.index) == list(range(8))
+    assert list(df.columns) == list(parameters) + list(ParameterSweep.results)
+    assert (df.Age == 50).all()
+    # The base glacier is not run.
+    assert glacier.age == 0
+
+    point = list(sweep.points())[5]
+    assert point == df.loc[5, list(parameters)].to_dict()
+    single = glacier.copy()
+    single.mass_balance.ela = point["ela"]
+    single.mass_balance.gradient = point["gradient"]
+    single.basal_sliding = point["basal_sliding"]
+    single.progress_to_year(50)
+    assert df.loc[5, "Length [m]"] == single.current_state.length_m
+    assert df.loc[5, "Volume [km3]"] == pytest.approx(single.current_state.volume_km3)
+
+    # Drop a chunk, only that one is run again.
+    os.remove(tmp_path / "chunk_00000003.csv")
+    done = os.path.getmtime(tmp_path / "chunk_00000000.csv")
+    resumed = ParameterSweep(glacier, parameters, path=tmp_path).run(year=50)
+    pd.testing.assert_frame_equal(resumed, df)
+    assert os.path.exists(tmp_path / "chunk_00000003.csv")
+    assert os.path.getmtime(tmp_path / "chunk_00000000.csv") == done
+
+    # Another sweep in the same directory.
+    with pytest.raises(ValueError):
+        ParameterSweep(glacier, parameters, path=tmp_path).run(year=60)
+    with pytest.raises(ValueError):
+        ParameterSweep(glacier, {"ela": [3000], "rho": [900]})
+
+
+def test_bounded_feeding():
+    """The chunks should be drawn as the results come in, not all at once."""
+    drawn = []
+
+    def chunks():
+        for i in range(100):
+            drawn.append(i)
+            yield i
+
+    with Pool(processes=2) as pool:
+        results = _imap_bounded(pool, abs, chunks(), window=4)
+        assert next(results) == 0
+        assert len(drawn) == 4
+        assert list(results) == list(range(1, 100))